@@ -40,9 +40,45 @@ module.exports = function (eleventyConfig) {
   });
   // --- ここまで markdown フィルタ ---
 
+  // --- 数値の表示用フィルタ ---
+  // データには整数（requested_ada / votes_cast など）が入っている。
+  // 古いデータの "585.0" や "₳739,000" のような文字列も同じ書式にそろえる。
+  const toInt = (value) => {
+    if (value === null || value === undefined || value === "") return null;
+    if (typeof value === "number") return Number.isFinite(value) ? Math.trunc(value) : null;
+    const s = String(value).replace(/[₳,\s]/g, "");
+    return /^-?\d+(\.\d+)?$/.test(s) ? Math.trunc(Number(s)) : null;
+  };
+
+  // 256533420 → "256,533,420"（数値にできない文字列はそのまま、空なら ""）
+  eleventyConfig.addFilter("thousands", (value) => {
+    const n = toInt(value);
+    if (n === null) return value === null || value === undefined ? "" : String(value);
+    return n.toLocaleString("en-US");
+  });
+
+  // 739000 → "₳739,000"
+  eleventyConfig.addFilter("ada", (value) => {
+    const n = toInt(value);
+    if (n === null) return value === null || value === undefined ? "" : String(value);
+    return `₳${n.toLocaleString("en-US")}`;
+  });
+  // --- ここまで数値フィルタ ---
+
   // styles フォルダをそのまま _site/styles にコピー
   eleventyConfig.addPassthroughCopy("site/styles");
 
+  // ビルドできたら、このとき使ったマニフェストを _site に控えておく
+  // （次に F14_CHANGED_ONLY=1 でビルドするとき、site/_data/f14_pages.js がこれと比べる）
+  eleventyConfig.on("eleventy.after", ({ dir }) => {
+    const fs = require("fs");
+    const path = require("path");
+    const manifest = path.join("data", "manifests", "site.json");
+    if (fs.existsSync(manifest)) {
+      fs.copyFileSync(manifest, path.join(dir.output, ".f14_built_manifest.json"));
+    }
+  });
+
   return {
     dir: {
       input: "site",
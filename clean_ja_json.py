@@ -1,6 +1,10 @@
-import json
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / "tools"))
+
+from records import iter_records, write_records  # noqa: E402
+
 INPUT = Path("data/f14_proposals_ja.json")
 OUTPUT = Path("data/f14_proposals_ja_clean.json")
 
@@ -12,20 +16,16 @@ def clean_text(s: str) -> str:
     return s.replace("\u3000", "")
 
 
-def main():
-    with INPUT.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+def clean_record(p: dict) -> dict:
+    p["title_ja"] = clean_text(p.get("title_ja", ""))
+    p["summary_ja"] = clean_text(p.get("summary_ja", ""))
+    return p
 
-    cleaned = []
-    for p in data:
-        p["title_ja"] = clean_text(p.get("title_ja", ""))
-        p["summary_ja"] = clean_text(p.get("summary_ja", ""))
-        cleaned.append(p)
 
-    with OUTPUT.open("w", encoding="utf-8") as f:
-        json.dump(cleaned, f, ensure_ascii=False, indent=2)
+def main():
+    count = write_records(OUTPUT, (clean_record(p) for p in iter_records(INPUT)))
 
-    print(f"✨ Cleaned JSON saved → {OUTPUT}")
+    print(f"✨ Cleaned JSON saved → {OUTPUT} ({count} 件)")
 
 
 if __name__ == "__main__":
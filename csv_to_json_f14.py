@@ -1,7 +1,11 @@
 import csv
-import json
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / "tools"))
+
+from records import write_records  # noqa: E402
+
 # data ディレクトリの中の CSV を読む前提
 DATA_DIR = Path("data")
 CSV_FILE = DATA_DIR / "f14_results.csv"  # ← ここに実際のファイル名を合わせてね
@@ -14,20 +18,12 @@ def main():
 
     print(f"📥 読み込み: {CSV_FILE}")
 
-    rows = []
     # utf-8-sig にしておくと先頭のBOM問題を避けやすい
     with CSV_FILE.open("r", encoding="utf-8-sig", newline="") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            # row は {"column_name": "value", ...} という dict
-            rows.append(row)
-
-    print(f"✅ {len(rows)} 件の行を読み込みました。")
-
-    # そのまま JSON に書き出し
-    with OUTPUT_FILE.open("w", encoding="utf-8") as f:
-        json.dump(rows, f, ensure_ascii=False, indent=2)
+        # row は {"column_name": "value", ...} という dict。読みながらそのまま書き出す
+        count = write_records(OUTPUT_FILE, csv.DictReader(f))
 
+    print(f"✅ {count} 件の行を読み込みました。")
     print(f"💾 JSON に保存しました: {OUTPUT_FILE}")
 
 
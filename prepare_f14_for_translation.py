@@ -1,8 +1,16 @@
-import json
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / "tools"))
+
+from normalize import int_column, to_int  # noqa: E402
+from proposal_ids import IdAssigner, stable_proposal_id  # noqa: E402
+from records import iter_records, write_records  # noqa: E402
+
 DATA_DIR = Path("data")
 
+FUND = 14
+
 RAW_FILE = DATA_DIR / "f14_results_raw.json"
 OUTPUT_FILE = DATA_DIR / "f14_proposals_en.json"
 
@@ -38,112 +46,97 @@ def norm_text(value) -> str:
     return s
 
 
-def norm_int(value) -> str:
-    """整数系（投票数やADA量）を '585' や '256,533,420' 形式に整える。"""
-    if value is None:
-        return ""
-
-    # 数値ならそのまま整形
-    if isinstance(value, (int, float)):
-        return f"{int(value):,}"
-
-    # 文字列など
-    s = str(value).strip()
-    if not s or s.lower() == "nan":
-        return ""
-    try:
-        num = int(float(s))
-        return f"{num:,}"
-    except ValueError:
-        return s
-
+# 整数にそろえる列: 出力フィールド → 元の列名
+# （表示用の "₳739,000" や "256,533,420" はサイト側で作る）
+INT_FIELDS = {
+    "requested_ada": REQUESTED_COL,
+    "votes_cast": VOTES_CAST_COL,
+    "yes_amount": YES_COL,
+    "abstain_amount": ABSTAIN_COL,
+    "fund_depletion": FUND_DEPLETION_COL,
+}
 
-def norm_ada(value) -> str:
-    """ADA 金額を '₳739,000' のような書式に整える."""
-    if value is None:
-        return ""
-    s = str(value).strip()
-    if s.lower() == "nan" or s == "":
-        return ""
-    # すでに "₳" 付きならそのまま返す
-    if s.startswith("₳"):
-        return s
-    try:
-        num = float(s)
-        return f"₳{int(num):,}"
-    except ValueError:
-        # 数字に変換できない場合はそのまま返す
-        return s
+# 数値列をまとめて変換する行数（この行数ぶんだけメモリに載せる）
+CHUNK_ROWS = 10000
 
 
-def main():
-    print("[prepare_f14] START")
-    print(f"[prepare_f14] RAW_FILE = {RAW_FILE}")
-    print(f"[prepare_f14] RAW_FILE.exists() = {RAW_FILE.exists()}")
+def chunked(rows, size: int):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
 
-    if not RAW_FILE.exists():
-        raise FileNotFoundError(f"raw JSON が見つかりません: {RAW_FILE}")
 
-    with RAW_FILE.open("r", encoding="utf-8") as f:
-        raw = json.load(f)
-    print(f"[prepare_f14] loaded raw len = {len(raw)}")
-
-    proposals = []
-    for i, row in enumerate(raw):
-        # タイトル
-        title = norm_text(row.get(TITLE_COL, ""))
-        if not title:
-            # タイトルが空なら無視（合計行など）
-            continue
-
-        # チャレンジ名（シート名を入れておいた列）
-        challenge = norm_text(row.get(CHALLENGE_COL, "")) if CHALLENGE_COL else ""
-
-        # 要求額（"₳739,000" のような文字列に整形）
-        requested = norm_ada(row.get(REQUESTED_COL, "")) if REQUESTED_COL else ""
-
-        # 追加メタデータ
-        status = norm_text(row.get(STATUS_COL, "")) if STATUS_COL else ""
-        votes_cast = norm_int(row.get(VOTES_CAST_COL, "")) if VOTES_CAST_COL else ""
-        yes_amount = norm_int(row.get(YES_COL, "")) if YES_COL else ""
-        abstain_amount = norm_int(row.get(ABSTAIN_COL, "")) if ABSTAIN_COL else ""
-        meets_approval_threshold = (
-            norm_text(row.get(APPROVAL_COL, "")) if APPROVAL_COL else ""
-        )
-        fund_depletion = (
-            norm_int(row.get(FUND_DEPLETION_COL, "")) if FUND_DEPLETION_COL else ""
-        )
-        not_funded_reason = (
-            norm_text(row.get(NOT_FUNDED_REASON_COL, ""))
-            if NOT_FUNDED_REASON_COL
-            else ""
-        )
-        proposal_url = norm_text(row.get(URL_COL, "")) if URL_COL else ""
-
-        proposals.append(
-            {
-                "proposal_id": f"F14-{i+1:04d}",
-                "fund": 14,
+def iter_proposals(raw, vectorized: bool = True):
+    """
+    raw の行から提案レコードを 1 件ずつ作る。
+    proposal_id は行番号ではなく (challenge, URL またはタイトル) から作るので、
+    Excel に行を足したり並べ替えたりしても変わらない。
+    数値列は CHUNK_ROWS 行ずつ列単位でまとめて整数にする（vectorized=False なら 1 セルずつ）。
+    """
+    assign_id = IdAssigner()
+    to_ints = int_column if vectorized else (lambda values: [to_int(v) for v in values])
+
+    # タイトルが空の行（合計行など）は先に除く
+    titled = ((norm_text(row.get(TITLE_COL, "")), row) for row in raw)
+    for chunk in chunked(((t, row) for t, row in titled if t), CHUNK_ROWS):
+        columns = {
+            field: to_ints([row.get(col) for _, row in chunk]) if col else [None] * len(chunk)
+            for field, col in INT_FIELDS.items()
+        }
+        for k, (title, row) in enumerate(chunk):
+            # チャレンジ名（シート名を入れておいた列）
+            challenge = norm_text(row.get(CHALLENGE_COL, "")) if CHALLENGE_COL else ""
+
+            # 追加メタデータ
+            status = norm_text(row.get(STATUS_COL, "")) if STATUS_COL else ""
+            meets_approval_threshold = (
+                norm_text(row.get(APPROVAL_COL, "")) if APPROVAL_COL else ""
+            )
+            not_funded_reason = (
+                norm_text(row.get(NOT_FUNDED_REASON_COL, ""))
+                if NOT_FUNDED_REASON_COL
+                else ""
+            )
+            proposal_url = norm_text(row.get(URL_COL, "")) if URL_COL else ""
+
+            proposal_id = assign_id(stable_proposal_id(FUND, challenge, proposal_url, title))
+
+            yield {
+                "proposal_id": proposal_id,
+                "fund": FUND,
                 "challenge": challenge,
                 "title_en": title,
                 "summary_en": "",
                 "full_text_en": "",
-                "requested_ada": requested,
+                # 要求額（ADA, 整数）
+                "requested_ada": columns["requested_ada"][k],
                 "status": status,
-                "votes_cast": votes_cast,
-                "yes_amount": yes_amount,
-                "abstain_amount": abstain_amount,
+                "votes_cast": columns["votes_cast"][k],
+                "yes_amount": columns["yes_amount"][k],
+                "abstain_amount": columns["abstain_amount"][k],
                 "meets_approval_threshold": meets_approval_threshold,
-                "fund_depletion": fund_depletion,
+                "fund_depletion": columns["fund_depletion"][k],
                 "not_funded_reason": not_funded_reason,
                 "proposal_url": proposal_url,
             }
-        )
 
-    with OUTPUT_FILE.open("w", encoding="utf-8") as f:
-        json.dump(proposals, f, ensure_ascii=False, indent=2)
 
-    print(f"✅ 整形完了: {len(proposals)} 件 → {OUTPUT_FILE}")
+def main():
+    print("[prepare_f14] START")
+    print(f"[prepare_f14] RAW_FILE = {RAW_FILE}")
+    print(f"[prepare_f14] RAW_FILE.exists() = {RAW_FILE.exists()}")
+
+    if not RAW_FILE.exists():
+        raise FileNotFoundError(f"raw JSON が見つかりません: {RAW_FILE}")
+
+    # raw は 1 行ずつ読み、整形した提案を 1 件ずつ書き出す（全件をメモリに載せない）
+    count = write_records(OUTPUT_FILE, iter_proposals(iter_records(RAW_FILE)))
+    print(f"✅ 整形完了: {count} 件 → {OUTPUT_FILE}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,136 @@
+// search.js
+//
+// tools/build_search_index.py が作る data/search/index.json で検索する（index.html から読む）。
+// tokenize は Python 側と同じ規則にしておくこと（NFKC・小文字化 → 英語は単語、日本語は bigram）。
+//
+// 複数の語は AND。最後の語（入力途中）と 1 文字だけの日本語は前方一致で広げる。
+(function (root) {
+  const INDEX_VERSION = 1;
+
+  const TOKEN_RE =
+    /[0-9a-z\u00c0-\u024f]+|[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\u3005\u3006]+/g;
+  // これ以降の文字で始まる並びは日本語として bigram にする
+  const CJK_START = "\u3040";
+
+  const STOPWORDS = new Set(
+    (
+      "a an and are as at be by for from has have in into is it its of on or our " +
+      "that the their this to we will with"
+    ).split(" ")
+  );
+
+  // 前方一致で広げるときの語数の上限
+  const MAX_EXPANSION = 64;
+
+  // terms は普通のオブジェクトなので、"constructor" などで prototype を引かないようにする
+  const hasOwn = (obj, key) => Object.prototype.hasOwnProperty.call(obj, key);
+
+  function tokenize(text) {
+    const out = [];
+    const s = String(text || "").normalize("NFKC").toLowerCase();
+    for (const m of s.matchAll(TOKEN_RE)) {
+      const run = m[0];
+      if (run[0] >= CJK_START) {
+        const chars = Array.from(run);
+        if (chars.length === 1) {
+          out.push(run);
+        } else {
+          for (let i = 0; i < chars.length - 1; i++) out.push(chars[i] + chars[i + 1]);
+        }
+      } else if ((run.length >= 2 || /^\d+$/.test(run)) && !STOPWORDS.has(run)) {
+        out.push(run);
+      }
+    }
+    return out;
+  }
+
+  class SearchIndex {
+    constructor(data) {
+      if (data.version !== INDEX_VERSION) {
+        throw new Error(`search index version ${data.version} (expected ${INDEX_VERSION})`);
+      }
+      this.docs = data.docs;
+      this.terms = data.terms;
+      this._decoded = new Map();
+      this._sorted = null;
+    }
+
+    // 差分で入っているポスティングを 文書番号 → スコア に戻す（一度戻した語は覚えておく）
+    postings(term) {
+      let map = this._decoded.get(term);
+      if (map) return map;
+      map = new Map();
+      const flat = hasOwn(this.terms, term) ? this.terms[term] : null;
+      if (flat) {
+        let doc = 0;
+        for (let i = 0; i < flat.length; i += 2) {
+          doc += flat[i];
+          map.set(doc, flat[i + 1]);
+        }
+      }
+      this._decoded.set(term, map);
+      return map;
+    }
+
+    // term で始まる語のポスティングをまとめる（同じ文書はスコアの大きい方）
+    prefixPostings(prefix) {
+      if (!this._sorted) this._sorted = Object.keys(this.terms).sort();
+      const words = this._sorted;
+      let lo = 0;
+      let hi = words.length;
+      while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (words[mid] < prefix) lo = mid + 1;
+        else hi = mid;
+      }
+      const merged = new Map();
+      for (let i = lo, n = 0; i < words.length && n < MAX_EXPANSION; i++, n++) {
+        if (!words[i].startsWith(prefix)) break;
+        for (const [doc, score] of this.postings(words[i])) {
+          merged.set(doc, Math.max(merged.get(doc) || 0, score));
+        }
+      }
+      return merged;
+    }
+
+    // [{ id, score }] をスコアの高い順に
+    search(query, limit = 50) {
+      const tokens = [...new Set(tokenize(query))];
+      if (tokens.length === 0) return [];
+
+      let scores = null;
+      tokens.forEach((token, i) => {
+        const isLast = i === tokens.length - 1;
+        const singleCjk = token[0] >= CJK_START && Array.from(token).length === 1;
+        let hits = hasOwn(this.terms, token) ? this.postings(token) : null;
+        if ((!hits || singleCjk) && (isLast || singleCjk)) {
+          hits = this.prefixPostings(token);
+        }
+        hits = hits || new Map();
+
+        if (scores === null) {
+          scores = new Map(hits);
+          return;
+        }
+        const next = new Map();
+        for (const [doc, score] of scores) {
+          const s = hits.get(doc);
+          if (s !== undefined) next.set(doc, score + s);
+        }
+        scores = next;
+      });
+
+      return [...scores]
+        .sort((a, b) => b[1] - a[1] || a[0] - b[0])
+        .slice(0, limit)
+        .map(([doc, score]) => ({ id: this.docs[doc], score }));
+    }
+  }
+
+  const api = { tokenize, SearchIndex, INDEX_VERSION };
+  if (typeof module !== "undefined" && module.exports) {
+    module.exports = api;
+  } else {
+    root.F14Search = api;
+  }
+})(typeof window !== "undefined" ? window : globalThis);
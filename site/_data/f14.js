@@ -5,22 +5,46 @@ const fs = require("fs");
 // data ディレクトリ
 const dataDir = path.join(__dirname, "..", "..", "data");
 
-// 日本語・英語それぞれの JSON を読む
+// 日本語・英語それぞれの JSON
 const jaPath = path.join(dataDir, "f14_proposals_ja.json");
 const enPath = path.join(dataDir, "f14_proposals_en.json");
 
+// tools/build_site_bundle.py がマージ済みで書き出すバンドル
+const bundlePath = path.join(dataDir, "f14_site_bundle.json");
+
+// Challenge 名の表示用マップ（バンドルと共通）
+const labelsPath = path.join(dataDir, "challenge_labels.json");
+
+const mtime = (p) => (fs.existsSync(p) ? fs.statSync(p).mtimeMs : 0);
+
+// バンドルが ja / en / challenge ラベルより新しければ、それをそのまま使う
+const bundleIsFresh =
+  fs.existsSync(bundlePath) &&
+  mtime(bundlePath) >= Math.max(mtime(jaPath), mtime(enPath), mtime(labelsPath));
+if (bundleIsFresh) {
+  module.exports = JSON.parse(fs.readFileSync(bundlePath, "utf-8"));
+  return;
+}
+
+// ja がなければここではマージできない
+if (!fs.existsSync(jaPath)) {
+  throw new Error(
+    "[f14] neither data/f14_site_bundle.json nor data/f14_proposals_ja.json exists " +
+      "(run the pipeline: python tools/pipeline.py)"
+  );
+}
+
+// バンドルがない・古いときは、ここでマージする（python tools/build_site_bundle.py で作れる）
+console.warn(
+  "[f14] data/f14_site_bundle.json is missing or stale; merging ja/en here " +
+    "(run: python tools/build_site_bundle.py)"
+);
+
 const ja = JSON.parse(fs.readFileSync(jaPath, "utf-8"));
-const en = JSON.parse(fs.readFileSync(enPath, "utf-8"));
-
-// Challenge 名の表示用マップ
-const CHALLENGE_LABELS = {
-  "Cardano Use Cases Partners & Pr": "Cardano Use Cases: Partners & Products",
-  "Cardano Use Cases Concept": "Cardano Use Cases: Concept",
-  "Cardano Open Developers": "Cardano Open: Developers",
-  "Cardano Open Ecosystem": "Cardano Open: Ecosystem",
-  "Sponsored by leftovers": "Sponsored by leftovers",
-  Withdrawn: "Withdrawn",
-};
+const en = fs.existsSync(enPath) ? JSON.parse(fs.readFileSync(enPath, "utf-8")) : [];
+const CHALLENGE_LABELS = fs.existsSync(labelsPath)
+  ? JSON.parse(fs.readFileSync(labelsPath, "utf-8"))
+  : {};
 
 // EN を proposal_id で引けるようにしておく
 const enById = new Map(en.map((p) => [p.proposal_id, p]));
@@ -0,0 +1,36 @@
+// site/_data/f14_pages.js
+//
+// proposal.njk がページを作る提案の一覧。
+// ふだんは f14 と同じ（全件）。F14_CHANGED_ONLY=1 のときは、tools/change_manifest.py の
+// data/manifests/site.json を前回ビルドしたときの控え（_site/.f14_built_manifest.json）と比べ、
+// ハッシュが変わった提案のページだけを作る（それ以外は前回の _site に残っているものを使う）。
+const path = require("path");
+const fs = require("fs");
+
+const f14 = require("./f14.js");
+
+const root = path.join(__dirname, "..", "..");
+const manifestPath = path.join(root, "data", "manifests", "site.json");
+const builtPath = path.join(root, "_site", ".f14_built_manifest.json");
+
+const readProposals = (p) =>
+  fs.existsSync(p) ? JSON.parse(fs.readFileSync(p, "utf-8")).proposals : null;
+
+function changedOnly() {
+  const current = readProposals(manifestPath);
+  const built = readProposals(builtPath);
+  if (!current || !built) {
+    console.warn("[f14_pages] no manifest or no previous build; rendering every proposal");
+    return f14;
+  }
+  const pages = f14.filter((p) => {
+    const now = current[p.proposal_id];
+    const before = built[p.proposal_id];
+    // マニフェストにない提案（バンドルを作り直していない等）は念のため作り直す
+    return !now || !before || now.hash !== before.hash;
+  });
+  console.log(`[f14_pages] ${pages.length}/${f14.length} proposal pages changed`);
+  return pages;
+}
+
+module.exports = process.env.F14_CHANGED_ONLY ? changedOnly() : f14;
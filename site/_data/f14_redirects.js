@@ -0,0 +1,22 @@
+// site/_data/f14_redirects.js
+//
+// tools/migrate_proposal_ids.py で ID が変わった提案の旧 URL（/proposals/f14-0001/）から
+// 新しいページへのリダイレクト。data/f14_id_migration.json（旧 ID → 新 ID）から作る。
+// 新 ID の提案が今のデータにないもの・旧 ID が今も使われているものは出さない。
+const path = require("path");
+const fs = require("fs");
+
+const f14 = require("./f14.js");
+
+const mapPath = path.join(__dirname, "..", "..", "data", "f14_id_migration.json");
+
+function redirects() {
+  if (!fs.existsSync(mapPath)) return [];
+  const mapping = JSON.parse(fs.readFileSync(mapPath, "utf-8"));
+  const current = new Set(f14.map((p) => String(p.proposal_id).toLowerCase()));
+  return Object.entries(mapping)
+    .map(([from, to]) => ({ from: from.toLowerCase(), to: String(to).toLowerCase() }))
+    .filter(({ from, to }) => from !== to && current.has(to) && !current.has(from));
+}
+
+module.exports = redirects();
@@ -0,0 +1,148 @@
+# tools/bench_excel.py
+#
+# 合成した大きなブックで、excel_to_json_f14.py の読み込み方式を比べる。
+#   openpyxl        : 従来の load_workbook（ブック全体をメモリに載せる）
+#   stream -w1      : シート XML を行ごとに読む（1 プロセス）
+#   stream -wN      : シートごとにプロセスプールで並列
+#   stream (cached) : 2 回目（変わっていないシートはキャッシュから）
+# 各方式は別プロセスで動かし、時間と最大メモリ（RSS）を出す。出力が一致するかも確かめる。
+#
+#   python tools/bench_excel.py --rows 20000 --sheets 5
+
+import argparse
+import filecmp
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+TOOLS_DIR = Path(__file__).resolve().parent
+
+HEADERS = [
+    "Proposal",
+    "Requested Ada",
+    "Meets approval threshold",
+    "Votes cast",
+    "Yes",
+    "Abstain",
+    "Status",
+    "Fund depletion",
+    "Reason for not funded status",
+]
+
+# 別プロセスで main() を動かし、最大 RSS（KiB）を最後の行に出す
+RUNNER = """
+import resource, sys
+sys.path.insert(0, sys.argv[1])
+from excel_to_json_f14 import main
+main(sys.argv[2:])
+own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+kids = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+print(f"MAXRSS {own} {kids}")
+"""
+
+
+def make_workbook(path: Path, sheets: int, rows: int, seed: int = 14) -> None:
+    """ハイパーリンク付きの Proposal 列と数値列を持つブックを write_only で作る。"""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+
+    rng = random.Random(seed)
+    wb = Workbook(write_only=True)
+    template = wb.create_sheet("Template")
+    template.append(HEADERS)
+    for s in range(sheets):
+        ws = wb.create_sheet(f"Challenge {s + 1}")
+        ws.append(HEADERS)
+        for i in range(rows):
+            if rng.random() < 0.01:
+                ws.append([None] * len(HEADERS))  # 空行（読み飛ばされる）
+                continue
+            title = WriteOnlyCell(ws, value=f"Synthetic proposal {s + 1}-{i + 1} " + "x" * rng.randint(0, 40))
+            title.hyperlink = f"https://projectcatalyst.io/funds/14/synthetic/{s + 1}-{i + 1}"
+            yes = rng.randint(0, 300_000_000)
+            ws.append(
+                [
+                    title,
+                    rng.randint(10_000, 2_000_000),
+                    rng.choice(["YES", "NO"]),
+                    rng.randint(0, 2000),
+                    yes,
+                    rng.randint(0, yes // 10 + 1),
+                    rng.choice(["FUNDED", "NOT FUNDED"]),
+                    rng.choice([rng.randint(0, 10_000_000), None]),
+                    rng.choice(["", "Over Budget", "Approval Threshold"]),
+                ]
+            )
+    wb.save(path)
+
+
+def run(workdir: Path, args: list[str]) -> tuple[float, int]:
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", RUNNER, str(TOOLS_DIR), *args],
+        cwd=workdir,
+        capture_output=True,
+        text=True,
+    )
+    seconds = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise SystemExit(proc.stderr)
+    own, kids = proc.stdout.strip().splitlines()[-1].split()[1:]
+    return seconds, max(int(own), int(kids))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Excel 読み込みのベンチマーク")
+    ap.add_argument("--rows", type=int, default=20000, help="1 シートあたりの行数")
+    ap.add_argument("--sheets", type=int, default=5)
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--skip-openpyxl", action="store_true", help="従来方式を測らない（大きいブック用）")
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        (workdir / "data").mkdir()
+        xlsx = workdir / "data" / "bench.xlsx"
+        t0 = time.perf_counter()
+        make_workbook(xlsx, args.sheets, args.rows)
+        size_mb = xlsx.stat().st_size / 1e6
+        print(
+            f"[bench_excel] {args.sheets} sheets x {args.rows} rows, {size_mb:.1f} MB "
+            f"(generated in {time.perf_counter() - t0:.1f}s)"
+        )
+
+        cases = []
+        if not args.skip_openpyxl:
+            cases.append(("openpyxl", ["--engine", "openpyxl"], "openpyxl.json"))
+        cases += [
+            ("stream -w1", ["--workers", "1", "--no-cache"], "w1.json"),
+            (f"stream -w{args.workers}", ["--workers", str(args.workers), "--no-cache"], "wn.json"),
+            ("stream (cold cache)", ["--workers", str(args.workers)], "cold.json"),
+            ("stream (cached)", ["--workers", str(args.workers)], "cached.json"),
+        ]
+
+        baseline = None
+        outputs = []
+        total_rows = args.sheets * args.rows
+        for label, extra, out in cases:
+            out_path = workdir / out
+            seconds, rss_kib = run(workdir, ["--input", str(xlsx), "--output", str(out_path), *extra])
+            baseline = baseline or seconds
+            outputs.append((label, out_path))
+            print(
+                f"  {label:<20} {seconds:7.2f} s  {total_rows / seconds:9.0f} rows/s  "
+                f"max RSS {rss_kib / 1024:7.1f} MiB  x{baseline / seconds:.2f}"
+            )
+
+        first_label, first = outputs[0]
+        for label, path in outputs[1:]:
+            if not filecmp.cmp(first, path, shallow=False):
+                raise SystemExit(f"[bench_excel] output of {label} differs from {first_label}")
+        print(f"[bench_excel] all outputs identical to {first_label}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# tools/bench_extract.py
+#
+# 保存済みの提案ページ（*.html）で、従来の抽出（legacy_extract）と
+# 1 パス抽出（extract_sections）の 1 ページあたりの解析時間を比べる。
+# --verify を付けると、各バックエンドの出力が従来と完全一致するかも確かめる。
+#
+#   python tools/bench_extract.py data/.http_cache --verify
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+from html_extract import available_backends, extract_sections, legacy_extract
+
+
+def time_pages(fn, pages, repeat: int) -> list[float]:
+    """ページごとの解析時間（ミリ秒, repeat 回の最小値）を返す。"""
+    times = []
+    for html in pages:
+        best = None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn(html)
+            dt = time.perf_counter() - t0
+            best = dt if best is None or dt < best else best
+        times.append(best * 1000)
+    return times
+
+
+def report(label: str, times: list[float], baseline: float | None) -> float:
+    mean = statistics.fmean(times)
+    p50 = statistics.median(times)
+    speedup = f"  x{baseline / mean:.2f}" if baseline else ""
+    print(f"  {label:<22} mean {mean:7.2f} ms  p50 {p50:7.2f} ms  max {max(times):7.2f} ms{speedup}")
+    return mean
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="HTML 抽出のベンチマーク")
+    ap.add_argument("pages_dir", type=Path, help="保存済み *.html のディレクトリ")
+    ap.add_argument("--limit", type=int, default=200)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--verify", action="store_true", help="出力が従来と一致するか確認する")
+    args = ap.parse_args(argv)
+
+    paths = sorted(args.pages_dir.glob("*.html"))[: args.limit]
+    if not paths:
+        raise SystemExit(f"No *.html in {args.pages_dir}")
+    pages = [p.read_text(encoding="utf-8") for p in paths]
+    print(f"[bench_extract] {len(pages)} pages, backends: {available_backends()}")
+
+    baseline = report("legacy (html.parser)", time_pages(legacy_extract, pages, args.repeat), None)
+    for backend in available_backends():
+        times = time_pages(lambda h: extract_sections(h, backend), pages, args.repeat)
+        report(f"1-pass {backend}", times, baseline)
+
+    if not args.verify:
+        return
+
+    mismatches = 0
+    for path, html in zip(paths, pages):
+        expected = legacy_extract(html)
+        for backend in available_backends():
+            got = extract_sections(html, backend)
+            diff = [k for k in expected if expected[k] != got.get(k)]
+            if diff:
+                mismatches += 1
+                print(f"  !! {path.name} [{backend}] differs in {diff}")
+    if mismatches:
+        raise SystemExit(f"[bench_extract] {mismatches} mismatches")
+    print("[bench_extract] all backends match legacy output")
+
+
+if __name__ == "__main__":
+    main()
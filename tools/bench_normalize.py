@@ -0,0 +1,119 @@
+# tools/bench_normalize.py
+#
+# 合成した raw ファイル（既定 10 万行）で、数値列の正規化を比べる。
+#   per-cell   : to_int を 1 セルずつ呼ぶ
+#   vectorized : int_column で列ごとに NumPy でまとめて変換する
+# 列の変換だけの時間と、prepare の iter_proposals 全体（読み込み込み）の時間を出し、
+# 両者の出力が一致するかも確かめる。
+#
+#   python tools/bench_normalize.py --rows 100000
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import prepare_f14_for_translation as prepare  # noqa: E402
+from normalize import int_column, np, to_int  # noqa: E402
+from records import iter_records, write_records  # noqa: E402
+
+
+def synthetic_rows(n: int, strings: float = 0.1, seed: int = 14):
+    """
+    Excel 由来の raw に近い行。数値は float が中心で、約 5% は空（None）。
+    strings の割合で "₳739,000" や "1,234" のような表示用の文字列を混ぜる。
+    """
+    rng = random.Random(seed)
+
+    def amount(hi: int):
+        v = rng.randint(0, hi)
+        r = rng.random()
+        if r < 0.05:
+            return None
+        if r < 0.05 + strings:
+            return rng.choice([f"₳{v:,}", f"{v:,}", "", "nan"])
+        return float(v)
+
+    for i in range(n):
+        yield {
+            "Proposal": f"Synthetic proposal {i}",
+            "Requested Ada": amount(2_000_000),
+            "Meets approval threshold": rng.choice(["YES", "NO"]),
+            "Votes cast": amount(2000),
+            "Yes": amount(300_000_000),
+            "Abstain": amount(30_000_000),
+            "Status": rng.choice(["FUNDED", "NOT FUNDED"]),
+            "Fund depletion": rng.choice([rng.randint(0, 10_000_000), None]),
+            "Reason for not funded status": "",
+            "Challenge": f"Challenge {i % 5}",
+            "Proposal URL": f"https://projectcatalyst.io/funds/14/synthetic/{i}",
+        }
+
+
+def best_of(fn, repeat: int) -> tuple[float, object]:
+    best, result = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None or dt < best else best
+    return best, result
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="数値列の正規化のベンチマーク")
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--strings", type=float, default=0.1, help="文字列で入っている数値セルの割合")
+    args = ap.parse_args(argv)
+
+    if np is None:
+        print("[bench_normalize] NumPy が入っていないので、vectorized も 1 セルずつの変換になります")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_path = Path(tmp) / "raw.json"
+        write_records(raw_path, synthetic_rows(args.rows, args.strings))
+        print(
+            f"[bench_normalize] {args.rows} rows, {args.strings:.0%} string cells, "
+            f"{raw_path.stat().st_size / 1e6:.1f} MB raw"
+        )
+
+        rows = list(iter_records(raw_path))
+        cols = list(prepare.INT_FIELDS.values())
+        columns = {c: [r.get(c) for r in rows] for c in cols}
+        cells = args.rows * len(cols)
+
+        t_cell, by_cell = best_of(
+            lambda: {c: [to_int(v) for v in vals] for c, vals in columns.items()}, args.repeat
+        )
+        t_vec, by_vec = best_of(
+            lambda: {c: int_column(vals) for c, vals in columns.items()}, args.repeat
+        )
+        if by_cell != by_vec:
+            raise SystemExit("[bench_normalize] vectorized result differs from per-cell")
+        print("  columns only")
+        print(f"    per-cell    {t_cell:7.3f} s  {cells / t_cell / 1e6:6.2f} M cells/s")
+        print(f"    vectorized  {t_vec:7.3f} s  {cells / t_vec / 1e6:6.2f} M cells/s  x{t_cell / t_vec:.2f}")
+
+        def run(vectorized: bool):
+            return list(prepare.iter_proposals(iter_records(raw_path), vectorized=vectorized))
+
+        t_cell_all, out_cell = best_of(lambda: run(False), 1)
+        t_vec_all, out_vec = best_of(lambda: run(True), 1)
+        if out_cell != out_vec:
+            raise SystemExit("[bench_normalize] iter_proposals output differs")
+        print("  iter_proposals (read + normalize)")
+        print(f"    per-cell    {t_cell_all:7.3f} s  {args.rows / t_cell_all:9.0f} rows/s")
+        print(
+            f"    vectorized  {t_vec_all:7.3f} s  {args.rows / t_vec_all:9.0f} rows/s  "
+            f"x{t_cell_all / t_vec_all:.2f}"
+        )
+        print("[bench_normalize] outputs identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# tools/bench_scrape_f14.py
+#
+# 保存済みの提案ページ（*.html）をローカル HTTP サーバで配信し、
+# scrape_one_f14.scrape_many のスループット（pages/sec）を測る。
+#
+#   python tools/bench_scrape_f14.py saved_pages/ --count 500
+
+import argparse
+import functools
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from scrape_one_f14 import make_session, scrape_many
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(directory: Path) -> ThreadingHTTPServer:
+    handler = functools.partial(QuietHandler, directory=str(directory))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_once(urls, concurrency: int, parse_workers: int, rate: float) -> float:
+    jobs = [(f"B-{i:06d}", url) for i, url in enumerate(urls)]
+    session = make_session(concurrency)
+    errors = 0
+    started = time.perf_counter()
+    for _pid, _res, err in scrape_many(
+        jobs,
+        concurrency=concurrency,
+        rate=rate,
+        parse_workers=parse_workers,
+        session=session,
+    ):
+        if err is not None:
+            errors += 1
+    elapsed = time.perf_counter() - started
+    if errors:
+        print(f"  !! {errors} errors")
+    return len(jobs) / elapsed if elapsed > 0 else 0.0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="scrape_many のローカルベンチマーク")
+    ap.add_argument("pages_dir", type=Path, help="保存済み *.html のディレクトリ")
+    ap.add_argument("--count", type=int, default=200, help="リクエストするページ数")
+    ap.add_argument("--rate", type=float, default=1000.0, help="req/sec per host")
+    ap.add_argument(
+        "--configs",
+        default="1x0,8x0,8x2,16x4",
+        help="concurrency x parse_workers のカンマ区切り",
+    )
+    args = ap.parse_args(argv)
+
+    pages = sorted(p.name for p in args.pages_dir.glob("*.html"))
+    if not pages:
+        raise SystemExit(f"No *.html in {args.pages_dir}")
+
+    server = serve(args.pages_dir)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [f"{base}/{pages[i % len(pages)]}" for i in range(args.count)]
+    print(f"[bench_scrape] {len(pages)} pages, {args.count} requests via {base}")
+
+    try:
+        for spec in args.configs.split(","):
+            concurrency, parse_workers = (int(x) for x in spec.split("x"))
+            pps = run_once(urls, concurrency, parse_workers, args.rate)
+            print(
+                f"  concurrency={concurrency:<3} parse_workers={parse_workers:<2} "
+                f"→ {pps:8.2f} pages/sec"
+            )
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,564 @@
+# tools/bench_suite.py
+#
+# 合成データでパイプラインの各ステージをまとめて測り、結果を残して前回と比べる。
+#
+# 規模（提案数）ごとにフィクスチャを作る（シードが同じなら毎回同じ中身）:
+#   f14_results.xlsx        excel_to_json_f14.py の入力（5 シート）
+#   f14_results_raw.json    prepare_f14_for_translation.py の入力
+#   f14_proposals_en.json   full_text_en / about_structured_en 入りの en（LLM ステージ・バンドル用）
+#   f14_proposals_ja.json   clean_ja_json.py とサイトのマージ用
+# 提案ページの HTML は番号から決定的に作り、ローカルの HTTP サーバで配信する。
+#
+# ステージは一時ディレクトリで tools/telemetry.py 経由の別プロセスとして走らせ、
+# 時間・CPU・最大 RSS・カウンタ（LLM の呼び出し数など）を集める。LLM のステージは
+# llm_stub_server.py のスタブ（決定的な返答）に向ける。HTML の抽出だけはこのプロセス内で測る。
+# ページの取得と LLM のステージは件数が多いと時間がかかるので、--max-pages / --llm-items で抑える。
+#
+#   data/bench/<日時>-<規模>.json   1 回分の結果（同じ規模の前回があれば続けて比べる）
+#   data/bench/fixtures/<規模>/     作ったフィクスチャ（次回はそのまま使う）
+#
+#   python tools/bench_suite.py --scale 1k
+#   python tools/bench_suite.py --scale 1k,10k,100k --targets excel,prepare,clean,site
+#   python tools/bench_suite.py --compare                  # 同じ規模の直近 2 回を比べる
+#   python tools/bench_suite.py --compare OLD.json NEW.json
+
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from bench_excel import make_workbook
+from bench_extract import time_pages
+from bench_normalize import prepare, synthetic_rows
+from html_extract import available_backends, extract_sections, legacy_extract
+from llm_stub_server import start_stub_server
+from records import iter_records, write_records
+
+ROOT = Path(__file__).resolve().parent.parent
+TOOLS_DIR = ROOT / "tools"
+BENCH_DIR = Path("data/bench")
+FIXTURES_DIR = BENCH_DIR / "fixtures"
+
+# 生成の中身を変えたら上げる（古いフィクスチャは作り直す）
+FIXTURE_VERSION = "1"
+SEED = 14
+SHEETS = 5
+
+# 前回より wall が THRESHOLD 以上、かつ MIN_DELTA 秒以上遅ければ後退とみなす
+THRESHOLD = 0.10
+MIN_DELTA = 0.05
+
+WORDS = (
+    "cardano catalyst community developer wallet stake pool governance treasury "
+    "voting proposal milestone budget open source library tooling education "
+    "onboarding africa japan latin america dapp smart contract plutus aiken "
+    "marlowe hydra mithril oracle identity privacy analytics dashboard api sdk "
+    "integration security audit testnet mainnet documentation workshop hackathon "
+    "research prototype scaling metadata token nft defi payments merchant "
+    "sustainability impact users adoption partners roadmap delivery team"
+).split()
+
+QUESTIONS = (
+    "Problem statement",
+    "Solution summary",
+    "Impact on the ecosystem",
+    "Capability and feasibility",
+    "Project milestones",
+    "Budget and costs",
+    "Value for money",
+)
+
+ABOUT_SECTIONS = (
+    "📌 Proposal Overview",
+    "🧩 Problem",
+    "💡 Solution",
+    "🌍 Impact",
+    "🛠 Feasibility",
+    "🗓 Milestones",
+    "💰 Budget",
+    "👥 Team",
+)
+
+
+def parse_scale(text: str) -> int:
+    """1k / 10k / 100k / 2500 のような書き方を件数にする。"""
+    text = text.strip().lower()
+    if text.endswith("k"):
+        return int(float(text[:-1]) * 1000)
+    return int(text)
+
+
+def scale_label(n: int) -> str:
+    return f"{n // 1000}k" if n % 1000 == 0 else str(n)
+
+
+def sentence(rng: random.Random, lo: int, hi: int) -> str:
+    words = rng.choices(WORDS, k=rng.randint(lo, hi))
+    return " ".join(words).capitalize() + "."
+
+
+def synthetic_doc(i: int, seed: int = SEED) -> dict:
+    """i 番目の提案の中身（ページ・full_text_en・about_structured_en の元）。番号だけで決まる。"""
+    rng = random.Random(seed * 1_000_003 + i)
+    return {
+        "title": f"Synthetic proposal {i} " + sentence(rng, 3, 8),
+        "sections": {key: sentence(rng, 15, 40) for key in ("problem", "solution", "about", "team")},
+        "qa": [(q, sentence(rng, 12, 30)) for q in QUESTIONS],
+        "about": [(title, sentence(rng, 10, 25)) for title in ABOUT_SECTIONS],
+    }
+
+
+def render_page(doc: dict) -> str:
+    """提案ページに似せた HTML（見出しのセクション・質問と回答・フッター）。"""
+    s = doc["sections"]
+    qa = "".join(
+        f'<div data-testid="question-answer"><h3>{q}</h3><div data-testid="answer"><p>{a}</p></div></div>'
+        for q, a in doc["qa"]
+    )
+    return (
+        f"<!DOCTYPE html><html><head><title>{doc['title']}</title>"
+        "<script>window.__NEXT_DATA__ = {};</script></head><body>"
+        f"<nav><a href='/'>Home</a></nav><main><h1>{doc['title']}</h1>"
+        f"<h2>Problem</h2><p>{s['problem']}</p><div>Total to date 123,456 ADA</div>"
+        f"<h2>Solution</h2><p>{s['solution']}</p>"
+        f"<h2>About this idea</h2><p>{s['about']}</p><p>{s['about']}</p>"
+        f"<h2>Team</h2><div>{s['team']}</div>"
+        f"<section>{qa}</section></main>"
+        "<footer><p>Follow us on X</p><p>Sign up to receive news</p></footer></body></html>"
+    )
+
+
+def full_text(doc: dict) -> str:
+    """render_page を抽出したときと同じ形の full_text_en。"""
+    return "\n\n".join(f"## {q}\n\n{a}" for q, a in doc["qa"])
+
+
+def about_markdown(doc: dict) -> str:
+    return "\n\n---\n\n".join(f"## {title}\n\n{body}" for title, body in doc["about"])
+
+
+# ---------------------------------------------------------------------------
+# フィクスチャ
+# ---------------------------------------------------------------------------
+
+
+def en_records(raw_path: Path, seed: int):
+    for i, p in enumerate(prepare.iter_proposals(iter_records(raw_path))):
+        doc = synthetic_doc(i, seed)
+        p["summary_en"] = doc["sections"]["problem"]
+        p["full_text_en"] = full_text(doc)
+        p["about_structured_en"] = about_markdown(doc)
+        yield p
+
+
+def ja_records(en_path: Path):
+    for p in iter_records(en_path):
+        yield {
+            "proposal_id": p["proposal_id"],
+            "title_ja": f"合成提案　{p['title_en'][:30]}",
+            "summary_ja": f"概要　{p['summary_en'][:60]}　です。",
+        }
+
+
+def build_fixtures(n: int, seed: int = SEED, regenerate: bool = False) -> Path:
+    """n 件分のフィクスチャを作って（あればそのまま）ディレクトリを返す。"""
+    out = FIXTURES_DIR / scale_label(n)
+    meta_path = out / "meta.json"
+    meta = {"scale": n, "seed": seed, "version": FIXTURE_VERSION}
+    if not regenerate and meta_path.exists():
+        if json.loads(meta_path.read_text(encoding="utf-8")) == meta:
+            return out
+    if out.exists():
+        shutil.rmtree(out)
+    out.mkdir(parents=True)
+
+    t0 = time.perf_counter()
+    # 空行が 1% ほど混ざるので、シートあたり少し多めに作る
+    make_workbook(out / "f14_results.xlsx", SHEETS, -(-n // SHEETS), seed)
+    write_records(out / "f14_results_raw.json", synthetic_rows(n, seed=seed))
+    write_records(out / "f14_proposals_en.json", en_records(out / "f14_results_raw.json", seed))
+    write_records(out / "f14_proposals_ja.json", ja_records(out / "f14_proposals_en.json"))
+    meta_path.write_text(json.dumps(meta), encoding="utf-8")
+    size_mb = sum(p.stat().st_size for p in out.iterdir()) / 1e6
+    print(f"[bench] fixtures for {scale_label(n)}: {size_mb:.1f} MB in {time.perf_counter() - t0:.1f}s → {out}")
+    return out
+
+
+# ---------------------------------------------------------------------------
+# 計測
+# ---------------------------------------------------------------------------
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """/p/<番号>.html を synthetic_doc から作って返す。"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        m = re.fullmatch(r"/p/(\d+)\.html", self.path)
+        if not m:
+            self.send_error(404)
+            return
+        body = render_page(synthetic_doc(int(m.group(1)), self.server.seed)).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve_pages(seed: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    server.daemon_threads = True
+    server.seed = seed
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class Bench:
+    """1 つの規模の計測。ターゲットごとに新しい作業ディレクトリを作って走らせる。"""
+
+    def __init__(self, n: int, fixtures: Path, args, tmp: Path):
+        self.n = n
+        self.fixtures = fixtures
+        self.args = args
+        self.tmp = tmp
+        self.seed = args.seed
+        self.pages = min(n, args.max_pages)
+        self.llm_items = min(n, args.llm_items)
+        self.env = {}
+
+    def workdir(self, name: str, files=(), en=None) -> Path:
+        """fixtures の files を data/ に写した作業ディレクトリ。en を渡したら en.json はそれで書く。"""
+        work = self.tmp / name.replace(":", "-")
+        (work / "data").mkdir(parents=True)
+        for fname in files:
+            shutil.copy(self.fixtures / fname, work / "data" / fname)
+        if en is not None:
+            write_records(work / "data" / "f14_proposals_en.json", en)
+        return work
+
+    def en_head(self, limit: int):
+        for i, p in enumerate(iter_records(self.fixtures / "f14_proposals_en.json")):
+            if i >= limit:
+                return
+            yield p
+
+    def run_stage(self, work: Path, name: str, script: str, args=(), items: int = 0) -> dict:
+        """script を telemetry.py 経由で走らせ、data/metrics の記録から結果をまとめる。"""
+        metrics_dir = work / "metrics"
+        cmd = [
+            sys.executable,
+            str(TOOLS_DIR / "telemetry.py"),
+            "--metrics-dir",
+            str(metrics_dir),
+            "run",
+            name,
+            str(ROOT / script),
+            *args,
+        ]
+        t0 = time.perf_counter()
+        proc = subprocess.run(
+            cmd, cwd=work, capture_output=True, text=True, env={**os.environ, **self.env}
+        )
+        process_seconds = time.perf_counter() - t0
+        if proc.returncode != 0:
+            tail = "\n".join((proc.stdout + proc.stderr).splitlines()[-20:])
+            raise RuntimeError(f"{name} failed (exit {proc.returncode}):\n{tail}")
+        m = json.loads((metrics_dir / f"{name}.json").read_text(encoding="utf-8"))
+        return {
+            "items": items,
+            "wall_seconds": m["wall_seconds"],
+            "process_seconds": round(process_seconds, 6),
+            "cpu_seconds": round(m["cpu_seconds"] + m["cpu_children_seconds"], 6),
+            "max_rss_mb": m["max_rss_mb"],
+            "counters": m["counters"],
+            "latency": {
+                key: {p: h[p] for p in ("p50", "p95", "p99")}
+                for key, h in m["histograms"].items()
+                if key in ("llm.latency", "http.latency")
+            },
+        }
+
+    # --- ターゲット（結果の dict を {名前: 結果} で返す） ---
+
+    def excel(self):
+        work = self.workdir("excel", ["f14_results.xlsx"])
+        args = ["--input", "data/f14_results.xlsx", "--no-cache"]
+        return {"excel": self.run_stage(work, "excel", "tools/excel_to_json_f14.py", args, self.n)}
+
+    def prepare(self):
+        work = self.workdir("prepare", ["f14_results_raw.json"])
+        return {"prepare": self.run_stage(work, "prepare", "prepare_f14_for_translation.py", (), self.n)}
+
+    def extract(self):
+        pages = [render_page(synthetic_doc(i, self.seed)) for i in range(self.pages)]
+        cases = [("legacy", legacy_extract)] + [
+            (backend, lambda html, b=backend: extract_sections(html, b))
+            for backend in available_backends()
+        ]
+        results = {}
+        for label, fn in cases:
+            cpu0 = time.process_time()
+            times = time_pages(fn, pages, 1)
+            results[f"extract:{label}"] = {
+                "items": len(pages),
+                "wall_seconds": round(sum(times) / 1000, 6),
+                "cpu_seconds": round(time.process_time() - cpu0, 6),
+            }
+        return results
+
+    def scrape(self):
+        server = serve_pages(self.seed)
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+
+        def jobs():
+            for i, p in enumerate(self.en_head(self.pages)):
+                yield {**p, "full_text_en": "", "proposal_url": f"{base}/p/{i}.html"}
+
+        work = self.workdir("scrape", en=jobs())
+        args = ["--max-items", str(self.pages), "--rate", "100000", "--no-cache"]
+        try:
+            return {"scrape": self.run_stage(work, "scrape", "tools/scrape_one_f14.py", args, self.pages)}
+        finally:
+            server.shutdown()
+
+    def format(self):
+        en = ({**p, "about_structured_en": ""} for p in self.en_head(self.llm_items))
+        work = self.workdir("format", en=en)
+        args = ["--max-proposals", "0"]
+        return {"format": self.run_stage(work, "format", "tools/format_about_with_llm.py", args, self.llm_items)}
+
+    def multilang(self):
+        work = self.workdir("multilang", en=self.en_head(self.llm_items))
+        return {
+            "multilang": self.run_stage(
+                work, "multilang", "tools/generate_multilang_about.py", (), self.llm_items
+            )
+        }
+
+    def translate(self):
+        work = self.workdir("translate", en=self.en_head(self.llm_items))
+        return {"translate": self.run_stage(work, "translate", "translate_sample.py", (), self.llm_items)}
+
+    def clean(self):
+        work = self.workdir("clean", ["f14_proposals_ja.json"])
+        return {"clean": self.run_stage(work, "clean", "clean_ja_json.py", (), self.n)}
+
+    def bundle(self):
+        work = self.workdir("bundle", ["f14_proposals_ja.json", "f14_proposals_en.json"])
+        shutil.copy(ROOT / "data" / "challenge_labels.json", work / "data")
+        args = ["--force"]
+        return {"bundle": self.run_stage(work, "bundle", "tools/build_site_bundle.py", args, self.n)}
+
+    def site(self):
+        """site/_data/f14.js のマージ（バンドルがないときの経路）を node で測る。"""
+        if shutil.which("node") is None:
+            print("  (node がないので site は飛ばす)")
+            return {}
+        work = self.workdir("site", ["f14_proposals_ja.json", "f14_proposals_en.json"])
+        shutil.copy(ROOT / "data" / "challenge_labels.json", work / "data")
+        (work / "site" / "_data").mkdir(parents=True)
+        shutil.copy(ROOT / "site" / "_data" / "f14.js", work / "site" / "_data")
+        script = (
+            "const t0 = process.hrtime.bigint();"
+            "const merged = require(process.argv[1]);"
+            "const ms = Number(process.hrtime.bigint() - t0) / 1e6;"
+            "console.log(JSON.stringify({ms, count: merged.length, "
+            "rss: process.resourceUsage().maxRSS}));"
+        )
+        t0 = time.perf_counter()
+        proc = subprocess.run(
+            ["node", "-e", script, str(work / "site" / "_data" / "f14.js")],
+            cwd=work,
+            capture_output=True,
+            text=True,
+        )
+        process_seconds = time.perf_counter() - t0
+        if proc.returncode != 0:
+            raise RuntimeError(f"site failed (exit {proc.returncode}):\n{proc.stderr[-2000:]}")
+        out = json.loads(proc.stdout.strip().splitlines()[-1])
+        return {
+            "site": {
+                "items": out["count"],
+                "wall_seconds": round(out["ms"] / 1000, 6),
+                "process_seconds": round(process_seconds, 6),
+                # process.resourceUsage().maxRSS は KiB
+                "max_rss_mb": round(out["rss"] / 1024, 1),
+            }
+        }
+
+
+TARGETS = ("excel", "prepare", "extract", "scrape", "format", "multilang", "translate", "clean", "bundle", "site")
+LLM_TARGETS = {"format", "multilang", "translate"}
+
+
+def git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        )
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def run_scale(n: int, targets: list[str], args) -> dict:
+    fixtures = build_fixtures(n, args.seed, args.regenerate)
+    result = {
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "scale": n,
+        "seed": args.seed,
+        "fixture_version": FIXTURE_VERSION,
+        "max_pages": args.max_pages,
+        "llm_items": args.llm_items,
+        "stub_latency": args.stub_latency,
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "targets": {},
+    }
+    stub = None
+    with tempfile.TemporaryDirectory(prefix="f14-bench-") as tmp:
+        bench = Bench(n, fixtures, args, Path(tmp))
+        if LLM_TARGETS & set(targets):
+            stub = start_stub_server(latency=args.stub_latency)
+            # 返答キャッシュは切って、毎回スタブまで届くようにする
+            bench.env = {"OPENAI_BASE_URL": stub.base_url, "LLM_CACHE": "0"}
+        try:
+            for name in targets:
+                for label, r in getattr(bench, name)().items():
+                    result["targets"][label] = r
+                    print_row(label, r)
+        finally:
+            if stub is not None:
+                stub.shutdown()
+    return result
+
+
+def print_row(label: str, r: dict) -> None:
+    rate = r["items"] / r["wall_seconds"] if r["wall_seconds"] else 0.0
+    rss = f"{r['max_rss_mb']:7.1f} MiB" if r.get("max_rss_mb") is not None else " " * 11
+    llm = int(r.get("counters", {}).get("llm.requests", 0))
+    print(
+        f"  {label:20} {r['items']:7d} items {r['wall_seconds']:8.2f} s {rate:10.0f} /s  {rss}"
+        + (f"  llm={llm}" if llm else "")
+    )
+
+
+# ---------------------------------------------------------------------------
+# 比較
+# ---------------------------------------------------------------------------
+
+
+def result_files(scale: int | None = None) -> list[Path]:
+    paths = sorted(BENCH_DIR.glob("*.json"))
+    if scale is None:
+        return paths
+    return [p for p in paths if json.loads(p.read_text(encoding="utf-8")).get("scale") == scale]
+
+
+def compare(old_path: Path, new_path: Path) -> int:
+    """ターゲットごとに wall を比べて表にする。後退したターゲットの数を返す。"""
+    old = json.loads(Path(old_path).read_text(encoding="utf-8"))
+    new = json.loads(Path(new_path).read_text(encoding="utf-8"))
+    print(
+        f"[bench] {old_path.name} ({old.get('commit')}) → {new_path.name} ({new.get('commit')}), "
+        f"scale {scale_label(new['scale'])}"
+    )
+    if old["scale"] != new["scale"]:
+        print(f"  !! scales differ: {old['scale']} vs {new['scale']}")
+    regressions = 0
+    for label in [t for t in new["targets"] if t in old["targets"]]:
+        a, b = old["targets"][label], new["targets"][label]
+        if a["items"] != b["items"]:
+            print(f"  {label:20} items differ ({a['items']} → {b['items']}), skipped")
+            continue
+        delta = b["wall_seconds"] - a["wall_seconds"]
+        ratio = b["wall_seconds"] / a["wall_seconds"] if a["wall_seconds"] else 1.0
+        mark = ""
+        if ratio - 1 >= THRESHOLD and delta >= MIN_DELTA:
+            mark = "  !! slower"
+            regressions += 1
+        elif 1 - ratio >= THRESHOLD and -delta >= MIN_DELTA:
+            mark = "  faster"
+        print(f"  {label:20} {a['wall_seconds']:8.2f} s → {b['wall_seconds']:8.2f} s  x{ratio:.2f}{mark}")
+    for label in new["targets"].keys() - old["targets"].keys():
+        print(f"  {label:20} (new)")
+    return regressions
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="合成データでパイプラインのステージを測る")
+    ap.add_argument("--scale", default="1k", help="提案数（カンマ区切りで複数。例: 1k,10k,100k）")
+    ap.add_argument("--targets", default=",".join(TARGETS), help=f"測るもの（{', '.join(TARGETS)}）")
+    ap.add_argument("--max-pages", type=int, default=2000, help="extract / scrape で使うページ数の上限")
+    ap.add_argument("--llm-items", type=int, default=200, help="LLM のステージに通す提案数の上限")
+    ap.add_argument(
+        "--stub-latency",
+        default="0",
+        help="スタブの 1 リクエストあたりの遅延（秒。lognormal:0.8,0.5 のような分布も書ける）",
+    )
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--regenerate", action="store_true", help="フィクスチャを作り直す")
+    ap.add_argument(
+        "--compare",
+        nargs="*",
+        type=Path,
+        metavar="RESULT",
+        help="測らずに比べる（省略すると同じ規模の直近 2 回）",
+    )
+    return ap.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scales = [parse_scale(s) for s in args.scale.split(",") if s.strip()]
+
+    if args.compare is not None:
+        if len(args.compare) == 2:
+            pairs = [tuple(args.compare)]
+        elif not args.compare:
+            pairs = []
+            for n in scales:
+                runs = result_files(n)
+                if len(runs) < 2:
+                    print(f"[bench] fewer than 2 results for {scale_label(n)} in {BENCH_DIR}")
+                    continue
+                pairs.append((runs[-2], runs[-1]))
+        else:
+            raise SystemExit("--compare takes no or two result files")
+        regressions = sum(compare(old, new) for old, new in pairs)
+        raise SystemExit(1 if regressions else 0)
+
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    unknown = [t for t in targets if t not in TARGETS]
+    if unknown:
+        raise SystemExit(f"Unknown target: {', '.join(unknown)} (choose from {', '.join(TARGETS)})")
+
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    for n in scales:
+        previous = result_files(n)
+        print(f"[bench] scale {scale_label(n)}: {', '.join(targets)}")
+        result = run_scale(n, targets, args)
+        path = BENCH_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}-{scale_label(n)}.json"
+        path.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"[bench] saved → {path}")
+        if previous:
+            compare(previous[-1], path)
+
+
+if __name__ == "__main__":
+    main()
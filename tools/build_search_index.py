@@ -0,0 +1,186 @@
+# tools/build_search_index.py
+#
+# index.html の検索用に、日英の転置インデックス（data/search/index.json）を作る。
+#
+# - 英語（ラテン文字・数字）は単語、日本語（かな・漢字）は文字 bigram に分ける
+#   （1 文字だけの日本語は unigram）。分け方は search.js の tokenize と同じにしておくこと
+# - 語ごとのポスティングは [文書番号の差分, スコア, 差分, スコア, ...] の配列
+#   （差分にすると数字が小さくなり、JSON でも gzip でも小さくなる）
+# - スコアは SEARCH_FIELDS の重み × 出現回数の合計（MAX_SCORE で頭打ち）
+#
+# 提案ごとの語とスコアは data/.search_cache.json に取っておき、
+# 対象フィールドが変わった提案だけトークナイズし直す。
+#
+#   python tools/build_site_bundle.py && python tools/build_search_index.py
+
+import argparse
+import hashlib
+import json
+import re
+import time
+import unicodedata
+from collections import Counter
+from pathlib import Path
+
+from export_site_shards import ShardWriter
+from journal import atomic_write_json
+from records import iter_records
+
+DATA_DIR = Path("data")
+BUNDLE_FILE = DATA_DIR / "f14_site_bundle.json"
+SEARCH_DIR = DATA_DIR / "search"
+CACHE_FILE = DATA_DIR / ".search_cache.json"
+
+# 検索するフィールドと重み
+SEARCH_FIELDS = {
+    "title_en": 4,
+    "title_ja": 4,
+    "summary_ja": 2,
+    "about_structured_en": 1,
+    "about_structured_ja": 1,
+}
+MAX_SCORE = 255
+
+# トークナイザを変えたら上げる（キャッシュと search.js の互換性の確認に使う）
+INDEX_VERSION = 1
+
+# ラテン文字の単語と、かな・漢字の並び（NFKC・小文字化の後に当てる）
+TOKEN_RE = re.compile(
+    r"[0-9a-z\u00c0-\u024f]+|[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\u3005\u3006]+"
+)
+# これ以降の文字で始まる並びは日本語として bigram にする
+CJK_START = "\u3040"
+
+# 英語のよくある語（どの提案にも出てきて絞り込みに効かない）
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in into is it its of on or our "
+    "that the their this to we will with".split()
+)
+
+
+def tokenize(text: str):
+    """検索語の列。日本語の並びは bigram、英語は 2 文字以上の単語（STOPWORDS を除く）。"""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    for m in TOKEN_RE.finditer(text):
+        run = m.group()
+        if run[0] >= CJK_START:
+            if len(run) == 1:
+                yield run
+            else:
+                for i in range(len(run) - 1):
+                    yield run[i : i + 2]
+        elif (len(run) >= 2 or run.isdigit()) and run not in STOPWORDS:
+            yield run
+
+
+def doc_terms(rec: dict) -> dict[str, int]:
+    """1 提案分の 語 → スコア。"""
+    scores: Counter = Counter()
+    for name, weight in SEARCH_FIELDS.items():
+        value = rec.get(name)
+        if isinstance(value, str):
+            for term in tokenize(value):
+                scores[term] += weight
+    return {t: min(s, MAX_SCORE) for t, s in scores.items()}
+
+
+def doc_hash(rec: dict) -> str:
+    blob = json.dumps(
+        [INDEX_VERSION] + [rec.get(name) for name in SEARCH_FIELDS], ensure_ascii=False
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def load_cache(path: Path) -> dict:
+    try:
+        cache = json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+    return cache.get("docs", {}) if cache.get("version") == INDEX_VERSION else {}
+
+
+def build_index(records, cache: dict) -> tuple[dict, dict, dict]:
+    """
+    (インデックス, 新しいキャッシュ, 件数) を返す。
+    キャッシュのハッシュが同じ提案はトークナイズせずにそのまま使う。
+    """
+    docs: list[str] = []
+    postings: dict[str, list[tuple[int, int]]] = {}
+    new_cache = {}
+    counts = {"docs": 0, "tokenized": 0, "reused": 0}
+
+    for rec in records:
+        pid = rec.get("proposal_id")
+        if not pid:
+            continue
+        h = doc_hash(rec)
+        hit = cache.get(pid)
+        if hit and hit[0] == h:
+            terms = hit[1]
+            counts["reused"] += 1
+        else:
+            terms = doc_terms(rec)
+            counts["tokenized"] += 1
+        new_cache[pid] = [h, terms]
+
+        n = len(docs)
+        docs.append(pid)
+        for term, score in terms.items():
+            postings.setdefault(term, []).append((n, score))
+
+    encoded = {}
+    for term in sorted(postings):
+        flat = []
+        prev = 0
+        for n, score in postings[term]:
+            flat += (n - prev, score)
+            prev = n
+        encoded[term] = flat
+
+    counts["docs"] = len(docs)
+    counts["terms"] = len(encoded)
+    index = {
+        "version": INDEX_VERSION,
+        "fields": SEARCH_FIELDS,
+        "docs": docs,
+        "terms": encoded,
+    }
+    return index, new_cache, counts
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="日英の検索インデックスを作る")
+    ap.add_argument("--input", type=Path, default=BUNDLE_FILE, help="tools/build_site_bundle.py の出力")
+    ap.add_argument("--output-dir", type=Path, default=SEARCH_DIR)
+    ap.add_argument("--cache", type=Path, default=CACHE_FILE)
+    ap.add_argument("--full", action="store_true", help="キャッシュを使わずに全件トークナイズする")
+    return ap.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.input.exists():
+        raise SystemExit(f"{args.input} not found; run: python tools/build_site_bundle.py")
+
+    t0 = time.perf_counter()
+    cache = {} if args.full else load_cache(args.cache)
+    index, new_cache, counts = build_index(iter_records(args.input), cache)
+
+    writer = ShardWriter(args.output_dir)
+    writer.write("index.json", index)
+    atomic_write_json(args.cache, {"version": INDEX_VERSION, "docs": new_cache}, indent=None)
+
+    raw, gz, br = writer.sizes["index.json"]
+    print(
+        f"[search] {counts['docs']} proposals, {counts['terms']} terms "
+        f"(tokenized={counts['tokenized']} reused={counts['reused']}, "
+        f"{time.perf_counter() - t0:.2f}s)"
+    )
+    print(
+        f"[search] {args.output_dir / 'index.json'} {raw / 1024:.0f} KiB, "
+        f"gzip {gz / 1024:.0f} KiB, brotli {br / 1024:.0f} KiB"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# tools/build_site_bundle.py
+#
+# サイト用のバンドル（data/f14_site_bundle.json）を作る。
+#
+# 以前は Eleventy のビルドのたびに site/_data/f14.js が ja / en の JSON を丸ごと読み、
+# Map を作って 2 回スプレッドし、challenge のラベルを付け替えていた。
+# ここで一度だけマージしておき、テンプレートが使うフィールド（SITE_FIELDS）だけを
+# 1 つの配列にして書き出す。f14.js はこれを読むだけになる。
+#
+# 入力（ja / en / ラベル / このスクリプト）が前回と同じなら何もしない。
+#
+#   python tools/build_site_bundle.py
+#   python tools/build_site_bundle.py --force
+
+import argparse
+import hashlib
+import json
+import time
+from pathlib import Path
+
+from journal import atomic_write_json
+from pipeline import FileHasher
+from records import iter_records
+
+DATA_DIR = Path("data")
+JA_FILE = DATA_DIR / "f14_proposals_ja.json"
+EN_FILE = DATA_DIR / "f14_proposals_en.json"
+LABELS_FILE = DATA_DIR / "challenge_labels.json"
+BUNDLE_FILE = DATA_DIR / "f14_site_bundle.json"
+
+# site/*.njk が参照するフィールド（テンプレートで使うものを足したらここにも足す）
+SITE_FIELDS = (
+    "proposal_id",
+    "fund",
+    "challenge",
+    "title_ja",
+    "title_en",
+    "summary_ja",
+    "status",
+    "requested_ada",
+    "votes_cast",
+    "yes_amount",
+    "abstain_amount",
+    "meets_approval_threshold",
+    "fund_depletion",
+    "not_funded_reason",
+    "proposal_url",
+    "problem_en",
+    "solution_en",
+    "team_en",
+    "about_en",
+    "about_ja",
+    "about_structured_en",
+    "about_structured_ja",
+    "about_structured_ja_elp",
+    "about_structured_es_elp",
+)
+
+
+def load_labels(path: Path = LABELS_FILE) -> dict[str, str]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def merge_record(ja: dict, en: dict, labels: dict[str, str]) -> dict:
+    """f14.js と同じ規則（EN の上に JA を重ね、challenge をラベルに）で SITE_FIELDS だけ残す。"""
+    out = {}
+    for name in SITE_FIELDS:
+        if name in ja:
+            out[name] = ja[name]
+        elif name in en:
+            out[name] = en[name]
+    if "challenge" in out:
+        out["challenge"] = labels.get(out["challenge"]) or out["challenge"]
+    return out
+
+
+def build_bundle(ja_path: Path, en_path: Path, labels: dict[str, str]):
+    """JA の並び順で、マージしたレコードを 1 件ずつ返す。EN は必要なフィールドだけ持つ。"""
+    en_by_id = {}
+    if en_path.exists():
+        for rec in iter_records(en_path):
+            en_by_id[rec.get("proposal_id")] = {k: rec[k] for k in SITE_FIELDS if k in rec}
+    for rec in iter_records(ja_path):
+        yield merge_record(rec, en_by_id.get(rec.get("proposal_id"), {}), labels)
+
+
+def inputs_key(paths: list[Path], hasher: FileHasher) -> str:
+    """入力ファイル・SITE_FIELDS・このスクリプトから決まるキー。"""
+    h = hashlib.sha256()
+    h.update(Path(__file__).read_bytes())
+    h.update(json.dumps(SITE_FIELDS).encode("utf-8"))
+    for path in paths:
+        h.update(f"{path}\0{hasher(path)}\0".encode("utf-8"))
+    return h.hexdigest()
+
+
+def load_stamp(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="サイト用に ja / en をマージしたバンドルを作る")
+    ap.add_argument("--ja", type=Path, default=JA_FILE)
+    ap.add_argument("--en", type=Path, default=EN_FILE)
+    ap.add_argument("--labels", type=Path, default=LABELS_FILE)
+    ap.add_argument("--output", type=Path, default=BUNDLE_FILE)
+    ap.add_argument("--force", action="store_true", help="入力が変わっていなくても作り直す")
+    return ap.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.ja.exists():
+        raise FileNotFoundError(args.ja)
+
+    # 前回の入力のキー（data/.f14_site_bundle.stamp.json）
+    stamp_file = args.output.with_name(f".{args.output.stem}.stamp.json")
+    stamp = load_stamp(stamp_file)
+    # (サイズ, mtime) が同じ入力はハッシュを取り直さない
+    hasher = FileHasher(stamp.get("files"))
+    key = inputs_key([args.ja, args.en, args.labels], hasher)
+
+    if not args.force and args.output.exists() and stamp.get("key") == key:
+        print(f"[site_bundle] {args.output} is up to date")
+        return
+
+    t0 = time.perf_counter()
+    labels = load_labels(args.labels)
+    bundle = list(build_bundle(args.ja, args.en, labels))
+    # サイトが読むだけなので、インデントなしで小さく書く
+    atomic_write_json(args.output, bundle, indent=None)
+    atomic_write_json(stamp_file, {"key": key, "files": hasher.cache})
+
+    size = args.output.stat().st_size
+    print(
+        f"[site_bundle] {len(bundle)} proposals, {len(SITE_FIELDS)} fields → {args.output} "
+        f"({size / 1e6:.2f} MB, {time.perf_counter() - t0:.2f}s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
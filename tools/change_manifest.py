@@ -0,0 +1,220 @@
+# tools/change_manifest.py
+#
+# 提案ごと・フィールドごとのハッシュを並べたマニフェストと、前回との差分を書き出す。
+#
+#   data/manifests/<name>.json       proposal_id → {"hash": ..., "fields": {フィールド: ハッシュ}}
+#   data/manifests/<name>.diff.json  前回のマニフェストとの差分（追加・削除・変わったフィールド）
+#   data/manifests/acks/<name>.<consumer>.json
+#                                    consumer が最後に処理し終えたときのマニフェスト（acknowledge()）
+#
+# name は SOURCES のどれか:
+#   site : サイトバンドル（テンプレートが描くフィールド）。site/_data/f14_pages.js が
+#          これを見て、変わった提案のページだけを作り直す
+#   en   : f14_proposals_en.json。後段のステージ（generate_multilang_about.py など）が
+#          changed_ids(consumer=...) で「元のフィールドが変わった提案」を選び直すのに使う
+#
+# diff.json は直前の 1 回分しか持たないので、consumer が毎回走るとは限らない場合は
+# consumer ごとの控えと今のマニフェストを比べる（途中の更新を飛ばしても変更を取りこぼさない）。
+# サイト（site/_data/f14_pages.js）も同じく、前回ビルドしたときの控えと比べている。
+#
+#   python tools/change_manifest.py site
+#   python tools/change_manifest.py en --show
+
+import argparse
+import hashlib
+import json
+import time
+from pathlib import Path
+
+from journal import atomic_write_json
+from records import iter_records
+
+DATA_DIR = Path("data")
+MANIFEST_DIR = DATA_DIR / "manifests"
+
+SOURCES = {
+    "site": DATA_DIR / "f14_site_bundle.json",
+    "en": DATA_DIR / "f14_proposals_en.json",
+}
+
+# ハッシュの長さ（hex）。提案数に対して十分に長い
+HASH_CHARS = 16
+
+
+def value_hash(value) -> str:
+    blob = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:HASH_CHARS]
+
+
+def record_entry(rec: dict, fields=None) -> dict:
+    """1 提案分。fields を渡せばそのフィールドだけを見る。"""
+    names = [k for k in rec if fields is None or k in fields]
+    hashes = {name: value_hash(rec[name]) for name in sorted(names)}
+    return {"hash": value_hash(hashes), "fields": hashes}
+
+
+def build_manifest(records, fields=None) -> dict[str, dict]:
+    manifest = {}
+    for rec in records:
+        pid = rec.get("proposal_id")
+        if pid:
+            manifest[pid] = record_entry(rec, fields)
+    return manifest
+
+
+def diff_manifests(old: dict[str, dict], new: dict[str, dict]) -> dict:
+    """
+    {"added": [...], "removed": [...], "changed": {pid: [フィールド, ...]}, "unchanged": 件数}
+    changed のフィールドには、値が変わったものに加えて増えた・消えたものも入る。
+    """
+    added, changed = [], {}
+    unchanged = 0
+    for pid, entry in new.items():
+        before = old.get(pid)
+        if before is None:
+            added.append(pid)
+            continue
+        if before["hash"] == entry["hash"]:
+            unchanged += 1
+            continue
+        a, b = before["fields"], entry["fields"]
+        changed[pid] = sorted(k for k in a.keys() | b.keys() if a.get(k) != b.get(k))
+    removed = [pid for pid in old if pid not in new]
+    return {"added": added, "removed": removed, "changed": changed, "unchanged": unchanged}
+
+
+def manifest_path(name: str, root: Path = MANIFEST_DIR) -> Path:
+    return root / f"{name}.json"
+
+
+def diff_path(name: str, root: Path = MANIFEST_DIR) -> Path:
+    return root / f"{name}.diff.json"
+
+
+def _load(path: Path) -> dict | None:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+def load_manifest(name: str, root: Path = MANIFEST_DIR) -> dict[str, dict]:
+    data = _load(manifest_path(name, root))
+    return data["proposals"] if data else {}
+
+
+def ack_path(name: str, consumer: str, root: Path = MANIFEST_DIR) -> Path:
+    return root / "acks" / f"{name}.{consumer}.json"
+
+
+def load_diff(name: str, root: Path = MANIFEST_DIR) -> dict | None:
+    return _load(diff_path(name, root))
+
+
+def changed_ids(
+    name: str, fields=None, root: Path = MANIFEST_DIR, consumer: str | None = None
+) -> set[str] | None:
+    """
+    前回のマニフェストから変わった提案（追加されたものを含む）。
+    fields を渡せば、そのどれかが変わった提案だけ。差分がまだなければ None。
+    consumer を渡せば、その consumer が最後に acknowledge() したマニフェストと今のものを比べる
+    （控えがまだなければ直前の差分を使う）。
+    """
+    diff = None
+    if consumer is not None:
+        acked = _load(ack_path(name, consumer, root))
+        current = _load(manifest_path(name, root))
+        if acked is not None and current is not None:
+            diff = diff_manifests(acked["proposals"], current["proposals"])
+    if diff is None:
+        diff = load_diff(name, root)
+    if diff is None:
+        return None
+    ids = set(diff["added"])
+    for pid, names in diff["changed"].items():
+        if fields is None or set(names) & set(fields):
+            ids.add(pid)
+    return ids
+
+
+def acknowledge(name: str, consumer: str, pending=(), root: Path = MANIFEST_DIR) -> None:
+    """
+    consumer が今のマニフェストまで処理し終えたことを控える。
+    pending の提案（失敗したものなど）は前回の控えのままにして、次の changed_ids() にも出す。
+    """
+    current = _load(manifest_path(name, root))
+    if current is None:
+        return
+    proposals = dict(current["proposals"])
+    pending = set(pending)
+    if pending:
+        acked = _load(ack_path(name, consumer, root))
+        before = acked["proposals"] if acked else {}
+        for pid in pending:
+            if pid in before:
+                proposals[pid] = before[pid]
+            else:
+                proposals.pop(pid, None)
+    path = ack_path(name, consumer, root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_json(path, {**current, "proposals": proposals}, indent=None)
+
+
+def update(name: str, records, fields=None, root: Path = MANIFEST_DIR) -> dict:
+    """マニフェストを作り直し、前回との差分と一緒に書く。差分を返す。"""
+    root.mkdir(parents=True, exist_ok=True)
+    previous = _load(manifest_path(name, root))
+    new = build_manifest(records, fields)
+    diff = diff_manifests(previous["proposals"] if previous else {}, new)
+    now = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    diff = {
+        "name": name,
+        "generated": now,
+        "previous": previous["generated"] if previous else None,
+        **diff,
+    }
+    # 差分を先に書く（マニフェストだけ進んで差分が失われることがないように）
+    atomic_write_json(diff_path(name, root), diff)
+    atomic_write_json(
+        manifest_path(name, root), {"name": name, "generated": now, "proposals": new}, indent=None
+    )
+    return diff
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="提案ごと・フィールドごとのハッシュと差分を書き出す")
+    ap.add_argument("names", nargs="*", default=["site"], help=f"{' / '.join(SOURCES)}")
+    ap.add_argument("--input", type=Path, help="SOURCES 以外のファイル（names は 1 つだけ）")
+    ap.add_argument("--output-dir", type=Path, default=MANIFEST_DIR)
+    ap.add_argument("--show", action="store_true", help="変わった提案とフィールドを表示する")
+    return ap.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.input and len(args.names) != 1:
+        raise SystemExit("--input needs exactly one name")
+
+    for name in args.names:
+        path = args.input or SOURCES.get(name)
+        if path is None:
+            raise SystemExit(f"unknown manifest: {name} (choose from {', '.join(SOURCES)})")
+        if not path.exists():
+            print(f"[manifest] {path} not found, skip {name}")
+            continue
+        diff = update(name, iter_records(path), root=args.output_dir)
+        print(
+            f"[manifest] {name}: +{len(diff['added'])} -{len(diff['removed'])} "
+            f"~{len(diff['changed'])} ={diff['unchanged']} → {diff_path(name, args.output_dir)}"
+        )
+        if args.show:
+            for pid, names in diff["changed"].items():
+                print(f"  ~ {pid}: {', '.join(names)}")
+            for pid in diff["added"]:
+                print(f"  + {pid}")
+            for pid in diff["removed"]:
+                print(f"  - {pid}")
+
+
+if __name__ == "__main__":
+    main()
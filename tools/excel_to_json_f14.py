@@ -1,9 +1,34 @@
 # excel_to_json_f14.py
+#
+# 既定ではシートの XML を行ごとにストリームで読み（tools/xlsx_stream.py）、
+# シートごとにプロセスプールで並列に変換する。
+# シートの変換結果は data/.xlsx_cache/ に JSONL で残し、
+# XML パーツ（シート本体・関係ファイル・共有文字列・スタイル）が変わっていないシートは読み直さない。
+#
+#   python tools/excel_to_json_f14.py                  # ストリーム読み込み（既定）
+#   python tools/excel_to_json_f14.py --engine openpyxl  # 従来の load_workbook 版
 
-import json
+import argparse
+import hashlib
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-from openpyxl import load_workbook
+from records import iter_records, write_records
+from xlsx_stream import (
+    date_styles,
+    iter_rows,
+    list_sheets,
+    read_shared_strings,
+    rels_path,
+    shared_strings_part,
+    sheet_extras,
+    styles_part,
+    workbook_epoch,
+    workbook_part,
+)
 
 DATA_DIR = Path("data")
 
@@ -16,6 +41,12 @@ OUTPUT_FILE = DATA_DIR / "f14_results_raw.json"
 # テンプレートタブなど、読み飛ばしたいシート名
 SKIP_SHEETS = {"Template", "テンプレート"}
 
+# シートごとの変換結果のキャッシュ
+SHEET_CACHE_DIR = DATA_DIR / ".xlsx_cache"
+
+# シートを並列に変換するプロセス数
+SHEET_WORKERS = min(4, os.cpu_count() or 1)
+
 
 def cell_text(value):
     """Excelセルの値をJSON向けに安全に文字列/数値として返す."""
@@ -26,13 +57,14 @@ def cell_text(value):
 
 
 def sheet_to_rows(ws):
-    """1つのシートを [{'col': value, ...}, ...] に変換する."""
-    rows = list(ws.rows)
-    if not rows:
-        return []
+    """1つのシートの各行を {'col': value, ...} として 1 件ずつ返す."""
+    rows = ws.rows
+    first = next(rows, None)
+    if first is None:
+        return
 
     # 1行目をヘッダとして扱う
-    headers = [str(c.value).strip() if c.value is not None else "" for c in rows[0]]
+    headers = [str(c.value).strip() if c.value is not None else "" for c in first]
 
     # Proposal 列のインデックスを特定（ハイパーリンク用）
     try:
@@ -40,8 +72,7 @@ def sheet_to_rows(ws):
     except ValueError:
         proposal_col_idx = None
 
-    data_rows = []
-    for r_idx, row in enumerate(rows[1:], start=2):  # 2行目以降がデータ
+    for row in rows:  # 2行目以降がデータ
         row_dict = {}
         empty_row = True
 
@@ -70,35 +101,209 @@ def sheet_to_rows(ws):
                 url = cell.hyperlink.target
             row_dict["Proposal URL"] = url
 
-        data_rows.append(row_dict)
+        yield row_dict
+
+
+def sheet_record(title, headers, proposal_col, values, link):
+    """1 行分の {'col': value, ...}（sheet_to_rows と同じ形）。空行なら None。"""
+    row_dict = {}
+    empty_row = True
+    for col, key in headers:
+        value = cell_text(values.get(col))
+        if value is not None and value != "":
+            empty_row = False
+        row_dict[key] = value
+
+    if empty_row:
+        return None
+
+    row_dict["Challenge"] = title
+    if proposal_col is not None:
+        row_dict["Proposal URL"] = link or ""
+    return row_dict
+
+
+def iter_sheet_records(zf, title: str, part: str, shared, dates, epoch):
+    """ストリーム版の sheet_to_rows。1 行目をヘッダにして 2 行目以降を 1 件ずつ返す。"""
+    links, merged = sheet_extras(zf, part)
+    headers: list[tuple[int, str]] = []
+    proposal_col = None
+
+    for row, values in iter_rows(zf, part, shared, dates, epoch):
+        if merged:
+            # 結合セルは左上以外の値を持たない（openpyxl と同じ）
+            for r1, c1, r2, c2 in merged:
+                if r1 <= row <= r2:
+                    for col in list(values):
+                        if c1 <= col <= c2 and (row, col) != (r1, c1):
+                            del values[col]
+        if row == 1:
+            for col in range(1, max(values, default=0) + 1):
+                value = values.get(col)
+                key = str(value).strip() if value is not None else ""
+                if key:
+                    headers.append((col, key))
+                    if key == "Proposal" and proposal_col is None:
+                        proposal_col = col
+            continue
+        if not headers:
+            continue
+        link = links.get((row, proposal_col)) if proposal_col is not None else None
+        rec = sheet_record(title, headers, proposal_col, values, link)
+        if rec is not None:
+            yield rec
+
+
+_workbook_cache: dict = {}
+
+
+def _workbook_tables(xlsx: Path):
+    """共有文字列などはプロセスごとに 1 回だけ読む。"""
+    st = xlsx.stat()
+    key = (str(xlsx), st.st_size, st.st_mtime_ns)
+    if key not in _workbook_cache:
+        _workbook_cache.clear()
+        with zipfile.ZipFile(xlsx) as zf:
+            _workbook_cache[key] = (
+                read_shared_strings(zf),
+                date_styles(zf),
+                workbook_epoch(zf),
+            )
+    return _workbook_cache[key]
 
-    return data_rows
 
+def convert_sheet(xlsx: Path, title: str, part: str, out: Path) -> tuple[str, int, float]:
+    """1 シートを JSONL に書き出す（プロセスプールのワーカーで動く）。"""
+    started = time.perf_counter()
+    shared, dates, epoch = _workbook_tables(xlsx)
+    with zipfile.ZipFile(xlsx) as zf:
+        count = write_records(out, iter_sheet_records(zf, title, part, shared, dates, epoch))
+    return title, count, time.perf_counter() - started
 
-def main():
-    if not EXCEL_FILE.exists():
-        raise FileNotFoundError(f"Excel ファイルが見つかりません: {EXCEL_FILE}")
 
-    print(f"[excel_to_json_f14] loading: {EXCEL_FILE}")
-    wb = load_workbook(EXCEL_FILE, data_only=True)
+def sheet_cache_key(zf: zipfile.ZipFile, title: str, part: str) -> str:
+    """
+    シートの変換結果を左右する XML パーツのハッシュ。
+    zip に記録されている CRC-32 とサイズを使うので、展開せずに求められる。
+    """
+    h = hashlib.sha256()
+    for code in (Path(__file__), Path(__file__).with_name("xlsx_stream.py")):
+        h.update(hashlib.sha256(code.read_bytes()).digest())
+    h.update(title.encode("utf-8"))
+    names = set(zf.namelist())
+    parts = [part, rels_path(part), shared_strings_part(zf), styles_part(zf), workbook_part(zf)]
+    for name in parts:
+        if name and name in names:
+            info = zf.getinfo(name)
+            h.update(f"{name}:{info.CRC}:{info.file_size};".encode("utf-8"))
+    return h.hexdigest()
 
-    all_rows = []
+
+def stream_workbook(xlsx: Path, workers: int = SHEET_WORKERS, cache_dir: Path | None = SHEET_CACHE_DIR):
+    """
+    ブック全体の行をシート順に 1 件ずつ返す。
+    変わったシートだけをプロセスプールで変換し、変わっていないシートはキャッシュを使う。
+    """
+    tmp_dir = None
+    if cache_dir is None:
+        import tempfile
+
+        tmp_dir = tempfile.TemporaryDirectory()
+        cache_dir = Path(tmp_dir.name)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    with zipfile.ZipFile(xlsx) as zf:
+        sheets = []
+        for title, part in list_sheets(zf):
+            if title in SKIP_SHEETS:
+                print(f"[excel_to_json_f14] skip sheet: {title}")
+                continue
+            sheets.append((title, part, cache_dir / f"{sheet_cache_key(zf, title, part)}.jsonl"))
+
+    todo = [s for s in sheets if not s[2].exists()]
+    cached = len(sheets) - len(todo)
+    if cached:
+        print(f"[excel_to_json_f14] {cached} unchanged sheets from cache")
+
+    counts: dict[str, int] = {}
+    if todo:
+        if workers > 1 and len(todo) > 1:
+            with ProcessPoolExecutor(min(workers, len(todo))) as pool:
+                futures = [pool.submit(convert_sheet, xlsx, t, p, out) for t, p, out in todo]
+                results = [f.result() for f in futures]
+        else:
+            results = [convert_sheet(xlsx, t, p, out) for t, p, out in todo]
+        for title, count, seconds in results:
+            counts[title] = count
+            print(f"[excel_to_json_f14] reading sheet: {title} -> {count} rows ({seconds:.2f}s)")
+
+    # 今のブックに対応しないキャッシュは消す
+    keep = {out for _, _, out in sheets}
+    for old in cache_dir.glob("*.jsonl"):
+        if old not in keep:
+            old.unlink()
+
+    try:
+        for title, part, out in sheets:
+            yield from iter_records(out)
+    finally:
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+
+def openpyxl_workbook(xlsx: Path):
+    """従来どおり load_workbook でブック全体を読んで 1 件ずつ返す。"""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(xlsx, data_only=True)
     for ws in wb.worksheets:
         if ws.title in SKIP_SHEETS:
             print(f"[excel_to_json_f14] skip sheet: {ws.title}")
             continue
 
         print(f"[excel_to_json_f14] reading sheet: {ws.title}")
-        rows = sheet_to_rows(ws)
-        print(f"[excel_to_json_f14]  -> {len(rows)} rows")
-        all_rows.extend(rows)
+        n = 0
+        for row in sheet_to_rows(ws):
+            n += 1
+            yield row
+        print(f"[excel_to_json_f14]  -> {n} rows")
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Fund14 の結果 Excel を JSON に変換する")
+    ap.add_argument("--input", type=Path, default=EXCEL_FILE)
+    ap.add_argument("--output", type=Path, default=OUTPUT_FILE)
+    ap.add_argument(
+        "--engine",
+        choices=("stream", "openpyxl"),
+        default="stream",
+        help="stream: シート XML を行ごとに読む / openpyxl: 従来の load_workbook",
+    )
+    ap.add_argument("--workers", type=int, default=SHEET_WORKERS, help="シートを並列に読むプロセス数")
+    ap.add_argument("--no-cache", action="store_true", help="シートごとのキャッシュを使わない")
+    return ap.parse_args(argv)
+
 
-    print(f"[excel_to_json_f14] total rows: {len(all_rows)}")
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.input.exists():
+        raise FileNotFoundError(f"Excel ファイルが見つかりません: {args.input}")
 
-    with OUTPUT_FILE.open("w", encoding="utf-8") as f:
-        json.dump(all_rows, f, ensure_ascii=False, indent=2)
+    print(f"[excel_to_json_f14] loading: {args.input} (engine={args.engine})")
+    started = time.perf_counter()
+    if args.engine == "openpyxl":
+        rows = openpyxl_workbook(args.input)
+    else:
+        rows = stream_workbook(
+            args.input,
+            workers=args.workers,
+            cache_dir=None if args.no_cache else SHEET_CACHE_DIR,
+        )
 
-    print(f"✅ Excel → JSON 変換完了: {len(all_rows)} 件 → {OUTPUT_FILE}")
+    # 行は 1 件ずつ書き出す（--output を .jsonl にすれば JSONL で出る）
+    total = write_records(args.output, rows)
+    print(f"[excel_to_json_f14] total rows: {total} ({time.perf_counter() - started:.2f}s)")
+    print(f"✅ Excel → JSON 変換完了: {total} 件 → {args.output}")
 
 
 if __name__ == "__main__":
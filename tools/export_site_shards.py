@@ -0,0 +1,216 @@
+# tools/export_site_shards.py
+#
+# index.html（クライアント側の一覧ビュー）向けに、サイトバンドルを小さな JSON に分けて書き出す。
+#
+#   data/shards/manifest.json              件数・challenge の一覧・各ファイルの場所
+#   data/shards/list.json                  カードに出すフィールドだけの一覧（全件）
+#   data/shards/challenges/<slug>.json     challenge ごとの一覧
+#   data/shards/proposals/<id>.json        1 提案分の全フィールド（詳細を開いたときに読む）
+#
+# どのファイルも .gz / .br（brotli が入っていれば）を横に置く。
+# nginx の gzip_static / brotli_static などはそれをそのまま返すので、配信時に圧縮しなくてよい。
+# 中身が変わっていないファイルは書き直さない（mtime も変わらないのでキャッシュが効く）。
+#
+#   python tools/build_site_bundle.py && python tools/export_site_shards.py
+
+import argparse
+import gzip
+import hashlib
+import json
+import re
+import time
+from pathlib import Path
+
+from records import iter_records
+
+try:
+    import brotli
+except ImportError:  # brotli は任意（なければ .gz だけ）
+    brotli = None
+
+DATA_DIR = Path("data")
+BUNDLE_FILE = DATA_DIR / "f14_site_bundle.json"
+SHARD_DIR = DATA_DIR / "shards"
+
+# 一覧のカードに出すフィールド
+CARD_FIELDS = (
+    "proposal_id",
+    "fund",
+    "challenge",
+    "title_ja",
+    "summary_ja",
+    "requested_ada",
+    "status",
+)
+
+# カードの summary_ja はここまで（全文は詳細のシャードにある）
+SUMMARY_CHARS = 200
+
+# 書き出すファイルの拡張子（古いシャードを消すときに使う）
+SUFFIXES = (".json", ".json.gz", ".json.br")
+
+
+def slugify(text: str) -> str:
+    """"Cardano Use Cases: Concept" → "cardano-use-cases-concept"。"""
+    return re.sub(r"[^0-9a-z]+", "-", str(text).lower()).strip("-") or "other"
+
+
+def challenge_slugs(names) -> dict[str, str]:
+    """
+    challenge 名 → slug。slugify が同じになる名前（英数字を含まない名前の "other" など）は、
+    名前のハッシュを足して別のファイルにする（後から書いた challenge で上書きしないように）。
+    """
+    groups: dict[str, list[str]] = {}
+    for name in names:
+        groups.setdefault(slugify(name), []).append(name)
+    slugs = {}
+    for base, group in groups.items():
+        for name in group:
+            if len(group) == 1:
+                slugs[name] = base
+            else:
+                digest = hashlib.sha256(str(name).encode("utf-8")).hexdigest()[:8]
+                slugs[name] = f"{base}-{digest}"
+    return slugs
+
+
+def card(rec: dict) -> dict:
+    out = {k: rec[k] for k in CARD_FIELDS if k in rec}
+    summary = out.get("summary_ja")
+    if isinstance(summary, str) and len(summary) > SUMMARY_CHARS:
+        out["summary_ja"] = summary[:SUMMARY_CHARS].rstrip() + "…"
+    return out
+
+
+def detail_path(pid: str) -> str:
+    """site の permalink と同じく小文字の ID。"""
+    return f"proposals/{str(pid).lower()}.json"
+
+
+def encode(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class ShardWriter:
+    """JSON と圧縮版を書く。中身が同じファイルはそのまま残し、件数を数える。"""
+
+    def __init__(self, root: Path, compress: bool = True):
+        self.root = root
+        self.compress = compress
+        self.written: set[Path] = set()
+        self.stats = {"written": 0, "unchanged": 0, "removed": 0}
+        self.sizes: dict[str, tuple[int, int, int]] = {}
+
+    def _put(self, path: Path, data: bytes) -> bool:
+        """書いたら True。同じ中身がすでにあれば何もしない。"""
+        self.written.add(path)
+        try:
+            if path.read_bytes() == data:
+                self.stats["unchanged"] += 1
+                return False
+        except FileNotFoundError:
+            pass
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_bytes(data)
+        tmp.replace(path)
+        self.stats["written"] += 1
+        return True
+
+    def write(self, rel: str, obj) -> None:
+        path = self.root / rel
+        data = encode(obj)
+        changed = self._put(path, data)
+        sizes = [len(data), 0, 0]
+        if self.compress:
+            variants = [(".gz", lambda b: gzip.compress(b, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                variants.append((".br", lambda b: brotli.compress(b, quality=11)))
+            for i, (suffix, pack) in enumerate(variants, start=1):
+                packed_path = path.with_name(path.name + suffix)
+                if not changed and packed_path.exists():
+                    # 元の JSON が同じなら圧縮し直さない（brotli の最高圧縮は遅い）
+                    self.written.add(packed_path)
+                    self.stats["unchanged"] += 1
+                    sizes[i] = packed_path.stat().st_size
+                    continue
+                # gzip は mtime=0 にして、同じ中身なら同じ .gz になるようにする
+                packed = pack(data)
+                self._put(packed_path, packed)
+                sizes[i] = len(packed)
+        self.sizes[rel] = tuple(sizes)
+
+    def prune(self) -> None:
+        """今回書かなかったシャード（消えた提案や challenge の分）を消す。"""
+        if not self.root.exists():
+            return
+        for path in self.root.rglob("*"):
+            if path.is_file() and path.name.endswith(SUFFIXES) and path not in self.written:
+                path.unlink()
+                self.stats["removed"] += 1
+
+
+def export_shards(records, writer: ShardWriter) -> dict:
+    """レコードを 1 件ずつ読み、詳細シャードはその場で書く。一覧と challenge ごとの分は最後に書く。"""
+    cards = []
+    by_challenge: dict[str, list[dict]] = {}
+    for rec in records:
+        pid = rec.get("proposal_id")
+        if not pid:
+            continue
+        writer.write(detail_path(pid), rec)
+        c = card(rec)
+        cards.append(c)
+        by_challenge.setdefault(rec.get("challenge") or "", []).append(c)
+
+    writer.write("list.json", cards)
+    challenges = []
+    slugs = challenge_slugs(by_challenge)
+    for name, items in by_challenge.items():
+        rel = f"challenges/{slugs[name]}.json"
+        writer.write(rel, items)
+        challenges.append({"challenge": name, "slug": slugs[name], "count": len(items), "path": rel})
+
+    manifest = {
+        "count": len(cards),
+        "list": "list.json",
+        "detail": "proposals/{id}.json",
+        "card_fields": list(CARD_FIELDS),
+        "challenges": challenges,
+    }
+    writer.write("manifest.json", manifest)
+    writer.prune()
+    return manifest
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="index.html 用に一覧・詳細・challenge ごとのシャードを書き出す")
+    ap.add_argument("--input", type=Path, default=BUNDLE_FILE, help="tools/build_site_bundle.py の出力")
+    ap.add_argument("--output-dir", type=Path, default=SHARD_DIR)
+    ap.add_argument("--no-compress", action="store_true", help=".gz / .br を作らない")
+    return ap.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.input.exists():
+        raise SystemExit(f"{args.input} not found; run: python tools/build_site_bundle.py")
+
+    t0 = time.perf_counter()
+    writer = ShardWriter(args.output_dir, compress=not args.no_compress)
+    manifest = export_shards(iter_records(args.input), writer)
+
+    raw, gz, br = writer.sizes["list.json"]
+    s = writer.stats
+    print(
+        f"[shards] {manifest['count']} proposals, {len(manifest['challenges'])} challenges → {args.output_dir} "
+        f"(written={s['written']} unchanged={s['unchanged']} removed={s['removed']}, "
+        f"{time.perf_counter() - t0:.2f}s)"
+    )
+    print(f"[shards] list.json {raw / 1024:.0f} KiB, gzip {gz / 1024:.0f} KiB, brotli {br / 1024:.0f} KiB")
+    if brotli is None and not args.no_compress:
+        print("[shards] brotli is not installed; wrote .gz only")
+
+
+if __name__ == "__main__":
+    main()
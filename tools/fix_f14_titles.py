@@ -1,16 +1,17 @@
-import json
+import shutil
 from pathlib import Path
 
+from records import iter_records, write_records
+
 path = Path("data/f14_proposals_ja.json")
 
 # バックアップ推奨
 backup = path.with_suffix(".backup.json")
-backup.write_text(path.read_text(encoding="utf-8"), encoding="utf-8")
+shutil.copyfile(path, backup)
 print(f"📦 Backup created: {backup}")
 
-data = json.loads(path.read_text(encoding="utf-8"))
 
-for p in data:
+def fix(p: dict) -> dict:
     title_ja = p.get("title_ja", "")
     if "\n" in title_ja:
         first, rest = title_ja.split("\n", 1)
@@ -30,6 +31,9 @@ for p in data:
                 p["summary_ja"] = rest + "\n\n" + p["summary_ja"]
             else:
                 p["summary_ja"] = rest
+    return p
+
 
-path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+# バックアップから 1 件ずつ読み、直しながら書き戻す
+write_records(path, (fix(p) for p in iter_records(backup)))
 print("✅ 修正完了: data/f14_proposals_ja.json を更新しました")
@@ -1,18 +1,40 @@
 # tools/format_about_with_llm.py
 
+import argparse
 import json
-import time
 from pathlib import Path
 
-from openai import OpenAI  # pip install openai>=1.0.0
+from journal import ResultJournal
+from llm_batch import custom_id, read_responses, request_line, write_requests
+from llm_engine import count_tokens, shared_engine
+from md_sections import chunk_by_questions, merge_sections
+from near_dupes import CLUSTERS_FILE, REUSE_FIELDS, DuplicateGroups
+from proposal_store import STORE_PATH, ProposalStore, load_dataset
 
-client = OpenAI()  # API key は環境変数から読む
+# API key は環境変数から読む。並列度・RPM/TPM も環境変数（LLM_CONCURRENCY など）で調整
+# （エンジンは最初の API 呼び出しまで作らないので、--write-batch にはキーが要らない）
 
 DATA_DIR = Path("data")
 INPUT_FILE = DATA_DIR / "f14_proposals_en.json"
 BACKUP_FILE = DATA_DIR / "f14_proposals_en.before_structured.json"
 
-MAX_PROPOSALS = 10  # 一度に処理する最大件数
+MAX_PROPOSALS = 10  # 一度に処理する最大件数（--write-batch では全件）
+
+MODEL = "gpt-4.1-mini"
+# バッチファイルの custom_id の接頭辞
+BATCH_STAGE = "format"
+
+# 1 回のプロンプトに入れる full_text_en の上限（トークン）。
+# 超える提案は "## 質問" の境目で分割して並列に整形し、最後に 8 セクションへまとめる
+CONTEXT_BUDGET = 6000
+TOKEN_REPORT_FILE = DATA_DIR / "f14_format_token_report.json"
+
+# True なら about_structured_en があっても作り直す
+# （入力とプロンプトが同じものは LLM キャッシュに当たるので API は呼ばない）
+FORCE = False
+
+# SYSTEM_PROMPT / USER_PROMPT_PREFIX を変えたら上げる（LLM キャッシュのキーに入る）
+PROMPT_VERSION = "1"
 
 SYSTEM_PROMPT = """You are an assistant that restructures long, messy proposal form text
 from Project Catalyst into a clean, readable Markdown document.
@@ -54,39 +76,100 @@ Milestones は Markdown 表形式にする。
 """
 
 
-def call_llm(wall_text: str) -> str:
-    """LLM で整形された Markdown を生成する."""
-    prompt = USER_PROMPT_PREFIX + "\n" + wall_text
+# 分割した各部分のプロンプトに足す注意書き
+CHUNK_NOTE = """
+（注意）これは長い壁テキストを {total} 個に分割したうちの {index} 番目です。
+この部分に書かれている内容だけを、上と同じ見出しの下に整理してください。
+この部分に情報がない見出しは、見出しごと省略してください。
+"""
 
-    resp = client.chat.completions.create(
-        model="gpt-4.1-mini",
+# まとめるときの見出しの並び（USER_PROMPT_PREFIX と同じ）
+SECTION_LAYOUT = [
+    "## 📌 Proposal Overview",
+    "## 1. Problem Statement",
+    "## 2. Proposed Solution",
+    "## 3. Collaborations & Team",
+    "## 4. Expected Impact",
+    "## 5. Key Performance Metrics (KPIs)",
+    "## 6. Milestones (Summary Table)",
+    "## 7. Budget Breakdown",
+    "## 8. Value for Money",
+]
+
+
+def build_messages(wall_text: str, index: int = 0, total: int = 1) -> list[dict]:
+    note = CHUNK_NOTE.format(index=index, total=total) if total > 1 else ""
+    prompt = USER_PROMPT_PREFIX + note + "\n" + wall_text
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def call_llm(wall_text: str, index: int = 0, total: int = 1) -> str:
+    """LLM で整形された Markdown を生成する."""
+    return shared_engine().chat(
+        build_messages(wall_text, index, total),
+        model=MODEL,
+        prompt_version=PROMPT_VERSION,
         temperature=0.3,
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": prompt},
-        ],
     )
 
-    return resp.choices[0].message.content.strip()
 
+def split_for_budget(wall_text: str, budget: int) -> list[str]:
+    return chunk_by_questions(wall_text, budget, lambda t: count_tokens(t, MODEL))
 
-def main():
-    print("[format_about] START")
 
-    if not INPUT_FILE.exists():
-        raise FileNotFoundError(INPUT_FILE)
+def format_proposal(wall_text: str, budget: int = CONTEXT_BUDGET) -> str:
+    """
+    予算内なら 1 回で整形する。大きすぎる提案は分割して並列に整形し（map）、
+    見出しごとにまとめ直す（reduce）。
+    """
+    chunks = split_for_budget(wall_text, budget)
+    if len(chunks) == 1:
+        return call_llm(wall_text)
 
-    # JSON 読み込み
-    with INPUT_FILE.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+    parts: list[str | None] = [None] * len(chunks)
+    jobs = list(enumerate(chunks, start=1))
+    for (index, chunk), out, err in shared_engine().map(
+        lambda job: call_llm(job[1], job[0], len(chunks)), jobs
+    ):
+        if err is not None:
+            raise err
+        parts[index - 1] = out
+    return merge_sections(parts, SECTION_LAYOUT)
 
-    # 初回のみバックアップ
-    if not BACKUP_FILE.exists():
-        with BACKUP_FILE.open("w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        print(f"[format_about] Backup created: {BACKUP_FILE}")
 
-    updated = 0
+def token_report(data: list[dict], budget: int) -> list[dict]:
+    """提案ごとの full_text_en のトークン数と分割数。"""
+    rows = []
+    for item in data:
+        text = (item.get("full_text_en") or "").strip()
+        if not text:
+            continue
+        chunks = split_for_budget(text, budget)
+        rows.append(
+            {
+                "proposal_id": item.get("proposal_id"),
+                "tokens": count_tokens(text, MODEL),
+                "chunks": len(chunks),
+                "chunk_tokens": [count_tokens(c, MODEL) for c in chunks],
+            }
+        )
+    rows.sort(key=lambda r: r["tokens"], reverse=True)
+    return rows
+
+
+def select_pending(
+    data: list[dict], limit: int | None, dupes: DuplicateGroups | None = None
+) -> list[dict]:
+    """
+    整形が必要な提案を選ぶ（limit 件まで）。dupes の代表でないメンバーは、
+    代表に結果があるか代表を今回整形するなら、代表の結果をコピーする。
+    """
+    pending = []
+    selected: set[str] = set()
+    by_id = {item.get("proposal_id"): item for item in data} if dupes else {}
 
     for item in data:
         pid = item.get("proposal_id")
@@ -99,32 +182,246 @@ def main():
             continue
 
         # structured が既にあれば skip
-        if item.get("about_structured_en"):
+        if item.get("about_structured_en") and not FORCE:
             print(f"- {pid}: already has about_structured_en, skip")
             continue
 
-        print(f"- {pid}: calling LLM...")
+        # ほぼ同じ提案は代表だけを整形する（tools/near_dupes.py）
+        canonical = dupes.reuses(pid, by_id, REUSE_FIELDS["format"], selected) if dupes else None
+        if canonical:
+            print(f"- {pid}: near-duplicate of {canonical}, reuse")
+            continue
+
+        if limit is not None and len(pending) >= limit:
+            print(f"[format_about] Reached MAX_PROPOSALS={limit}, stopping.")
+            break
+
+        pending.append(item)
+        selected.add(pid)
+
+    return pending
+
+
+def chunk_part(index: int, total: int) -> str:
+    return f"part{index}-of-{total}"
+
+
+def batch_lines(item: dict, budget: int):
+    """1 提案分のバッチリクエスト（大きい提案は分割した部分ごと）。"""
+    pid = item["proposal_id"]
+    chunks = split_for_budget(item["full_text_en"].strip(), budget)
+    total = len(chunks)
+    for index, chunk in enumerate(chunks, start=1):
+        cid = custom_id(BATCH_STAGE, pid, chunk_part(index, total) if total > 1 else "")
+        yield request_line(
+            cid,
+            build_messages(chunk, index, total),
+            model=MODEL,
+            temperature=0.3,
+        )
 
-        try:
-            formatted = call_llm(about_raw)
-        except Exception as e:
-            print(f"  ❌ error: {e}")
+
+def write_batch(
+    data: list[dict], path: Path, budget: int = CONTEXT_BUDGET, dupes: DuplicateGroups | None = None
+) -> None:
+    """整形待ちの全件をバッチリクエストの JSONL に書き出す。"""
+    pending = select_pending(data, None, dupes)
+    n = write_requests(
+        path,
+        (line for item in pending for line in batch_lines(item, budget)),
+    )
+    print(f"[format_about] Wrote {n} batch requests for {len(pending)} proposals → {path}")
+
+
+def batch_content(responses: dict, pid: str) -> tuple[str | None, str | None]:
+    """1 提案分の返答。分割した提案は全部そろっていればまとめて返す。"""
+    whole = responses.get(custom_id(BATCH_STAGE, pid))
+    if whole is not None:
+        return whole
+    prefix = custom_id(BATCH_STAGE, pid, "part")
+    parts = {cid: r for cid, r in responses.items() if cid.startswith(prefix)}
+    if not parts:
+        return None, None
+    total = int(next(iter(parts)).rsplit("-of-", 1)[1])
+    contents = []
+    for index in range(1, total + 1):
+        cid = custom_id(BATCH_STAGE, pid, chunk_part(index, total))
+        content, err = parts.get(cid, (None, None))
+        if not content:
+            return None, err or f"missing part {index}/{total}"
+        contents.append(content)
+    return merge_sections(contents, SECTION_LAYOUT), None
+
+
+def ingest_batch(data: list[dict], path: Path, journal: ResultJournal) -> int:
+    """バッチのレスポンスを取り込む（成功した分だけ。部分的な結果でもよい）。"""
+    responses = read_responses(path)
+    updated = 0
+    for item in data:
+        pid = item.get("proposal_id")
+        if not pid:
+            continue
+        content, err = batch_content(responses, pid)
+        if err is not None:
+            print(f"  ❌ {pid} batch error: {err}")
+        if not content:
+            continue
+        item["about_structured_en"] = content
+        journal.append(pid, {"about_structured_en": content})
+        updated += 1
+    return updated
+
+
+def format_all(engine, items: list[dict], budget: int, journal) -> tuple[int, set[str]]:
+    """items を並列に整形し、終わった順にジャーナルへ追記する。(更新した件数, 失敗した ID) を返す。"""
+    updated = 0
+    failed: set[str] = set()
+    for item, formatted, err in engine.map(
+        lambda it: format_proposal(it["full_text_en"].strip(), budget), items
+    ):
+        pid = item.get("proposal_id")
+        if err is not None:
+            print(f"  ❌ {pid} error: {err}")
+            failed.add(pid)
             continue
 
         item["about_structured_en"] = formatted
+        journal.append(pid, {"about_structured_en": formatted})
         updated += 1
+    return updated, failed
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="full_text_en を LLM で構造化 Markdown に整形する")
+    ap.add_argument("--write-batch", type=Path, help="API を呼ばずにバッチリクエストを書き出す")
+    ap.add_argument("--ingest-batch", type=Path, help="バッチのレスポンスを取り込む")
+    ap.add_argument(
+        "--context-budget",
+        type=int,
+        default=CONTEXT_BUDGET,
+        help="1 プロンプトに入れる full_text_en の上限トークン数",
+    )
+    ap.add_argument(
+        "--max-proposals",
+        type=int,
+        default=MAX_PROPOSALS,
+        help="1 回に整形する最大件数（0 なら全件）",
+    )
+    ap.add_argument(
+        "--token-report",
+        action="store_true",
+        help=f"API を呼ばずに提案ごとのトークン数を {TOKEN_REPORT_FILE} に書き出す",
+    )
+    ap.add_argument(
+        "--store",
+        type=Path,
+        nargs="?",
+        const=STORE_PATH,
+        help="JSON ではなく SQLite ストアを読み書きする（他のステージと同時に走らせられる）",
+    )
+    ap.add_argument(
+        "--no-dedupe",
+        action="store_true",
+        help=f"{CLUSTERS_FILE} を使わず、ほぼ同じ提案も 1 件ずつ整形する",
+    )
+    return ap.parse_args(argv)
 
-        time.sleep(1)
 
-        if updated >= MAX_PROPOSALS:
-            print(f"[format_about] Reached MAX_PROPOSALS={MAX_PROPOSALS}, stopping.")
-            break
+def main(argv=None):
+    args = parse_args(argv)
+    print("[format_about] START")
 
-    # JSON 書き戻し
-    with INPUT_FILE.open("w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    if args.store:
+        # ストアなら about_structured_en のフィールドだけを 1 件ずつ書く（JSON は export で作る）
+        store = ProposalStore(args.store)
+        data = load_dataset(store, "en")
+        journal = store.journal("en")
+    else:
+        if not INPUT_FILE.exists():
+            raise FileNotFoundError(INPUT_FILE)
+
+        # JSON 読み込み
+        with INPUT_FILE.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        # 初回のみバックアップ
+        if not BACKUP_FILE.exists():
+            with BACKUP_FILE.open("w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            print(f"[format_about] Backup created: {BACKUP_FILE}")
+
+        journal = ResultJournal.for_file(INPUT_FILE, "format")
+
+    # 前回途中で止まっていれば、ジャーナルの分を反映してから再開する
+    resumed = journal.apply(data)
+    if resumed:
+        print(f"[format_about] Resumed {resumed} proposals from {journal.path}")
+
+    if args.token_report:
+        rows = token_report(data, args.context_budget)
+        TOKEN_REPORT_FILE.write_text(
+            json.dumps(rows, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        split = sum(1 for r in rows if r["chunks"] > 1)
+        total = sum(r["tokens"] for r in rows)
+        print(
+            f"[format_about] {len(rows)} proposals, {total} tokens, "
+            f"{split} over budget={args.context_budget} → {TOKEN_REPORT_FILE}"
+        )
+        for r in rows[:10]:
+            print(f"  {r['proposal_id']}: {r['tokens']} tokens, {r['chunks']} chunks")
+        return
+
+    dupes = None if args.no_dedupe else DuplicateGroups.load()
+    if dupes:
+        print(f"[format_about] {len(dupes)} near-duplicates reuse their canonical proposal")
+
+    if args.write_batch:
+        write_batch(data, args.write_batch, args.context_budget, dupes)
+        return
+
+    if args.ingest_batch:
+        updated = ingest_batch(data, args.ingest_batch, journal)
+        if dupes:
+            updated += dupes.propagate(data, REUSE_FIELDS["format"], journal)
+        journal.compact(data, INPUT_FILE)
+        print(f"[format_about] Done. Ingested {updated} proposals from {args.ingest_batch}.")
+        return
+
+    pending = select_pending(data, args.max_proposals or None, dupes)
+    for item in pending:
+        tokens = count_tokens(item["full_text_en"], MODEL)
+        print(f"- {item.get('proposal_id')}: calling LLM... ({tokens} tokens)")
+
+    engine = shared_engine()
+    updated, failed = format_all(engine, pending, args.context_budget, journal)
+
+    # 代表がエラーになったら、そのメンバーは自分で整形する
+    if dupes and failed:
+        by_id = {item.get("proposal_id"): item for item in data}
+        fallback = [
+            by_id[pid]
+            for pid in dupes.followers(failed)
+            if pid in by_id
+            and not by_id[pid].get("about_structured_en")
+            and by_id[pid].get("full_text_en", "").strip()
+        ]
+        if fallback:
+            print(f"[format_about] Formatting {len(fallback)} near-duplicates of failed proposals")
+            updated += format_all(engine, fallback, args.context_budget, journal)[0]
+
+    # 代表の結果をほぼ同じ提案にコピーする
+    if dupes:
+        copied = dupes.propagate(data, REUSE_FIELDS["format"], journal)
+        if copied:
+            print(f"[format_about] Reused results for {copied} near-duplicates")
+        updated += copied
+
+    # JSON 書き戻し（アトミックに置き換えてからジャーナルを消す）
+    journal.compact(data, INPUT_FILE)
 
     print(f"[format_about] Done. Updated {updated} proposals.")
+    print(f"[format_about] {engine.summary()}")
 
 
 if __name__ == "__main__":
@@ -1,12 +1,23 @@
 # tools/generate_multilang_about.py
 
+import argparse
 import json
-import time
+import threading
+from collections import Counter
 from pathlib import Path
-from openai import OpenAI
+
+from change_manifest import acknowledge, changed_ids
+from journal import ResultJournal
+from json_repair import loads_lenient
+from llm_batch import custom_id, read_responses, request_line, write_requests
+from llm_engine import shared_engine
+from md_sections import join_segments, split_segments
+from near_dupes import CLUSTERS_FILE, DuplicateGroups
+from translation_memory import TM_PATH, TranslationMemory, segment_key
 
 # OPENAI_API_KEY は環境変数で設定しておくこと
-client = OpenAI()
+# 並列度・RPM/TPM も環境変数（LLM_CONCURRENCY など）で調整する
+# （エンジンは最初の API 呼び出しまで作らないので、--write-batch にはキーが要らない）
 
 SRC = Path("data/f14_proposals_en.json")
 DST = Path("data/f14_proposals_multi.json")
@@ -14,125 +25,477 @@ DST = Path("data/f14_proposals_multi.json")
 # ★テスト用：何件まで処理するか（Noneなら全件）
 MAX_ITEMS = None
 
-
-def build_prompt(about_en: str) -> str:
-    """about_structured_en から、多言語 about_* を生成するためのプロンプト"""
+# True なら訳がある言語も作り直す
+# （入力とプロンプトが同じものは LLM キャッシュに当たるので API は呼ばない）
+FORCE = False
+
+# build_prompt を変えたら上げる（LLM キャッシュと翻訳メモリのキーに入る）
+PROMPT_VERSION = "3"
+
+MODEL = "gpt-4.1-mini"
+# バッチファイルの custom_id の接頭辞
+BATCH_STAGE = "multilang"
+# --changed-only が data/manifests/acks/en.<これ>.json に処理済みのマニフェストを控える
+MANIFEST_CONSUMER = "multilang"
+
+
+# 訳す言語（言語ごとに 1 ジョブ・1 フィールド・翻訳メモリの 1 言語）。
+# 増やすときはここに足すだけでよい（既存の言語はそのまま使われ、提案ごとに 1 回だけ呼ぶ）。
+# version を上げると、その言語だけ翻訳メモリを引き当てずに訳し直す
+ELP_RULES = (
+    "short sentences",
+    "simple words",
+    "keep headings",
+    "briefly explain difficult words",
+)
+LANGUAGES = {
+    "ja": {
+        "field": "about_structured_ja",
+        "target": "natural Japanese for adults",
+        "rules": (),
+        "version": "1",
+    },
+    "ja_elp": {
+        "field": "about_structured_ja_elp",
+        "target": "Easy Japanese (やさしい日本語, ELP style)",
+        "rules": ELP_RULES,
+        "version": "1",
+    },
+    "es_elp": {
+        "field": "about_structured_es_elp",
+        "target": "Easy Spanish (Español fácil, ELP style)",
+        "rules": ELP_RULES,
+        "version": "1",
+    },
+}
+
+# 言語ごとのエラー（{言語: メッセージ}。その言語が成功したら消す）
+ERRORS_FIELD = "_multilang_errors"
+
+# JSON を直して読めた返答の数（"fence" / "trailing" / "truncated" ごと）
+REPAIRS: Counter = Counter()
+_repairs_lock = threading.Lock()
+
+
+def tm_version(lang: str) -> str:
+    return f"{PROMPT_VERSION}.{LANGUAGES[lang]['version']}"
+
+
+def build_prompt(lang: str, segments: list[str]) -> str:
+    """about_structured_en のセグメント（見出し・区切り線ごと）を lang に訳すプロンプト"""
+    spec = LANGUAGES[lang]
+    rules = "".join(f"\n   - {rule}" for rule in spec["rules"])
+    payload = json.dumps(segments, ensure_ascii=False, indent=2)
     return f"""
 You are a translator and simplifier.
 
-Input is MARKDOWN in English that explains a Cardano Catalyst proposal
-under the key `about_structured_en`.
-
-Please:
+Input is a JSON array of MARKDOWN segments in English. Each segment is one
+section of a Cardano Catalyst proposal (`about_structured_en`), usually a
+heading followed by its body.
 
-1. Translate it into natural Japanese for adults.
-2. Create an Easy Japanese version (やさしい日本語, ELP style):
-   - short sentences
-   - simple words
-   - keep headings
-   - briefly explain difficult words
-3. Create an Easy Spanish version (Español fácil, ELP style):
-   - short sentences
-   - simple words
-   - keep headings
-   - briefly explain difficult words
+Rewrite EACH segment, in the same order, as {spec["target"]}.{rules}
 
-Return JSON with this exact shape:
+Return JSON with this exact shape, with exactly {len(segments)} items
+(one per input segment, in the same order):
 
-{{
-  "ja": "MARKDOWN in Japanese",
-  "ja_elp": "MARKDOWN in Easy Japanese",
-  "es_elp": "MARKDOWN in Easy Spanish"
-}}
+{{"segments": ["MARKDOWN in {spec["target"]}", ...]}}
 
-Do NOT include any keys other than ja, ja_elp, es_elp.
+Do NOT add or remove segments, and do NOT add horizontal rules (---).
 Do NOT wrap the JSON in code fences.
 Do NOT explain the JSON, just output raw JSON.
 
-Here is `about_structured_en` in Markdown.
-The content is between the markers [ABOUT_START] and [ABOUT_END].
+Here are the segments between the markers [SEGMENTS_START] and [SEGMENTS_END].
 
-[ABOUT_START]
-{about_en}
-[ABOUT_END]
+[SEGMENTS_START]
+{payload}
+[SEGMENTS_END]
 """
 
 
-def translate_about(about_en: str) -> dict:
-    """OpenAI API (chat.completions) を使って、多言語版 about_* を JSON で返す"""
-    prompt = build_prompt(about_en)
-
-    resp = client.chat.completions.create(
-        model="gpt-4.1-mini",
-        messages=[{"role": "user", "content": prompt}],
+def build_messages(lang: str, segments: list[str]) -> list[dict]:
+    return [{"role": "user", "content": build_prompt(lang, segments)}]
+
+
+def parse_reply(content: str, n: int) -> list[str]:
+    """
+    LLM の JSON 返答をセグメントの訳の並びに直す。
+    途中で切れた返答は、そろっている先頭の分だけを返す（n より短くなる）。
+    それ以外で数が合わなければ ValueError（どれがどのセグメントか分からない）。
+    """
+    value, repaired = loads_lenient(content)
+    if repaired:
+        with _repairs_lock:
+            REPAIRS[repaired] += 1
+    items = value.get("segments") if isinstance(value, dict) else value
+    if not isinstance(items, list):
+        raise ValueError("reply has no segments array")
+    if len(items) == n or (repaired == "truncated" and len(items) < n):
+        return [str(item).strip() for item in items]
+    raise ValueError(f"expected {n} segments, got {len(items)}")
+
+
+def translate_segments(lang: str, segments: list[str]) -> list[str]:
+    """
+    OpenAI API (chat.completions) でセグメントをまとめて lang に訳す。
+    途中で切れた返答は読めた分を使って残りだけを、数が合わない返答は 1 つずつ訳し直す。
+    """
+    content = shared_engine().chat(
+        build_messages(lang, segments),
+        model=MODEL,
+        prompt_version=tm_version(lang),
         temperature=0.2,
     )
-
-    content = resp.choices[0].message.content.strip()
-    # build_prompt 側で「生の JSON だけ返して」と指示しているのでそのままパース
-    return json.loads(content)
-
-
-def main() -> None:
-    if not SRC.exists():
-        raise SystemExit(f"Source not found: {SRC}")
-
-    data = json.loads(SRC.read_text(encoding="utf-8"))
-
+    try:
+        items = parse_reply(content, len(segments))
+    except ValueError:
+        if len(segments) == 1:
+            raise
+        items = []
+    if len(items) == len(segments):
+        return items
+    if items:
+        return items + translate_segments(lang, segments[len(items) :])
+    if len(segments) == 1:
+        raise ValueError("truncated reply with no complete segment")
+    return [translate_segments(lang, [seg])[0] for seg in segments]
+
+
+def segment_plan(about_en: str, lang: str, tm: TranslationMemory):
+    """(セグメント, キー → 原文, {キー: 訳}, まだ訳がないキー) を返す。"""
+    pieces = split_segments(about_en)
+    sources = {}
+    for text, translatable in pieces:
+        if translatable:
+            sources.setdefault(segment_key(text, MODEL, tm_version(lang)), text.strip())
+    known = tm.get_many(lang, sources)
+    missing = [k for k in sources if k not in known]
+    return pieces, sources, known, missing
+
+
+def store_translations(
+    tm: TranslationMemory, lang: str, known: dict, sources: dict, keys: list[str], targets
+) -> None:
+    rows = [(key, sources[key], target) for key, target in zip(keys, targets)]
+    tm.put_many(lang, rows)
+    known.update((key, target) for key, _source, target in rows)
+
+
+def assemble(pieces, lang: str, known: dict) -> str:
+    """翻訳メモリの訳から lang の文書を組み立てる。"""
+    version = tm_version(lang)
+    return join_segments(pieces, lambda body: known[segment_key(body, MODEL, version)]).strip()
+
+
+def translate_about(about_en: str, lang: str, tm: TranslationMemory) -> str:
+    """新しい・変わったセグメントだけを API に送り、残りは翻訳メモリから組み立てる"""
+    pieces, sources, known, missing = segment_plan(about_en, lang, tm)
+    if missing:
+        targets = translate_segments(lang, [sources[k] for k in missing])
+        store_translations(tm, lang, known, sources, missing, targets)
+    return assemble(pieces, lang, known)
+
+
+def record_result(proposal: dict, pid: str, lang: str, text: str, journal: ResultJournal) -> None:
+    fields = {LANGUAGES[lang]["field"]: text}
+    errors = proposal.get(ERRORS_FIELD) or {}
+    if lang in errors:
+        errors = {k: v for k, v in errors.items() if k != lang}
+        # ジャーナルはフィールドを上書きするだけなので、消すときは None を書く
+        fields[ERRORS_FIELD] = errors or None
+    proposal.update(fields)
+    if not proposal.get(ERRORS_FIELD):
+        proposal.pop(ERRORS_FIELD, None)
+    journal.append(pid, fields)
+
+
+def record_error(proposal: dict, pid: str, lang: str, err, journal: ResultJournal) -> None:
+    # エラーになったものは後から手で見られるようにしておく
+    errors = {**(proposal.get(ERRORS_FIELD) or {}), lang: str(err)}
+    proposal[ERRORS_FIELD] = errors
+    journal.append(pid, {ERRORS_FIELD: errors})
+
+
+def select_pending(
+    data: list[dict],
+    limit: int | None,
+    only: set[str] | None = None,
+    dupes: DuplicateGroups | None = None,
+    langs=tuple(LANGUAGES),
+) -> list[tuple[str, dict, str, str]]:
+    """
+    翻訳が必要な (pid, proposal, about_en, lang) を言語ごとに選ぶ。
+    only を渡したら、その提案だけを（訳がそろっていても）作り直す。
+    dupes の代表でないメンバーは、代表にその言語の訳があるか今回訳すなら選ばない
+    （後で代表の訳をコピーする）。
+    """
     total = len(data)
-    print(f"Loaded {total} proposals from {SRC}")
+    pending = []
+    selected: dict[str, set[str]] = {lang: set() for lang in langs}
+    by_id = {p.get("proposal_id"): p for p in data} if dupes else {}
 
     for i, proposal in enumerate(data):
+        # ★テスト件数に達したら終了
+        if limit is not None and i >= limit:
+            print(f"Reached MAX_ITEMS={limit}, stopping early for test.")
+            break
+
+        if only is not None and proposal.get("proposal_id") not in only:
+            continue
+
         about_en = (proposal.get("about_structured_en") or "").strip()
         if not about_en:
             # 英語版がないものはスキップ
             continue
 
-        # すでに3つそろっていたらスキップ（再実行に備えて）
-        if (
-            proposal.get("about_structured_ja")
-            and proposal.get("about_structured_ja_elp")
-            and proposal.get("about_structured_es_elp")
-        ):
-            continue
-
+        # すでにある言語はスキップ（再実行・言語の追加に備えて）
+        todo = [
+            lang
+            for lang in langs
+            if FORCE or only is not None or not proposal.get(LANGUAGES[lang]["field"])
+        ]
         pid = proposal.get("proposal_id") or f"index:{i}"
-        print(f"[{i+1}/{total}] {pid} → translating...")
-
-        try:
-            tr = translate_about(about_en)
-        except Exception as e:
-            print(f"  !! error on {pid}: {e}")
-            # エラーになったものは後から手で見られるようにしておく
-            proposal.setdefault("_multilang_error", str(e))
+        if dupes is not None:
+            todo = [
+                lang
+                for lang in todo
+                if not dupes.reuses(pid, by_id, (LANGUAGES[lang]["field"],), selected[lang])
+            ]
+        if not todo:
             continue
 
-        proposal["about_structured_ja"] = tr.get("ja", "").strip()
-        proposal["about_structured_ja_elp"] = tr.get("ja_elp", "").strip()
-        proposal["about_structured_es_elp"] = tr.get("es_elp", "").strip()
+        for lang in todo:
+            selected[lang].add(pid)
+        print(f"[{i+1}/{total}] {pid} → translating {', '.join(todo)}...")
+        pending.extend((pid, proposal, about_en, lang) for lang in todo)
+
+    return pending
+
+
+def translate_jobs(engine, jobs, tm: TranslationMemory, journal, done: Counter, failed: Counter):
+    """
+    (提案, 言語) ごとに並列に訳す。1 言語が失敗しても他の言語の結果は残す。
+    失敗した (pid, 言語) を返す。
+    """
+    failed_jobs = []
+    for (pid, proposal, _about_en, lang), text, err in engine.map(
+        lambda job: translate_about(job[2], job[3], tm), jobs
+    ):
+        if err is not None:
+            print(f"  !! error on {pid} ({lang}): {err}")
+            record_error(proposal, pid, lang, err, journal)
+            failed[lang] += 1
+            failed_jobs.append((pid, lang))
+            continue
 
-        # 10件ごとに途中保存（長時間バッチ対策）
-        if (i + 1) % 10 == 0:
-            DST.write_text(
-                json.dumps(data, ensure_ascii=False, indent=2),
-                encoding="utf-8",
+        # 1件ごとにジャーナルへ追記（データセット全体は書き直さない）
+        record_result(proposal, pid, lang, text, journal)
+        done[lang] += 1
+    return failed_jobs
+
+
+def batch_id(lang: str, key: str) -> str:
+    # 同じセグメントは提案が違っても 1 リクエストにまとめる
+    return custom_id(BATCH_STAGE, lang, key[:32])
+
+
+def write_batch(
+    data: list[dict],
+    path: Path,
+    tm: TranslationMemory,
+    dupes: DuplicateGroups | None = None,
+    langs=tuple(LANGUAGES),
+) -> None:
+    """翻訳待ちの (提案, 言語) の、まだ訳がないセグメントをバッチリクエストの JSONL に書き出す。"""
+    pending = [
+        job
+        for job in select_pending(data, None, dupes=dupes, langs=langs)
+        if job[1].get("proposal_id")
+    ]
+    segments: dict[tuple[str, str], str] = {}
+    for _pid, _proposal, about_en, lang in pending:
+        _pieces, sources, _known, missing = segment_plan(about_en, lang, tm)
+        segments.update(((lang, k), sources[k]) for k in missing)
+    n = write_requests(
+        path,
+        (
+            request_line(
+                batch_id(lang, key), build_messages(lang, [source]), model=MODEL, temperature=0.2
             )
-            print(f"  saved checkpoint → {DST}")
+            for (lang, key), source in segments.items()
+        ),
+    )
+    print(f"Wrote {n} batch requests ({len(pending)} proposal × language jobs) → {path}")
+
+
+def ingest_batch(
+    data: list[dict],
+    path: Path,
+    journal: ResultJournal,
+    tm: TranslationMemory,
+    langs=tuple(LANGUAGES),
+) -> int:
+    """
+    バッチのレスポンスを翻訳メモリに入れ、セグメントがそろった (提案, 言語) を組み立てる
+    （成功した分だけ。部分的な結果でもよい）。組み立てた数を返す。
+    """
+    responses = read_responses(path)
+    updated = 0
+    for proposal in data:
+        pid = proposal.get("proposal_id")
+        about_en = (proposal.get("about_structured_en") or "").strip()
+        if not pid or not about_en:
+            continue
+        for lang in langs:
+            pieces, sources, known, missing = segment_plan(about_en, lang, tm)
+            if not missing and proposal.get(LANGUAGES[lang]["field"]):
+                continue
+            error = None
+            complete = True
+            for key in missing:
+                content, err = responses.get(batch_id(lang, key), (None, None))
+                if content:
+                    try:
+                        store_translations(
+                            tm, lang, known, sources, [key], parse_reply(content, 1)
+                        )
+                        continue
+                    except ValueError as e:
+                        err = f"invalid JSON reply: {e}"
+                complete = False
+                error = error or err
+            if complete:
+                record_result(proposal, pid, lang, assemble(pieces, lang, known), journal)
+                updated += 1
+            elif error is not None:
+                print(f"  !! batch error on {pid} ({lang}): {error}")
+                record_error(proposal, pid, lang, error, journal)
+    return updated
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="about_structured_en から多言語版を作る")
+    ap.add_argument("--write-batch", type=Path, help="API を呼ばずにバッチリクエストを書き出す")
+    ap.add_argument("--ingest-batch", type=Path, help="バッチのレスポンスを取り込む")
+    ap.add_argument(
+        "--changed-only",
+        action="store_true",
+        help="前回 --changed-only で走ったときから about_structured_en が変わった提案だけを作り直す",
+    )
+    ap.add_argument(
+        "--no-dedupe",
+        action="store_true",
+        help=f"{CLUSTERS_FILE} を使わず、ほぼ同じ提案も 1 件ずつ翻訳する",
+    )
+    ap.add_argument(
+        "--langs",
+        default=",".join(LANGUAGES),
+        help=f"訳す言語（カンマ区切り。{', '.join(LANGUAGES)} から）",
+    )
+    ap.add_argument(
+        "--tm",
+        type=Path,
+        default=TM_PATH,
+        help="セグメント単位の翻訳メモリ（SQLite）",
+    )
+    return ap.parse_args(argv)
 
-        # レート制御（必要に応じて調整）
-        time.sleep(0.5)
 
-        # ★テスト件数に達したら終了
-        if MAX_ITEMS is not None and (i + 1) >= MAX_ITEMS:
-            print(f"Reached MAX_ITEMS={MAX_ITEMS}, stopping early for test.")
-            break
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    langs = tuple(lang.strip() for lang in args.langs.split(",") if lang.strip())
+    unknown = [lang for lang in langs if lang not in LANGUAGES]
+    if unknown:
+        raise SystemExit(
+            f"Unknown language: {', '.join(unknown)} (choose from {', '.join(LANGUAGES)})"
+        )
+    if not SRC.exists():
+        raise SystemExit(f"Source not found: {SRC}")
 
-    # 最終保存
-    DST.write_text(
-        json.dumps(data, ensure_ascii=False, indent=2),
-        encoding="utf-8",
-    )
+    data = json.loads(SRC.read_text(encoding="utf-8"))
+
+    total = len(data)
+    print(f"Loaded {total} proposals from {SRC}")
+
+    # 途中結果は 1 件ずつジャーナルに追記し、次回はそこから再開する
+    journal = ResultJournal.for_file(DST, "multilang")
+    resumed = journal.apply(data)
+    if resumed:
+        print(f"Resumed {resumed} proposals from {journal.path}")
+        for proposal in data:
+            if ERRORS_FIELD in proposal and not proposal[ERRORS_FIELD]:
+                del proposal[ERRORS_FIELD]
+
+    dupes = None if args.no_dedupe else DuplicateGroups.load()
+    if dupes:
+        print(f"{len(dupes)} near-duplicates reuse their canonical proposal")
+    reuse_fields = tuple(LANGUAGES[lang]["field"] for lang in langs)
+
+    # 見出し・区切り線ごとの訳。変わっていないセグメントは API に送らない
+    tm = TranslationMemory(args.tm)
+
+    if args.write_batch:
+        write_batch(data, args.write_batch, tm, dupes, langs)
+        return
+
+    if args.ingest_batch:
+        updated = ingest_batch(data, args.ingest_batch, journal, tm, langs)
+        if dupes:
+            updated += dupes.propagate(data, reuse_fields, journal)
+        journal.compact(data, DST)
+        print(f"Ingested {updated} translations from {args.ingest_batch} →", DST)
+        return
+
+    only = None
+    if args.changed_only:
+        # tools/change_manifest.py en のマニフェストを前回処理したときの控えと比べ、元の英語が変わった提案を選ぶ
+        only = changed_ids("en", fields=("about_structured_en",), consumer=MANIFEST_CONSUMER)
+        if only is None:
+            print("No manifest diff for 'en'; run: python tools/change_manifest.py en")
+        else:
+            print(f"{len(only)} proposals changed since the last --changed-only run")
+
+    pending = select_pending(data, MAX_ITEMS, only, dupes, langs)
+    engine = shared_engine()
+    done: Counter = Counter()
+    failed: Counter = Counter()
+    failed_jobs = translate_jobs(engine, pending, tm, journal, done, failed)
+
+    # 代表がエラーになった言語は、そのメンバーが自分で訳す
+    if dupes and failed_jobs:
+        by_id = {p.get("proposal_id"): p for p in data}
+        fallback = [
+            (pid, by_id[pid], by_id[pid]["about_structured_en"].strip(), lang)
+            for canonical, lang in failed_jobs
+            for pid in dupes.followers([canonical])
+            if pid in by_id
+            and not by_id[pid].get(LANGUAGES[lang]["field"])
+            and (by_id[pid].get("about_structured_en") or "").strip()
+        ]
+        if fallback:
+            print(f"Translating {len(fallback)} near-duplicate jobs of failed proposals")
+            failed_jobs += translate_jobs(engine, fallback, tm, journal, done, failed)
+
+    # 代表の訳をほぼ同じ提案にコピーする
+    if dupes:
+        copied = dupes.propagate(data, reuse_fields, journal)
+        if copied:
+            print(f"Reused translations for {copied} near-duplicates")
+
+    # 最終保存（アトミックに置き換えてからジャーナルを消す）
+    journal.compact(data, DST)
     print("All done →", DST)
+    if args.changed_only:
+        # 失敗した提案（とその訳を借りるメンバー）は控えを進めず、次の --changed-only でも選ぶ
+        retry = {pid for pid, _lang in failed_jobs}
+        if dupes:
+            retry |= set(dupes.followers(retry))
+        acknowledge("en", MANIFEST_CONSUMER, pending=retry)
+    print("[langs] " + " ".join(f"{lang}: ok={done[lang]} failed={failed[lang]}" for lang in langs))
+    print(f"[llm] {engine.summary()}")
+    print(f"[tm] {tm.summary()}")
+    if REPAIRS:
+        repairs = " ".join(f"{kind}={n}" for kind, n in sorted(REPAIRS.items()))
+        print(f"[json] repaired replies: {repairs}")
 
 
 if __name__ == "__main__":
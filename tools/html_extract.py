@@ -0,0 +1,401 @@
+# tools/html_extract.py
+#
+# 提案ページ HTML から problem / solution / about / team / full_text を抜き出す。
+#
+# fetch_section / scrape_full_text は従来の実装（html.parser で毎回ツリー全体を
+# 探索する）で、出力の「正解」として残してある。extract_sections は同じ結果を
+# 1 回の走査で集め、パーサは lxml / selectolax が入っていれば指定して使える（既定は html.parser）。
+
+from bs4 import BeautifulSoup, Tag
+
+# 出力キー → h2 見出しに含まれる文字列
+SECTION_TITLES = {
+    "problem_en": "Problem",
+    "solution_en": "Solution",
+    "about_en": "About this idea",
+    "team_en": "Team",
+}
+
+SECTION_UNWANTED_PREFIXES = (
+    "Total to date",
+    "View current challenges",
+    "Sign up to receive news",
+    "We collect personal data",
+    "Follow us",
+)
+
+FULL_TEXT_UNWANTED_STARTS = (
+    "View current challenges",
+    "Sign up to receive news",
+    "We collect personal data",
+    "Follow us",
+    "Thank you for subscribing",
+)
+
+# bs4 の get_text() が拾わない（Script / Stylesheet などになる）要素
+NON_TEXT_TAGS = {"script", "style", "template", "rt", "rp"}
+
+BACKENDS = ("lxml", "selectolax", "html.parser")
+
+
+def fetch_section(soup, title: str) -> str:
+    """
+    h2 見出しから「同じレベルの兄弟」だけを拾って、
+    ・次の h2 が来たら終了
+    ・空行は捨てる
+    ・全く同じ文は 1 回だけ
+
+    ついでに、投票サマリーやフッターのような
+    「Total to date…」「Follow us…」などは除外する。
+    """
+    h2 = soup.find("h2", string=lambda x: x and title.lower() in x.lower())
+    if not h2:
+        return ""
+
+    parts = []
+    seen = set()
+
+    for sib in h2.next_siblings:
+        name = getattr(sib, "name", None)
+
+        if name == "h2":
+            break
+
+        if name in {"p", "div"}:
+            text = sib.get_text(" ", strip=True)
+            if not text:
+                continue
+            if any(text.startswith(pref) for pref in SECTION_UNWANTED_PREFIXES):
+                continue
+            if text in seen:
+                continue
+            seen.add(text)
+            parts.append(text)
+
+    return "\n\n".join(parts)
+
+
+def scrape_full_text(soup: BeautifulSoup) -> str:
+    """
+    フォーム全体を「壁テキスト」として1本にまとめる。
+    """
+    blocks = []
+
+    qa_blocks = soup.find_all(attrs={"data-testid": "question-answer"})
+
+    if qa_blocks:
+        for block in qa_blocks:
+            q_el = block.find(["h2", "h3", "h4"])
+            a_el = block.find(attrs={"data-testid": "answer"}) or block
+
+            q_text = q_el.get_text(" ", strip=True) if q_el else ""
+            a_text = a_el.get_text("\n", strip=True)
+
+            if not a_text:
+                continue
+
+            if q_text:
+                blocks.append(f"## {q_text}")
+            blocks.append(a_text)
+
+        raw_text = "\n\n".join(blocks)
+    else:
+        main = soup.find("main")
+        if main:
+            raw_text = main.get_text("\n", strip=True)
+        else:
+            raw_text = soup.get_text("\n", strip=True)
+
+    lines = []
+    seen_lines = set()
+
+    for raw_line in raw_text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        if any(line.startswith(pref) for pref in FULL_TEXT_UNWANTED_STARTS):
+            continue
+        if line in seen_lines:
+            continue
+        seen_lines.add(line)
+        lines.append(line)
+
+    return "\n\n".join(lines)
+
+
+def legacy_extract(html: str) -> dict:
+    """従来の scrape() と同じ抽出（ベンチマークと検証の基準）。"""
+    soup = BeautifulSoup(html, "html.parser")
+    result = {key: fetch_section(soup, title) for key, title in SECTION_TITLES.items()}
+    result["full_text_en"] = scrape_full_text(soup)
+    return result
+
+
+def available_backends() -> list[str]:
+    found = []
+    try:
+        import lxml  # noqa: F401
+
+        found.append("lxml")
+    except ImportError:
+        pass
+    try:
+        import selectolax  # noqa: F401
+
+        found.append("selectolax")
+    except ImportError:
+        pass
+    found.append("html.parser")
+    return found
+
+
+def resolve_backend(name: str = "auto") -> str:
+    """
+    "auto" は html.parser（従来の抽出と同じツリーになる）。
+    lxml / selectolax は閉じていない <p> などの壊れた HTML でツリーの組み方が
+    html.parser とずれ、出力が変わることがあるので、bench_extract.py --verify で
+    一致を確かめてから明示的に指定する。
+    """
+    if name == "auto":
+        return "html.parser"
+    if name not in BACKENDS:
+        raise ValueError(f"unknown parser backend: {name}")
+    if name not in available_backends():
+        raise ValueError(f"parser backend not installed: {name}")
+    return name
+
+
+def clean_section(texts) -> str:
+    """fetch_section と同じ除外・重複除去をして段落を連結する。"""
+    parts = []
+    seen = set()
+    for text in texts:
+        if not text:
+            continue
+        if any(text.startswith(pref) for pref in SECTION_UNWANTED_PREFIXES):
+            continue
+        if text in seen:
+            continue
+        seen.add(text)
+        parts.append(text)
+    return "\n\n".join(parts)
+
+
+def clean_full_text(raw_text: str) -> str:
+    """scrape_full_text と同じ行単位の除外・重複除去。"""
+    lines = []
+    seen_lines = set()
+    for raw_line in raw_text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        if any(line.startswith(pref) for pref in FULL_TEXT_UNWANTED_STARTS):
+            continue
+        if line in seen_lines:
+            continue
+        seen_lines.add(line)
+        lines.append(line)
+    return "\n\n".join(lines)
+
+
+def qa_raw_text(pairs) -> str:
+    """(質問, 回答) の列を "## 質問" + 回答 のブロックに並べる。"""
+    blocks = []
+    for q_text, a_text in pairs:
+        if not a_text:
+            continue
+        if q_text:
+            blocks.append(f"## {q_text}")
+        blocks.append(a_text)
+    return "\n\n".join(blocks)
+
+
+def match_heading(text, pending: dict, found: dict, node) -> None:
+    """h2 の .string が未発見の見出しに当てはまれば found に記録する。"""
+    if not text:
+        return
+    low = text.lower()
+    for key, title in list(pending.items()):
+        if title.lower() in low:
+            found[key] = node
+            del pending[key]
+
+
+# ---------------------------------------------------------------------------
+# BeautifulSoup（html.parser / lxml）
+# ---------------------------------------------------------------------------
+
+
+def _extract_bs4(html: str, features: str) -> dict:
+    soup = BeautifulSoup(html, features)
+
+    pending = {key: title for key, title in SECTION_TITLES.items()}
+    headings = {}
+    qa_blocks = []
+    main = None
+
+    # ツリー全体の走査はこの 1 回だけ（find_all の条件マッチを避けて直接たどる）
+    for tag in soup.descendants:
+        if not isinstance(tag, Tag):
+            continue
+        name = tag.name
+        if name == "h2" and pending:
+            match_heading(tag.string, pending, headings, tag)
+        elif name == "main" and main is None:
+            main = tag
+        if tag.get("data-testid") == "question-answer":
+            qa_blocks.append(tag)
+
+    result = {}
+    for key in SECTION_TITLES:
+        h2 = headings.get(key)
+        result[key] = clean_section(_bs4_sibling_texts(h2)) if h2 else ""
+
+    if qa_blocks:
+        pairs = []
+        for block in qa_blocks:
+            q_el = block.find(["h2", "h3", "h4"])
+            a_el = block.find(attrs={"data-testid": "answer"}) or block
+            pairs.append(
+                (
+                    q_el.get_text(" ", strip=True) if q_el else "",
+                    a_el.get_text("\n", strip=True),
+                )
+            )
+        raw_text = qa_raw_text(pairs)
+    else:
+        raw_text = (main or soup).get_text("\n", strip=True)
+
+    result["full_text_en"] = clean_full_text(raw_text)
+    return result
+
+
+def _bs4_sibling_texts(h2):
+    for sib in h2.next_siblings:
+        name = getattr(sib, "name", None)
+        if name == "h2":
+            break
+        if name in {"p", "div"}:
+            yield sib.get_text(" ", strip=True)
+
+
+# ---------------------------------------------------------------------------
+# selectolax（lexbor）
+# ---------------------------------------------------------------------------
+
+
+def _sx_is_text(node) -> bool:
+    return node.tag == "-text"
+
+
+def _sx_get_text(node, sep: str) -> str:
+    """bs4 の get_text(sep, strip=True) 相当（空文字は捨て、script などは除外）。"""
+    parts = []
+    for n in node.traverse(include_text=True):
+        if not _sx_is_text(n):
+            continue
+        parent = n.parent
+        skip = False
+        while parent is not None:
+            if parent.tag in NON_TEXT_TAGS:
+                skip = True
+                break
+            parent = parent.parent
+        if skip:
+            continue
+        text = (n.text(deep=False) or "").strip()
+        if text:
+            parts.append(text)
+    return sep.join(parts)
+
+
+def _sx_string(node):
+    """bs4 の Tag.string 相当（子がちょうど 1 つのときだけ中身の文字列）。"""
+    while True:
+        children = list(node.iter(include_text=True))
+        if len(children) != 1:
+            return None
+        child = children[0]
+        if _sx_is_text(child):
+            return child.text(deep=False)
+        if child.tag.startswith(("-", "_")):
+            return None
+        node = child
+
+
+def _sx_find(node, pred):
+    """node 自身を除く子孫から最初に pred を満たす要素を探す。"""
+    it = node.traverse()
+    next(it, None)
+    for n in it:
+        if pred(n):
+            return n
+    return None
+
+
+def _extract_selectolax(html: str) -> dict:
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(html)
+    root = tree.root
+
+    pending = {key: title for key, title in SECTION_TITLES.items()}
+    headings = {}
+    qa_blocks = []
+    main = None
+
+    for node in root.traverse():
+        tag = node.tag
+        if tag == "h2" and pending:
+            match_heading(_sx_string(node), pending, headings, node)
+        elif tag == "main" and main is None:
+            main = node
+        if (node.attributes or {}).get("data-testid") == "question-answer":
+            qa_blocks.append(node)
+
+    result = {}
+    for key in SECTION_TITLES:
+        h2 = headings.get(key)
+        result[key] = clean_section(_sx_sibling_texts(h2)) if h2 else ""
+
+    if qa_blocks:
+        pairs = []
+        for block in qa_blocks:
+            q_el = _sx_find(block, lambda n: n.tag in ("h2", "h3", "h4"))
+            a_el = (
+                _sx_find(
+                    block,
+                    lambda n: (n.attributes or {}).get("data-testid") == "answer",
+                )
+                or block
+            )
+            pairs.append(
+                (
+                    _sx_get_text(q_el, " ") if q_el else "",
+                    _sx_get_text(a_el, "\n"),
+                )
+            )
+        raw_text = qa_raw_text(pairs)
+    else:
+        raw_text = _sx_get_text(main or root, "\n")
+
+    result["full_text_en"] = clean_full_text(raw_text)
+    return result
+
+
+def _sx_sibling_texts(h2):
+    sib = h2.next
+    while sib is not None:
+        if sib.tag == "h2":
+            break
+        if sib.tag in ("p", "div"):
+            yield _sx_get_text(sib, " ")
+        sib = sib.next
+
+
+def extract_sections(html: str, backend: str = "auto") -> dict:
+    """1 回の走査で全セクションを抜き出す（出力は legacy_extract と同じ形）。"""
+    backend = resolve_backend(backend)
+    if backend == "selectolax":
+        return _extract_selectolax(html)
+    return _extract_bs4(html, backend)
@@ -0,0 +1,91 @@
+# tools/http_cache.py
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+CACHE_DIR = Path("data/.http_cache")
+
+
+class HttpCache:
+    """
+    proposal_url をキーにしたディスクキャッシュ。
+
+    1 URL につき
+      <sha256>.json … url / ETag / Last-Modified / 抽出済みフィールド
+      <sha256>.html … 本文（フィクスチャやベンチマークにも使える）
+    を保存する。304 が返ってきたら .json の抽出結果をそのまま使えばよく、
+    本文のダウンロードも BeautifulSoup での解析も要らない。
+    """
+
+    def __init__(self, root: Path = CACHE_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _meta_path(self, url: str) -> Path:
+        return self.root / f"{self._key(url)}.json"
+
+    def body_path(self, url: str) -> Path:
+        return self.root / f"{self._key(url)}.html"
+
+    def get(self, url: str) -> dict | None:
+        path = self._meta_path(url)
+        if not path.exists():
+            return None
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            # 壊れたエントリは無かったことにする
+            return None
+        if entry.get("url") != url or not isinstance(entry.get("extracted"), dict):
+            return None
+        return entry
+
+    @staticmethod
+    def conditional_headers(entry: dict | None) -> dict:
+        """保存済みのバリデータから If-None-Match / If-Modified-Since を作る。"""
+        headers = {}
+        if not entry:
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def _write_json(self, path: Path, obj: dict) -> None:
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(obj, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def put(
+        self,
+        url: str,
+        etag: str | None,
+        last_modified: str | None,
+        body: str,
+        extracted: dict,
+    ) -> None:
+        now = time.time()
+        self.body_path(url).write_text(body, encoding="utf-8")
+        self._write_json(
+            self._meta_path(url),
+            {
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "fetched_at": now,
+                "checked_at": now,
+                "extracted": extracted,
+            },
+        )
+
+    def touch(self, url: str, entry: dict) -> None:
+        """304 で再検証できたときに checked_at だけ更新する。"""
+        entry = {**entry, "checked_at": time.time()}
+        self._write_json(self._meta_path(url), entry)
@@ -0,0 +1,107 @@
+# tools/journal.py
+
+import json
+import os
+from pathlib import Path
+
+from telemetry import metrics
+
+
+def atomic_write_json(path: Path, obj, indent: int | None = 2) -> None:
+    """一時ファイルに書いてから os.replace で差し替える（途中で落ちても元が残る）。"""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with metrics().timer("json.write_seconds"):
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(obj, f, ensure_ascii=False, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+            metrics().count("json.bytes_written", f.tell())
+        os.replace(tmp, path)
+
+
+class ResultJournal:
+    """
+    提案ごとの結果を 1 行 1 レコードで追記していく JSONL ジャーナル。
+
+    {"proposal_id": "F14-0001", "fields": {...}}
+
+    - チェックポイントは 1 行の追記だけ（データセット全体は書き直さない）
+    - 次回起動時に apply() で読み戻せば、終わった分から自動で再開できる
+    - 最後に compact() で本体 JSON に反映し、ジャーナルを消す
+    """
+
+    def __init__(self, path: Path, fsync: bool = True):
+        self.path = Path(path)
+        self.fsync = fsync
+        self._fh = None
+
+    @classmethod
+    def for_file(cls, data_file: Path, stage: str, **kwargs) -> "ResultJournal":
+        data_file = Path(data_file)
+        return cls(data_file.with_name(f"{data_file.name}.{stage}.journal.jsonl"), **kwargs)
+
+    def load(self) -> dict[str, dict]:
+        """proposal_id → fields。同じ ID が複数あれば後の行で上書きマージする。"""
+        records: dict[str, dict] = {}
+        if not self.path.exists():
+            return records
+        with self.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    # 書き込み途中で落ちた最後の行は捨てる
+                    continue
+                pid = rec.get("proposal_id")
+                if pid:
+                    records.setdefault(pid, {}).update(rec.get("fields") or {})
+        return records
+
+    def apply(self, data: list[dict]) -> int:
+        """ジャーナルの内容を data に反映し、反映した件数を返す。"""
+        records = self.load()
+        if not records:
+            return 0
+        applied = 0
+        for item in data:
+            fields = records.get(item.get("proposal_id"))
+            if fields:
+                item.update(fields)
+                applied += 1
+        return applied
+
+    def append(self, pid: str, fields: dict) -> None:
+        if self._fh is None:
+            self._fh = self.path.open("a", encoding="utf-8")
+            # 途中で切れた最後の行に続けて書かないよう改行を補う
+            if self._fh.tell() > 0:
+                with self.path.open("rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        self._fh.write("\n")
+        line = json.dumps({"proposal_id": pid, "fields": fields}, ensure_ascii=False)
+        self._fh.write(line + "\n")
+        self._fh.flush()
+        if self.fsync:
+            os.fsync(self._fh.fileno())
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def compact(self, data, dst: Path) -> None:
+        """data を dst にアトミックに書き出してからジャーナルを消す。"""
+        self.close()
+        atomic_write_json(dst, data)
+        self.path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
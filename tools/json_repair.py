@@ -0,0 +1,90 @@
+# tools/json_repair.py
+#
+# LLM の JSON 返答を、多少崩れていてもできるだけ読む小物。
+#
+# - ```json ... ``` のコードフェンスや前後の説明文は捨てる
+# - JSON の後ろに余計な文字が続いていても、最初の値だけを読む
+# - 途中で切れた返答（max_tokens に当たったなど）は、書きかけの文字列・キーを捨てて
+#   括弧を閉じる（最後の要素は欠けるが、そろっている要素は使える）
+
+import json
+import re
+
+_FENCE_RE = re.compile(r"^```[a-zA-Z]*\s*")
+_DANGLING_KEY_RE = re.compile(r'(?:,\s*)?"(?:[^"\\]|\\.)*"\s*:\s*$')
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _scan(text: str) -> tuple[list[str], int | None]:
+    """(閉じていない括弧の並び, 閉じていない文字列の開始位置) を返す。"""
+    stack: list[str] = []
+    string_start = None
+    escape = False
+    for i, ch in enumerate(text):
+        if string_start is not None:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                string_start = None
+        elif ch == '"':
+            string_start = i
+        elif ch in _CLOSERS:
+            stack.append(ch)
+        elif ch in "]}" and stack:
+            stack.pop()
+    return stack, string_start
+
+
+def _close_truncated(text: str) -> str:
+    stack, string_start = _scan(text)
+    if string_start is not None:
+        # 書きかけの文字列は信用できないので捨てる
+        text = text[:string_start]
+    text = text.rstrip()
+    text = _DANGLING_KEY_RE.sub("", text).rstrip()
+    text = text.rstrip(",").rstrip()
+    stack, _ = _scan(text)
+    return text + "".join(_CLOSERS[c] for c in reversed(stack))
+
+
+def loads_lenient(content: str):
+    """
+    json.loads の代わり。読めなければ ValueError。
+    返り値の 2 つ目は、直したかどうか（"fence" / "trailing" / "truncated" / None）。
+    """
+    text = (content or "").strip()
+    try:
+        return json.loads(text), None
+    except ValueError:
+        pass
+
+    repaired = None
+    # 本文の Markdown にもコードブロックがありうるので、フェンスで始まるときだけ外す
+    if text.startswith("```"):
+        text = _FENCE_RE.sub("", text, count=1)
+        text = re.sub(r"\s*```\s*$", "", text)
+        repaired = "fence"
+
+    # 前置きの説明文を飛ばして、最初の { か [ から読む
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        raise ValueError("no JSON value in reply")
+    text = text[min(starts) :]
+
+    try:
+        return json.loads(text), repaired or "trailing"
+    except ValueError:
+        pass
+
+    try:
+        value, _end = json.JSONDecoder().raw_decode(text)
+        return value, repaired or "trailing"
+    except ValueError:
+        pass
+
+    try:
+        return json.loads(_close_truncated(text)), "truncated"
+    except ValueError as e:
+        raise ValueError(f"unrepairable JSON reply: {e}") from None
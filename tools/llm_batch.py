@@ -0,0 +1,194 @@
+# tools/llm_batch.py
+#
+# LLM ステージのオフライン（バッチジョブ）モード用の JSONL 入出力。
+#
+# リクエスト / レスポンスのファイル形式は OpenAI Batch API と同じ:
+#   request : {"custom_id": "...", "method": "POST", "url": "/v1/chat/completions", "body": {...}}
+#   response: {"custom_id": "...", "response": {"status_code": 200, "body": {...}}, "error": null}
+#
+# 流れ:
+#   1) python tools/format_about_with_llm.py --write-batch batch/format.jsonl
+#   2) python tools/llm_batch.py submit batch/format.jsonl          # プロバイダのバッチ API
+#      python tools/llm_batch.py download <batch_id> batch/format.out.jsonl
+#      （またはローカルで代わりに処理する）
+#      python tools/llm_batch.py run batch/format.jsonl batch/format.out.jsonl
+#   3) python tools/format_about_with_llm.py --ingest-batch batch/format.out.jsonl
+
+import argparse
+import json
+from pathlib import Path
+
+CHAT_COMPLETIONS_URL = "/v1/chat/completions"
+
+
+def custom_id(stage: str, pid: str, part: str = "") -> str:
+    """proposal_id から決まる安定した custom_id（stage:pid[:part]）。"""
+    return f"{stage}:{pid}:{part}" if part else f"{stage}:{pid}"
+
+
+def request_line(cid: str, messages: list[dict], model: str, **params) -> dict:
+    return {
+        "custom_id": cid,
+        "method": "POST",
+        "url": CHAT_COMPLETIONS_URL,
+        "body": {"model": model, "messages": messages, **params},
+    }
+
+
+def write_requests(path: Path, lines) -> int:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    n = 0
+    with path.open("w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+            n += 1
+    return n
+
+
+def iter_jsonl(path: Path):
+    with Path(path).open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # 途中で切れた行は無視（部分的な結果も取り込めるように）
+                continue
+
+
+def read_responses(path: Path) -> dict[str, tuple[str | None, str | None]]:
+    """
+    custom_id → (本文, エラー)。成功なら本文が入り、失敗ならエラー文字列が入る。
+    同じ custom_id が複数あれば、成功したものを優先する。
+    """
+    results: dict[str, tuple[str | None, str | None]] = {}
+    for rec in iter_jsonl(path):
+        cid = rec.get("custom_id")
+        if not cid:
+            continue
+        content, error = None, None
+        response = rec.get("response") or {}
+        body = response.get("body") or {}
+        if rec.get("error"):
+            error = json.dumps(rec["error"], ensure_ascii=False)
+        elif response.get("status_code") != 200:
+            error = f"status {response.get('status_code')}: {json.dumps(body, ensure_ascii=False)}"
+        else:
+            try:
+                content = (body["choices"][0]["message"]["content"] or "").strip()
+            except (KeyError, IndexError, TypeError):
+                error = "malformed response body"
+        if cid in results and results[cid][0] is not None and content is None:
+            continue
+        results[cid] = (content, error)
+    return results
+
+
+def run_local(requests_path: Path, responses_path: Path, engine) -> dict:
+    """
+    プロバイダのバッチ API の代わりに、リクエストファイルを LLMEngine で処理する。
+    responses_path に既に成功している custom_id は飛ばすので、途中から再開できる。
+    """
+    done = set()
+    if Path(responses_path).exists():
+        done = {
+            cid
+            for cid, (content, _err) in read_responses(responses_path).items()
+            if content is not None
+        }
+
+    todo = [r for r in iter_jsonl(requests_path) if r.get("custom_id") not in done]
+    counts = {"skipped": len(done), "ok": 0, "error": 0}
+
+    def call(req: dict):
+        body = dict(req["body"])
+        model = body.pop("model")
+        messages = body.pop("messages")
+        return engine.create(messages, model=model, **body)
+
+    with Path(responses_path).open("a", encoding="utf-8") as out:
+        for req, resp, err in engine.map(call, todo):
+            if err is None:
+                rec = {
+                    "custom_id": req["custom_id"],
+                    "response": {"status_code": 200, "body": resp.model_dump()},
+                    "error": None,
+                }
+                counts["ok"] += 1
+            else:
+                rec = {
+                    "custom_id": req["custom_id"],
+                    "response": None,
+                    "error": {"message": str(err)},
+                }
+                counts["error"] += 1
+            out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            out.flush()
+    return counts
+
+
+def submit(requests_path: Path, client) -> str:
+    """リクエストファイルをアップロードしてバッチを作り、batch id を返す。"""
+    with Path(requests_path).open("rb") as f:
+        uploaded = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=uploaded.id,
+        endpoint=CHAT_COMPLETIONS_URL,
+        completion_window="24h",
+    )
+    return batch.id
+
+
+def download(batch_id: str, responses_path: Path, client) -> str:
+    """
+    バッチの出力（とエラー）ファイルを responses_path に書き出し、ステータスを返す。
+    完了前でも、出力が出ていれば部分的な結果として取り込める。
+    """
+    batch = client.batches.retrieve(batch_id)
+    texts = []
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if file_id:
+            texts.append(client.files.content(file_id).text)
+    Path(responses_path).write_text(
+        "".join(t if t.endswith("\n") else t + "\n" for t in texts if t),
+        encoding="utf-8",
+    )
+    return batch.status
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="LLM バッチファイルの送信・取得・ローカル実行")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p_run = sub.add_parser("run", help="ローカルで（LLMEngine で）リクエストファイルを処理する")
+    p_run.add_argument("requests", type=Path)
+    p_run.add_argument("responses", type=Path)
+
+    p_submit = sub.add_parser("submit", help="プロバイダのバッチ API に送る")
+    p_submit.add_argument("requests", type=Path)
+
+    p_dl = sub.add_parser("download", help="バッチの結果をダウンロードする")
+    p_dl.add_argument("batch_id")
+    p_dl.add_argument("responses", type=Path)
+
+    args = ap.parse_args(argv)
+
+    from llm_engine import make_client, shared_engine
+
+    if args.cmd == "run":
+        engine = shared_engine()
+        counts = run_local(args.requests, args.responses, engine)
+        print(f"[llm_batch] {counts} → {args.responses}")
+        print(f"[llm_batch] {engine.summary()}")
+    elif args.cmd == "submit":
+        print(submit(args.requests, make_client()))
+    elif args.cmd == "download":
+        status = download(args.batch_id, args.responses, make_client())
+        print(f"[llm_batch] status={status} → {args.responses}")
+
+
+if __name__ == "__main__":
+    main()
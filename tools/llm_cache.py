@@ -0,0 +1,138 @@
+# tools/llm_cache.py
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+CACHE_PATH = Path("data/.llm_cache.sqlite3")
+# 既定の上限サイズ（返答本文のバイト数の合計）
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def cache_key(model: str, messages: list[dict], prompt_version: str = "", **params) -> str:
+    """(model, messages, temperature などのパラメータ, prompt_version) のハッシュ。"""
+    payload = {
+        "model": model,
+        "messages": messages,
+        "params": params,
+        "prompt_version": prompt_version,
+    }
+    blob = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    内容アドレスの LLM 返答キャッシュ（SQLite 1 ファイル）。
+
+    入力（モデル・メッセージ・温度・プロンプトのバージョン）が同じなら
+    proposal_id に関係なく同じ返答を返す。合計サイズが max_bytes を超えたら
+    最後に使われたのが古いものから消す（LRU）。
+    合計サイズは開いたときに 1 回だけ数え、あとは書き込み・削除のたびに足し引きする
+    （put のたびに全件を SUM しない）。上限を超えたときだけ数え直してから消す。
+    """
+
+    def __init__(self, path: Path = CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)"
+        )
+        self._conn.commit()
+        self._total = self._sum_sizes()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def _sum_sizes(self) -> int:
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return total
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            self.stats["hits"] += 1
+            return row[0]
+
+    def put(self, key: str, value: str) -> None:
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._total += size - (old[0] if old else 0)
+            self.stats["stores"] += 1
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        if self._total <= self.max_bytes:
+            return
+        # 他のプロセスも同じファイルに書くので、消す前に数え直す
+        self._total = self._sum_sizes()
+        if self._total <= self.max_bytes:
+            return
+        excess = self._total - self.max_bytes
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access ASC"
+        ):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self._total -= freed
+        self.stats["evictions"] += len(victims)
+
+    def usage(self) -> tuple[int, int]:
+        """(件数, 合計バイト数)"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+
+    def summary(self) -> str:
+        s = self.stats
+        lookups = s["hits"] + s["misses"]
+        rate = s["hits"] / lookups * 100 if lookups else 0.0
+        entries, size = self.usage()
+        return (
+            f"hits={s['hits']} misses={s['misses']} hit_rate={rate:.1f}% "
+            f"stores={s['stores']} evictions={s['evictions']} "
+            f"entries={entries} size={size / 1024:.0f}KiB"
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
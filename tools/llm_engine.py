@@ -0,0 +1,325 @@
+# tools/llm_engine.py
+#
+# LLM ステージ共通の実行エンジン。
+#
+# - スレッドプールで並列にリクエストを投げる（同時実行数の上限つき）
+# - 429 / 5xx を受けたら同時実行数を半分に、成功が続けば 1 ずつ戻す（AIMD）
+# - リクエスト数 / トークン数の分あたり予算（RPM / TPM）をトークンバケットで守る
+# - 再試行はジッター付き指数バックオフ（Retry-After があればそれ以上待つ）
+#
+# 設定は環境変数で渡す:
+#   LLM_CONCURRENCY  同時実行数の上限（既定 8）
+#   LLM_RPM          1 分あたりのリクエスト数（未設定なら無制限）
+#   LLM_TPM          1 分あたりのトークン数（未設定なら無制限）
+#   LLM_MAX_RETRIES  再試行回数（既定 5）
+#   OPENAI_BASE_URL  ローカルのスタブサーバなどに向けるとき
+#   LLM_CACHE        0 なら返答キャッシュを使わない
+#   LLM_CACHE_PATH   返答キャッシュの SQLite ファイル（既定 data/.llm_cache.sqlite3）
+#   LLM_CACHE_MAX_MB 返答キャッシュの上限サイズ
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+import openai
+from openai import OpenAI
+
+from llm_cache import CACHE_PATH, DEFAULT_MAX_BYTES, LLMCache, cache_key
+from rate_limit import TokenBucket, parse_retry_after
+from telemetry import metrics
+
+DEFAULT_MODEL = "gpt-4.1-mini"
+DEFAULT_CONCURRENCY = 8
+DEFAULT_MAX_RETRIES = 5
+# 返答側のトークン数の見積もり（TPM 予算の事前確保用）
+DEFAULT_COMPLETION_ESTIMATE = 512
+
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+def make_client(base_url: str | None = None) -> OpenAI:
+    """
+    SDK 側の自動リトライは切って、再試行はエンジンに任せる。
+    base_url（または OPENAI_BASE_URL）がローカルならダミーのキーで動かす。
+    """
+    base_url = base_url or os.environ.get("OPENAI_BASE_URL") or None
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        if not base_url:
+            raise RuntimeError(
+                "OPENAI_API_KEY が環境変数に設定されていません。export してください。"
+            )
+        api_key = "local-stub"
+    return OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+
+
+_shared_engine = None
+_shared_lock = threading.Lock()
+
+
+def shared_engine() -> "LLMEngine":
+    """環境変数から作ったエンジンを 1 つだけ作って使い回す（必要になるまで作らない）。"""
+    global _shared_engine
+    with _shared_lock:
+        if _shared_engine is None:
+            _shared_engine = LLMEngine.from_env()
+        return _shared_engine
+
+
+def estimate_tokens(text: str) -> int:
+    """ざっくり 4 文字 = 1 トークンで見積もる（予算の事前確保用）。"""
+    return max(1, len(text) // 4)
+
+
+_encoders: dict[str, object] = {}
+
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    """tiktoken が入っていれば正確に数え、なければ estimate_tokens で見積もる。"""
+    try:
+        import tiktoken
+    except ImportError:
+        return estimate_tokens(text)
+    enc = _encoders.get(model)
+    if enc is None:
+        try:
+            enc = tiktoken.encoding_for_model(model)
+        except KeyError:
+            enc = tiktoken.get_encoding("o200k_base")
+        _encoders[model] = enc
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def _env_float(name: str) -> float | None:
+    value = os.environ.get(name)
+    return float(value) if value else None
+
+
+class AIMDLimiter:
+    """
+    同時実行数を AIMD で調整するセマフォ。
+    - 成功が limit 回続くごとに +1（上限 max_limit）
+    - スロットリングされたら半分に（下限 min_limit）
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = self.max_limit
+        self._in_flight = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+    def on_success(self) -> None:
+        with self._cond:
+            self._successes += 1
+            if self._successes >= self.limit and self.limit < self.max_limit:
+                self.limit += 1
+                self._successes = 0
+                self._cond.notify()
+
+    def on_throttle(self) -> None:
+        with self._cond:
+            self.limit = max(self.min_limit, self.limit // 2)
+            self._successes = 0
+
+
+class LLMEngine:
+    """chat.completions を並列・レート制御・再試行つきで呼ぶ。"""
+
+    def __init__(
+        self,
+        client: OpenAI | None = None,
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        rpm: float | None = None,
+        tpm: float | None = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        cache: LLMCache | None = None,
+    ):
+        self.client = client or make_client()
+        self.cache = cache
+        self.max_concurrency = max(1, max_concurrency)
+        self.limiter = AIMDLimiter(self.max_concurrency)
+        self.request_bucket = TokenBucket(rpm / 60.0, max(1.0, rpm / 60.0)) if rpm else None
+        # 1 分ぶん貯められるようにし、それより大きいリクエストは不足分を待つ（切り詰めない）
+        self.token_bucket = TokenBucket(tpm / 60.0, tpm, allow_debt=True) if tpm else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "requests": 0,
+            "retries": 0,
+            "throttled": 0,
+            "errors": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+        }
+
+    @classmethod
+    def from_env(cls, client: OpenAI | None = None) -> "LLMEngine":
+        cache = None
+        if os.environ.get("LLM_CACHE", "1") not in ("0", "off", "false"):
+            max_mb = _env_float("LLM_CACHE_MAX_MB")
+            cache = LLMCache(
+                Path(os.environ.get("LLM_CACHE_PATH") or CACHE_PATH),
+                max_bytes=int(max_mb * 1024 * 1024) if max_mb else DEFAULT_MAX_BYTES,
+            )
+        return cls(
+            client=client,
+            cache=cache,
+            max_concurrency=int(os.environ.get("LLM_CONCURRENCY") or DEFAULT_CONCURRENCY),
+            rpm=_env_float("LLM_RPM"),
+            tpm=_env_float("LLM_TPM"),
+            max_retries=int(os.environ.get("LLM_MAX_RETRIES") or DEFAULT_MAX_RETRIES),
+        )
+
+    def _count(self, **deltas) -> None:
+        with self._stats_lock:
+            for k, v in deltas.items():
+                self.stats[k] += v
+
+    def _wait_budget(self, messages: list[dict], max_tokens: int | None) -> None:
+        if self.request_bucket is not None:
+            self.request_bucket.acquire()
+        if self.token_bucket is not None:
+            prompt = sum(estimate_tokens(str(m.get("content", ""))) for m in messages)
+            self.token_bucket.acquire(prompt + (max_tokens or DEFAULT_COMPLETION_ESTIMATE))
+
+    def _backoff(self, attempt: int, retry_after: float | None) -> float:
+        # full jitter: 0〜min(max_delay, base * 2^attempt) の一様乱数
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    @staticmethod
+    def _classify(exc: Exception) -> tuple[bool, bool, float | None]:
+        """(再試行するか, スロットリングか, Retry-After 秒) を返す。"""
+        if isinstance(exc, openai.APIConnectionError):
+            return True, False, None
+        status = getattr(exc, "status_code", None)
+        if status is None:
+            return False, False, None
+        response = getattr(exc, "response", None)
+        retry_after = None
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("retry-after"))
+        throttled = status == 429 or status >= 500
+        return (status in RETRYABLE_STATUS or status >= 500), throttled, retry_after
+
+    def create(self, messages: list[dict], model: str = DEFAULT_MODEL, **kwargs):
+        """1 リクエスト分。成功したレスポンスオブジェクトを返す。"""
+        for attempt in range(self.max_retries + 1):
+            self._wait_budget(messages, kwargs.get("max_tokens"))
+            self.limiter.acquire()
+            started = time.perf_counter()
+            try:
+                self._count(requests=1)
+                metrics().count("llm.requests")
+                resp = self.client.chat.completions.create(
+                    model=model, messages=messages, **kwargs
+                )
+            except Exception as e:
+                metrics().observe("llm.error_latency", time.perf_counter() - started)
+                retryable, throttled, retry_after = self._classify(e)
+                if throttled:
+                    self._count(throttled=1)
+                    metrics().count("llm.throttled")
+                    self.limiter.on_throttle()
+                    if retry_after and self.request_bucket is not None:
+                        self.request_bucket.pause_for(retry_after)
+                if not retryable or attempt >= self.max_retries:
+                    self._count(errors=1)
+                    metrics().count("llm.errors")
+                    raise
+                self._count(retries=1)
+                metrics().count("llm.retries")
+                delay = self._backoff(attempt, retry_after)
+            else:
+                metrics().observe("llm.latency", time.perf_counter() - started)
+                self.limiter.on_success()
+                usage = getattr(resp, "usage", None)
+                if usage is not None:
+                    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+                    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+                    self._count(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+                    metrics().add_tokens(model, prompt_tokens, completion_tokens)
+                return resp
+            finally:
+                self.limiter.release()
+            time.sleep(delay)
+        raise RuntimeError("unreachable")
+
+    def chat(
+        self,
+        messages: list[dict],
+        model: str = DEFAULT_MODEL,
+        prompt_version: str = "",
+        **kwargs,
+    ) -> str:
+        """
+        返答の本文（strip 済み）だけを返す。
+        キャッシュがあれば (model, messages, kwargs, prompt_version) で引き、
+        当たれば API は呼ばない。
+        """
+        key = None
+        if self.cache is not None:
+            key = cache_key(model, messages, prompt_version, **kwargs)
+            cached = self.cache.get(key)
+            if cached is not None:
+                metrics().count("llm.cache_hits")
+                return cached
+        resp = self.create(messages, model=model, **kwargs)
+        content = (resp.choices[0].message.content or "").strip()
+        if key is not None:
+            self.cache.put(key, content)
+        return content
+
+    def map(self, fn, items):
+        """
+        items の各要素に fn を並列で適用し、終わった順に
+        (item, result, error) を yield する。
+        fn の中で self.chat() を何回呼んでもよい（同時実行数は limiter が守る）。
+        """
+        def timed(item):
+            # 1 レコード分（キャッシュ・再試行・分割した呼び出しを含む）の時間
+            with metrics().timer("record.seconds"):
+                return fn(item)
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            pending = {pool.submit(timed, item): item for item in items}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    item = pending.pop(fut)
+                    try:
+                        yield item, fut.result(), None
+                    except Exception as e:
+                        yield item, None, e
+
+    def summary(self) -> str:
+        s = self.stats
+        return (
+            f"requests={s['requests']} retries={s['retries']} throttled={s['throttled']} "
+            f"errors={s['errors']} tokens_in={s['prompt_tokens']} "
+            f"tokens_out={s['completion_tokens']} concurrency={self.limiter.limit}"
+            + (f" | cache: {self.cache.summary()}" if self.cache is not None else "")
+        )
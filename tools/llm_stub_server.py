@@ -0,0 +1,458 @@
+# tools/llm_stub_server.py
+#
+# chat.completions 互換のローカルスタブサーバ（API 代を使わずに並列度や再試行を試す用）。
+#
+# - 返答は入力から決定的に作る（JSON を求められていれば同じ形で返す）
+# - 遅延は固定値か分布で（uniform / normal / lognormal / exp）、出力トークンあたりの遅延も足せる
+# - 429（Retry-After つき）と 500 を確率で返す（--seed で再現できる）
+# - モデルごとのトークン数を数え、GET /v1/stub/stats と終了時に出す
+# - --record: 初めてのリクエストは本物の API（--upstream）に流して返答を録音し、2 回目からはそれを返す
+#   --replay: 録音だけを返す（録音にないリクエストは 404、--replay-miss fake ならダミーの返答）
+#
+#   python tools/llm_stub_server.py --port 8765 --latency lognormal:0.8,0.5 --rate-limit-prob 0.1
+#   OPENAI_BASE_URL=http://127.0.0.1:8765/v1 python translate_sample.py
+#
+# -- の後ろにコマンドを書くと、OPENAI_BASE_URL をスタブに向けてそれを走らせ、終わったら止まる:
+#   python tools/llm_stub_server.py --record data/llm_cassette.jsonl -- python tools/pipeline.py
+#   python tools/llm_stub_server.py --replay data/llm_cassette.jsonl -- python tools/pipeline.py
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from llm_cache import cache_key
+from llm_engine import count_tokens
+
+# プロンプト中の {"ja": "...", "ja_elp": "..."} のような出力例からキーを拾う
+JSON_KEY_RE = re.compile(r'"([A-Za-z_][\w\-]*)"\s*:\s*"')
+# {"segments": ["...", ...]} のように配列を求めるキー
+JSON_LIST_KEY_RE = re.compile(r'"([A-Za-z_][\w\-]*)"\s*:\s*\[')
+
+DEFAULT_PORT = 8765
+DEFAULT_UPSTREAM = "https://api.openai.com/v1"
+UPSTREAM_TIMEOUT = 300
+
+# 録音のキーに入れないリクエストの項目（返答の中身に関係しない）
+KEY_IGNORED = ("model", "messages", "stream", "user", "metadata", "store")
+
+
+def input_array(prompt: str) -> list | None:
+    """プロンプトに埋め込まれた入力の JSON 配列（行頭の [ から読めるもの）。"""
+    decoder = json.JSONDecoder()
+    for m in re.finditer(r"^\[", prompt, re.M):
+        try:
+            value, _end = decoder.raw_decode(prompt, m.start())
+        except ValueError:
+            continue
+        if isinstance(value, list):
+            return value
+    return None
+
+
+def fake_reply(messages: list[dict]) -> str:
+    """入力から決定的に作るダミーの返答。JSON を求められていれば同じキーで返す。"""
+    prompt = "\n".join(str(m.get("content", "")) for m in messages)
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+    if "JSON" in prompt:
+        list_keys = JSON_LIST_KEY_RE.findall(prompt)
+        items = input_array(prompt) if list_keys else None
+        if items is not None:
+            # 入力の配列と同じ数だけ返す（呼び出し側が数を確かめる）
+            return json.dumps(
+                {list_keys[0]: [f"[stub {digest}/{i}] {str(x)[:40]}" for i, x in enumerate(items)]},
+                ensure_ascii=False,
+            )
+        keys = list(dict.fromkeys(JSON_KEY_RE.findall(prompt)))
+        if keys:
+            return json.dumps({k: f"[stub {k} {digest}]" for k in keys}, ensure_ascii=False)
+    first = next((line for line in prompt.splitlines() if line.strip()), "")
+    return f"[stub {digest}] {first[:80]}"
+
+
+def parse_latency(spec) -> tuple[str, tuple[float, ...]]:
+    """
+    遅延の指定を (分布, パラメータ) にする（単位は秒）。
+      0.5                 固定
+      uniform:LO,HI       一様分布
+      normal:MEAN,SD      正規分布（負は 0）
+      lognormal:MEDIAN,S  対数正規分布（中央値と log の標準偏差。API の遅延に近い裾の長さ）
+      exp:MEAN            指数分布
+    """
+    if isinstance(spec, (int, float)):
+        return "fixed", (float(spec),)
+    kind, _, params = str(spec).partition(":")
+    if not params:
+        return "fixed", (float(kind),)
+    values = tuple(float(x) for x in params.split(","))
+    arity = {"uniform": 2, "normal": 2, "lognormal": 2, "exp": 1}
+    if kind not in arity:
+        raise ValueError(f"unknown latency distribution: {kind} (choose from {', '.join(arity)})")
+    if len(values) != arity[kind]:
+        raise ValueError(f"{kind} takes {arity[kind]} parameters: {spec}")
+    return kind, values
+
+
+def sample_latency(latency: tuple[str, tuple[float, ...]], rng: random.Random) -> float:
+    kind, p = latency
+    if kind == "uniform":
+        return rng.uniform(p[0], p[1])
+    if kind == "normal":
+        return max(0.0, rng.gauss(p[0], p[1]))
+    if kind == "lognormal":
+        return rng.lognormvariate(math.log(p[0]), p[1]) if p[0] > 0 else 0.0
+    if kind == "exp":
+        return rng.expovariate(1 / p[0]) if p[0] > 0 else 0.0
+    return p[0]
+
+
+def request_key(req: dict) -> str:
+    """録音を引くキー（llm_cache と同じ作り方で、model・messages・温度などのパラメータから）。"""
+    params = {k: v for k, v in req.items() if k not in KEY_IGNORED}
+    return cache_key(req.get("model", ""), req.get("messages") or [], **params)
+
+
+def completion(model: str, content: str, prompt_tokens: int, completion_tokens: int) -> dict:
+    return {
+        "id": f"chatcmpl-stub-{int(time.time() * 1000)}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+class Cassette:
+    """
+    録音した返答（JSONL、1 行 1 リクエスト）。起動時に全部読み、録音は 1 行ずつ追記する。
+    同じキーが何度も書かれていたら最後の行を使う。
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.entries: dict[str, dict] = {}
+        if self.path.exists():
+            with self.path.open(encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry["key"]] = entry["response"]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            return self.entries.get(key)
+
+    def put(self, key: str, request: dict, response: dict) -> None:
+        line = json.dumps(
+            {"key": key, "recorded": time.time(), "request": request, "response": response},
+            ensure_ascii=False,
+        )
+        with self._lock:
+            self.entries[key] = response
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server_version = "llm-stub/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, obj: dict, headers: dict | None = None) -> None:
+        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status: int, message: str, kind: str, headers: dict | None = None) -> None:
+        self._send_json(status, {"error": {"message": message, "type": kind}}, headers)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stub/stats"):
+            self._send_json(200, self.server.stats())
+            return
+        self._error(404, f"unknown path {self.path}", "invalid_request_error")
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._error(404, f"unknown path {self.path}", "invalid_request_error")
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            req = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._error(400, "invalid JSON body", "invalid_request_error")
+            return
+
+        server = self.server
+        opts = server.options
+        delay, fault = server.draw()
+        if fault == "rate_limited":
+            time.sleep(delay)
+            server.bump("rate_limited")
+            self._error(
+                429, "stub rate limit", "rate_limit_error", {"Retry-After": str(opts["retry_after"])}
+            )
+            return
+        if fault == "server_error":
+            time.sleep(delay)
+            server.bump("server_error")
+            self._error(500, "stub server error", "server_error")
+            return
+
+        model = req.get("model", "stub")
+        key = request_key(req)
+        resp = server.cassette.get(key) if server.cassette is not None else None
+        if resp is not None:
+            server.bump("replayed")
+        elif opts["record"]:
+            try:
+                resp = server.forward(req)
+            except urllib.error.HTTPError as e:
+                # 本物の API のエラーは状態コードをそのまま返す（録音はしない）
+                server.bump("upstream_error")
+                retry_after = e.headers.get("Retry-After")
+                body = e.read()[:500].decode("utf-8", "replace")
+                self._error(
+                    e.code,
+                    f"upstream: {body}",
+                    "upstream_error",
+                    {"Retry-After": retry_after} if retry_after else None,
+                )
+                return
+            except (OSError, ValueError) as e:
+                server.bump("upstream_error")
+                self._error(502, f"upstream: {e}", "upstream_error")
+                return
+            server.cassette.put(key, req, resp)
+            server.bump("recorded")
+            delay = 0.0  # 本物の遅延がもうかかっている
+        elif opts["replay"] and opts["replay_miss"] != "fake":
+            server.bump("missed")
+            self._error(404, f"no recorded response for {key[:16]}", "invalid_request_error")
+            return
+        else:
+            messages = req.get("messages") or []
+            content = fake_reply(messages)
+            resp = completion(
+                model,
+                content,
+                sum(count_tokens(str(m.get("content", "")), model) for m in messages),
+                count_tokens(content, model),
+            )
+            server.bump("ok")
+
+        usage = resp.get("usage") or {}
+        completion_tokens = usage.get("completion_tokens", 0)
+        server.add_tokens(model, usage.get("prompt_tokens", 0), completion_tokens)
+        time.sleep(delay + opts["token_latency"] * completion_tokens)
+        self._send_json(200, resp)
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, options: dict):
+        super().__init__(addr, StubHandler)
+        self.options = {
+            "latency": 0.0,
+            "token_latency": 0.0,
+            "rate_limit_prob": 0.0,
+            "error_prob": 0.0,
+            "retry_after": 1.0,
+            "seed": None,
+            "record": None,
+            "replay": None,
+            "replay_miss": "error",
+            "upstream": DEFAULT_UPSTREAM,
+            **options,
+        }
+        self.latency = parse_latency(self.options["latency"])
+        self.rng = random.Random(self.options["seed"])
+        cassette = self.options["record"] or self.options["replay"]
+        self.cassette = Cassette(cassette) if cassette else None
+        self.counts = {"ok": 0, "rate_limited": 0, "server_error": 0}
+        self.tokens: dict[str, list[int]] = {}
+        self._lock = threading.Lock()
+
+    def bump(self, key: str) -> None:
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def add_tokens(self, model: str, prompt_tokens: int, completion_tokens: int) -> None:
+        with self._lock:
+            t = self.tokens.setdefault(model, [0, 0])
+            t[0] += prompt_tokens
+            t[1] += completion_tokens
+
+    def draw(self) -> tuple[float, str | None]:
+        """(遅延, 返すエラー) を 1 リクエスト分引く。--seed があれば到着順で再現する。"""
+        opts = self.options
+        with self._lock:
+            delay = sample_latency(self.latency, self.rng)
+            r = self.rng.random()
+        if r < opts["rate_limit_prob"]:
+            return delay, "rate_limited"
+        if r < opts["rate_limit_prob"] + opts["error_prob"]:
+            return delay, "server_error"
+        return delay, None
+
+    def forward(self, req: dict) -> dict:
+        """本物の API（upstream）に同じリクエストを送る（--record で録音にないとき）。"""
+        api_key = os.environ.get("OPENAI_API_KEY", "")
+        http_req = urllib.request.Request(
+            self.options["upstream"].rstrip("/") + "/chat/completions",
+            data=json.dumps(req).encode("utf-8"),
+            headers={"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"},
+        )
+        with urllib.request.urlopen(http_req, timeout=UPSTREAM_TIMEOUT) as r:
+            return json.loads(r.read())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "counts": dict(self.counts),
+                "tokens": {
+                    model: {"prompt_tokens": t[0], "completion_tokens": t[1]}
+                    for model, t in sorted(self.tokens.items())
+                },
+                "cassette": len(self.cassette) if self.cassette is not None else None,
+            }
+
+    def summary(self) -> str:
+        s = self.stats()
+        counts = " ".join(f"{k}={v}" for k, v in s["counts"].items())
+        tokens = " ".join(
+            f"{model}: in={t['prompt_tokens']} out={t['completion_tokens']}"
+            for model, t in s["tokens"].items()
+        )
+        return counts + (f" | {tokens}" if tokens else "")
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def start_stub_server(port: int = 0, latency=0.0, **options) -> StubServer:
+    """
+    バックグラウンドスレッドでスタブを起動して返す（ベンチマークから使う）。
+    options は rate_limit_prob / error_prob / retry_after / token_latency / seed /
+    record / replay / replay_miss / upstream（コマンドラインの同名のオプションと同じ）。
+    """
+    server = StubServer(("127.0.0.1", port), {"latency": latency, **options})
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="chat.completions 互換のスタブサーバ")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT, help="0 なら空いているポート")
+    ap.add_argument(
+        "--latency",
+        default="0",
+        help="1 リクエストあたりの遅延（秒）。0.5 / uniform:LO,HI / normal:MEAN,SD / "
+        "lognormal:MEDIAN,SIGMA / exp:MEAN",
+    )
+    ap.add_argument("--token-latency", type=float, default=0.0, help="出力 1 トークンあたりに足す遅延（秒）")
+    ap.add_argument("--rate-limit-prob", type=float, default=0.0, help="429 を返す確率")
+    ap.add_argument("--error-prob", type=float, default=0.0, help="500 を返す確率")
+    ap.add_argument("--retry-after", type=float, default=1.0)
+    ap.add_argument("--seed", type=int, help="遅延とエラーの乱数のシード")
+    mode = ap.add_mutually_exclusive_group()
+    mode.add_argument("--record", type=Path, help="録音にないリクエストは本物の API に流して、ここに録音する")
+    mode.add_argument("--replay", type=Path, help="ここに録音した返答だけを返す")
+    ap.add_argument(
+        "--replay-miss",
+        choices=("error", "fake"),
+        default="error",
+        help="--replay で録音にないリクエストに 404 を返すか、ダミーの返答を返すか",
+    )
+    ap.add_argument("--upstream", default=DEFAULT_UPSTREAM, help="--record で流す先の API")
+    ap.add_argument("command", nargs=argparse.REMAINDER, help="-- の後ろに、スタブに向けて走らせるコマンド")
+    args = ap.parse_args(argv)
+    if args.command and args.command[0] == "--":
+        args.command = args.command[1:]
+    try:
+        parse_latency(args.latency)
+    except ValueError as e:
+        ap.error(str(e))
+    if args.record and not os.environ.get("OPENAI_API_KEY"):
+        ap.error("--record には OPENAI_API_KEY が必要です（本物の API に流すため）")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    server = StubServer(
+        ("127.0.0.1", args.port),
+        {
+            "latency": args.latency,
+            "token_latency": args.token_latency,
+            "rate_limit_prob": args.rate_limit_prob,
+            "error_prob": args.error_prob,
+            "retry_after": args.retry_after,
+            "seed": args.seed,
+            "record": args.record,
+            "replay": args.replay,
+            "replay_miss": args.replay_miss,
+            "upstream": args.upstream,
+        },
+    )
+    if server.cassette is not None:
+        print(f"[llm_stub] {len(server.cassette)} recorded responses in {server.cassette.path}")
+    print(f"[llm_stub] listening on {server.base_url}", flush=True)
+
+    if not args.command:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            print(f"[llm_stub] {server.summary()}")
+        return
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        proc = subprocess.run(args.command, env={**os.environ, "OPENAI_BASE_URL": server.base_url})
+    finally:
+        server.shutdown()
+        print(f"[llm_stub] {server.summary()}")
+    sys.exit(proc.returncode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+# tools/md_sections.py
+#
+# 壁テキスト / 構造化 Markdown を「見出し単位」で分けたりまとめたりする小物。
+
+import re
+
+# 見出しの前後に入る区切り線（.eleventy.js の split_hr_sections はこれで分割する）
+HR_LINE_RE = re.compile(r"^\s*(?:-{3,}|\*{3,}|_{3,}|<hr\s*/?>)\s*$", re.IGNORECASE)
+
+
+def split_question_blocks(wall_text: str) -> list[str]:
+    """scrape_full_text が出した "## 質問" + 回答 のブロックごとに分ける。"""
+    blocks = []
+    current: list[str] = []
+    for para in wall_text.split("\n\n"):
+        if para.startswith("## ") and current:
+            blocks.append("\n\n".join(current))
+            current = []
+        current.append(para)
+    if current:
+        blocks.append("\n\n".join(current))
+    return blocks
+
+
+def _split_oversized(block: str, budget: int, count) -> list[str]:
+    """1 ブロックだけで予算を超えるときは段落単位、それでもだめなら文字数で切る。"""
+    pieces = []
+    current: list[str] = []
+    size = 0
+    for para in block.split("\n\n"):
+        n = count(para)
+        if n > budget:
+            # 1 段落が大きすぎる: トークン比で文字数に換算して切る
+            step = max(1, int(len(para) * budget / n))
+            parts = [para[i : i + step] for i in range(0, len(para), step)]
+        else:
+            parts = [para]
+        for part in parts:
+            n = count(part)
+            if current and size + n > budget:
+                pieces.append("\n\n".join(current))
+                current, size = [], 0
+            current.append(part)
+            size += n
+    if current:
+        pieces.append("\n\n".join(current))
+    return pieces
+
+
+def chunk_by_questions(wall_text: str, budget: int, count) -> list[str]:
+    """
+    count(text) のトークン数が budget 以下になるよう、質問ブロックの境目で分割する。
+    収まっていれば [wall_text] をそのまま返す。
+    """
+    if count(wall_text) <= budget:
+        return [wall_text]
+
+    chunks = []
+    current: list[str] = []
+    size = 0
+    for block in split_question_blocks(wall_text):
+        n = count(block)
+        pieces = [block] if n <= budget else _split_oversized(block, budget, count)
+        for piece in pieces:
+            n = count(piece)
+            if current and size + n > budget:
+                chunks.append("\n\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += n
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def _strip_hr(lines: list[str]) -> list[str]:
+    while lines and (not lines[0].strip() or HR_LINE_RE.match(lines[0])):
+        lines = lines[1:]
+    while lines and (not lines[-1].strip() or HR_LINE_RE.match(lines[-1])):
+        lines = lines[:-1]
+    return lines
+
+
+def split_sections(markdown: str) -> list[tuple[str | None, str]]:
+    """
+    "## " 見出しごとに (見出し行, 本文) に分ける。
+    最初の見出しより前の部分は見出し None として返す（空なら返さない）。
+    本文の前後の空行と区切り線（---, <hr>）は取り除く。
+    """
+    sections = []
+    heading = None
+    lines: list[str] = []
+
+    def flush():
+        body = "\n".join(_strip_hr(lines))
+        if heading is not None or body:
+            sections.append((heading, body))
+
+    for line in markdown.splitlines():
+        if line.startswith("## "):
+            flush()
+            heading = line.strip()
+            lines = []
+        else:
+            lines.append(line)
+    flush()
+    return sections
+
+
+def split_segments(markdown: str) -> list[tuple[str, bool]]:
+    """
+    翻訳メモリ用に、"## " 見出しと区切り線（---, <hr>）の境目で (テキスト, 訳すか) に分ける。
+    区切り線と空白だけの部分は訳さない。全部つなげると元の文書に戻る。
+    """
+    pieces: list[tuple[str, bool]] = []
+    current: list[str] = []
+
+    def flush():
+        if current:
+            text = "".join(current)
+            pieces.append((text, bool(text.strip())))
+            current.clear()
+
+    for line in markdown.splitlines(keepends=True):
+        if HR_LINE_RE.match(line):
+            flush()
+            pieces.append((line, False))
+        else:
+            if line.startswith("## "):
+                flush()
+            current.append(line)
+    flush()
+    return pieces
+
+
+def join_segments(pieces: list[tuple[str, bool]], translate) -> str:
+    """
+    split_segments の結果を、訳す部分だけ translate(前後の空白を除いたテキスト) に置き換えてつなぐ。
+    前後の空白（段落の区切り）は元のまま残す。
+    """
+    out = []
+    for text, translatable in pieces:
+        if not translatable:
+            out.append(text)
+            continue
+        body = text.strip()
+        start = text.index(body)
+        out.append(text[:start] + translate(body).strip() + text[start + len(body) :])
+    return "".join(out)
+
+
+def section_key(heading: str | None) -> str:
+    """
+    見出しの照合用キー。"## 1. Problem Statement" → "1"、
+    "## 📌 Proposal Overview" → "overview"、それ以外は英数字だけにしたもの。
+    """
+    if heading is None:
+        return ""
+    normalized = re.sub(r"[^0-9a-z]+", " ", heading.lower()).strip()
+    m = re.match(r"(\d+)\b", normalized)
+    if m:
+        return m.group(1)
+    if "overview" in normalized:
+        return "overview"
+    return normalized
+
+
+LIST_ITEM_RE = re.compile(r"^\s*(?:[-*+]|\d+\.)\s")
+
+
+def _continues(prev_line: str, next_line: str) -> bool:
+    """表の行どうし・箇条書きどうしなら、空行を挟まずに続けるべき。"""
+    if prev_line.lstrip().startswith("|") and next_line.lstrip().startswith("|"):
+        return True
+    return bool(LIST_ITEM_RE.match(prev_line) and LIST_ITEM_RE.match(next_line))
+
+
+TABLE_SEPARATOR_RE = re.compile(r"^\s*\|?\s*:?-{3,}:?\s*(?:\|\s*:?-{3,}:?\s*)*\|?\s*$")
+
+
+def _drop_overlap(prev_lines: list[str], lines: list[str]) -> list[str]:
+    """
+    同じセクションの続きとして足す行から、チャンクのつなぎ目で繰り返された行だけを落とす。
+    - 前にある表のヘッダ（ヘッダ行 + 区切り行）で始まっていれば、そのヘッダ
+    - 前の部分の末尾と同じ行の並びで始まっていれば、その重なり
+    それ以外の同じ行（本文中で繰り返される箇条書きなど）は残す。
+    """
+    prev = [line.strip() for line in prev_lines]
+    if len(lines) >= 2 and lines[0].lstrip().startswith("|") and TABLE_SEPARATOR_RE.match(lines[1]):
+        header = [lines[0].strip(), lines[1].strip()]
+        if any(prev[i : i + 2] == header for i in range(len(prev) - 1)):
+            lines = lines[2:]
+    stripped = [line.strip() for line in lines]
+    for k in range(min(len(prev), len(stripped)), 0, -1):
+        if prev[-k:] == stripped[:k]:
+            return lines[k:]
+    return lines
+
+
+def merge_sections(parts: list[str], layout: list[str]) -> str:
+    """
+    分割して整形した Markdown をひとつの文書にまとめる。
+    - layout（見出し行のリスト）の順に並べ、layout にない見出しは後ろに出てきた順で足す
+    - 同じセクションの続きでは、つなぎ目で繰り返された行（表のヘッダ行、前のチャンクの末尾）を落とす
+    - セクションの間には "---" を入れる（既存の about_structured_en と同じ体裁）
+    """
+    order = [section_key(h) for h in layout]
+    headings = {section_key(h): h for h in layout}
+    bodies: dict[str, list[str]] = {}
+
+    for part in parts:
+        for heading, body in split_sections(part):
+            key = section_key(heading)
+            if key not in headings:
+                headings[key] = heading
+                order.append(key)
+            prev = bodies.setdefault(key, [])
+            lines = body.splitlines()
+            if prev:
+                lines = _drop_overlap("\n".join(prev).splitlines(), lines)
+            text = "\n".join(_strip_hr(lines))
+            if not text:
+                continue
+            if prev and _continues(prev[-1].splitlines()[-1], text.splitlines()[0]):
+                # 表や箇条書きの続きはそのまま行を足す（空行を挟むと別の表になってしまう）
+                prev[-1] = prev[-1] + "\n" + text
+            else:
+                prev.append(text)
+
+    out = []
+    for key in order:
+        if key not in bodies:
+            continue
+        body = "\n\n".join(bodies[key])
+        heading = headings.get(key)
+        out.append(f"{heading}\n\n{body}" if heading else body)
+    return "\n\n---\n\n".join(out)
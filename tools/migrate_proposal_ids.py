@@ -0,0 +1,141 @@
+# tools/migrate_proposal_ids.py
+#
+# 行番号ベースの旧 ID（F14-0001）を、内容から決まる新 ID（tools/proposal_ids.py）に置き換える。
+# 翻訳済みのデータはそのまま残るので、API を呼び直さずに新しい ID に移行できる。
+#
+#   python tools/migrate_proposal_ids.py --dry-run
+#   python tools/migrate_proposal_ids.py
+#
+# - レコードに challenge / proposal_url / title_en があれば、そこから新 ID を計算する
+# - ジャーナルのように ID しか持たないものは、対応表（旧 → 新）で置き換える
+# - 対応表は data/f14_id_migration.json に保存する（後から古いファイルを移すときにも使える）
+#
+# 提案ページの URL（/proposals/<小文字の ID>/）も変わる。サイトのビルドでは対応表から
+# 旧 URL のリダイレクト（site/proposal_redirect.njk）を作るので、対応表は消さないこと。
+
+import argparse
+import json
+from pathlib import Path
+
+from journal import atomic_write_json
+from proposal_ids import IdAssigner, is_legacy_id, record_id
+from records import iter_records, write_records
+
+DATA_DIR = Path("data")
+MAP_FILE = DATA_DIR / "f14_id_migration.json"
+
+# 対応表を作る元（先にあるものほど優先）
+SOURCE_FILES = [
+    DATA_DIR / "f14_proposals_en.json",
+    DATA_DIR / "f14_proposals_ja.json",
+]
+
+# ID を置き換えるファイル
+TARGET_FILES = [
+    DATA_DIR / "f14_proposals_en.json",
+    DATA_DIR / "f14_proposals_ja.json",
+    DATA_DIR / "f14_proposals_ja_clean.json",
+    DATA_DIR / "f14_proposals_multi.json",
+]
+
+
+def has_identity(rec: dict) -> bool:
+    return bool(rec.get("proposal_url") or rec.get("title_en"))
+
+
+def build_map(sources: list[Path], mapping: dict[str, str]) -> dict[str, str]:
+    """旧 ID → 新 ID。ファイルごとに、prepare と同じ順番で重複に番号を振る。"""
+    for path in sources:
+        if not path.exists():
+            continue
+        assign_id = IdAssigner()
+        added = 0
+        for rec in iter_records(path):
+            pid = rec.get("proposal_id")
+            if not is_legacy_id(pid) or not has_identity(rec):
+                continue
+            new = assign_id(record_id(rec))
+            if pid not in mapping:
+                mapping[pid] = new
+                added += 1
+            elif mapping[pid] != new:
+                print(f"  ⚠️ {path}: {pid} → {new} conflicts with {mapping[pid]} (kept)")
+        print(f"[migrate_ids] {path}: {added} ids mapped")
+    return mapping
+
+
+def migrate_record(rec: dict, mapping: dict[str, str], assign_id: IdAssigner) -> tuple[dict, bool]:
+    pid = rec.get("proposal_id")
+    if not is_legacy_id(pid):
+        return rec, False
+    if has_identity(rec):
+        new = assign_id(record_id(rec))
+    else:
+        new = mapping.get(pid)
+    if not new:
+        return rec, False
+    # proposal_id はレコードの先頭に置いたまま差し替える
+    return {k: (new if k == "proposal_id" else v) for k, v in rec.items()}, True
+
+
+def migrate_file(path: Path, mapping: dict[str, str], dry_run: bool) -> tuple[int, int]:
+    """(置き換えた件数, 全件数)"""
+    counts = [0, 0]
+    assign_id = IdAssigner()
+
+    def migrated():
+        for rec in iter_records(path):
+            counts[1] += 1
+            rec, changed = migrate_record(rec, mapping, assign_id)
+            counts[0] += changed
+            yield rec
+
+    if dry_run:
+        for _ in migrated():
+            pass
+    else:
+        write_records(path, migrated())
+    return counts[0], counts[1]
+
+
+def journals(targets: list[Path]) -> list[Path]:
+    found = []
+    for path in targets:
+        found += sorted(path.parent.glob(f"{path.name}.*.journal.jsonl"))
+    return found
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="proposal_id を内容ベースの ID に移行する")
+    ap.add_argument("files", nargs="*", type=Path, help="置き換えるファイル（省略時は既定の一式）")
+    ap.add_argument("--map", type=Path, default=MAP_FILE, help="旧 → 新 の対応表")
+    ap.add_argument("--dry-run", action="store_true", help="書き換えずに件数だけ表示する")
+    return ap.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    mapping: dict[str, str] = {}
+    if args.map.exists():
+        mapping = json.loads(args.map.read_text(encoding="utf-8"))
+    mapping = build_map(SOURCE_FILES, mapping)
+
+    targets = args.files or [p for p in TARGET_FILES if p.exists()]
+    targets += journals(targets)
+
+    total_changed = 0
+    for path in targets:
+        changed, total = migrate_file(path, mapping, args.dry_run)
+        total_changed += changed
+        print(f"[migrate_ids] {path}: {changed}/{total} records")
+
+    if args.dry_run:
+        print(f"[migrate_ids] dry run: {total_changed} records would be migrated")
+        return
+    atomic_write_json(args.map, mapping)
+    print(f"[migrate_ids] ✅ {total_changed} records migrated, map → {args.map}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+# tools/near_dupes.py
+#
+# ほぼ同じ内容の提案（同じ提案者が複数の challenge に出したもの）をまとめる。
+#
+# full_text_en と英語のセクション（TEXT_FIELDS）を単語 SHINGLE 語ずつの並びにして MinHash を取り、
+# LSH（BANDS 個のバンドに分けたバケット）で候補の組だけを比べる。全部の組を比べないので
+# 件数に対してほぼ線形で済む。クラスタは入力順の貪欲法で作り、代表との推定 Jaccard が
+# THRESHOLD 以上のものだけをメンバーにする（似たものの連鎖で遠いものがまとまらないように）。
+#
+# グループの代表（canonical）だけが LLM のステージ（format / multilang）を通り、
+# 他のメンバーには代表の結果をコピーする（タイトルだけは自分のものに置き換える）。
+# 整形結果には challenge や予算・マイルストーンも入るので、コピーするのは challenge と
+# requested_ada が同じで、本文の Jaccard が REUSE_SIMILARITY 以上のメンバーだけ（reusable()）。
+# それ以外のメンバーと、代表に結果がない（スキップ・エラー）ときのメンバーは自分で LLM を通る。
+# LLM キャッシュは入力が完全に同じときしか当たらないので、ほぼ同じものはここで拾う。
+#
+#   python tools/near_dupes.py            # data/f14_near_dupes.json を書く
+#   python tools/near_dupes.py --threshold 0.7 --show
+
+import argparse
+import hashlib
+import json
+import re
+import time
+import unicodedata
+import zlib
+from pathlib import Path
+
+from journal import atomic_write_json
+from records import iter_records
+
+try:
+    import numpy as np
+except ImportError:  # NumPy は任意（なければ遅いが同じ結果）
+    np = None
+
+DATA_DIR = Path("data")
+INPUT_FILE = DATA_DIR / "f14_proposals_en.json"
+CLUSTERS_FILE = DATA_DIR / "f14_near_dupes.json"
+
+# 比べるフィールド（LLM が作ったものは入れない）
+TEXT_FIELDS = ("full_text_en", "problem_en", "solution_en", "team_en", "about_en")
+
+# shingle の単語数・MinHash の数・LSH のバンド数（NUM_PERM = BANDS × 行数）
+SHINGLE = 5
+NUM_PERM = 128
+BANDS = 16
+# これ以上の推定 Jaccard をほぼ同じとみなす（BANDS=16 / 8 行だと約 0.7 から候補に上がる）
+THRESHOLD = 0.8
+# 短すぎる本文は比べない（定型文だけで一致してしまう）
+MIN_SHINGLES = 20
+
+# 代表の結果をそのままコピーしてよい条件: これらのフィールドが同じで、
+# 本文の shingle の Jaccard（推定ではなく実際の値）がこれ以上
+REUSE_MATCH_FIELDS = ("challenge", "requested_ada")
+REUSE_SIMILARITY = 0.95
+
+# 1 提案あたりの LLM 呼び出し（節約できる回数の見積もり用）
+CALLS_PER_PROPOSAL = {"format": 1, "multilang": 1}
+
+# 代表の結果をコピーするフィールド（ステージごと。multilang は訳す言語のフィールドを渡す）
+REUSE_FIELDS = {
+    "format": ("about_structured_en",),
+}
+
+_PRIME = (1 << 32) + 15  # 2^32 より大きい素数（ハッシュは 32 ビット）
+_WORD_RE = re.compile(r"\w+")
+
+
+def shingles(rec: dict, k: int = SHINGLE) -> set[int]:
+    """TEXT_FIELDS の単語 k-gram を 32 ビットのハッシュにしたもの。"""
+    text = " ".join(str(rec.get(f) or "") for f in TEXT_FIELDS)
+    words = _WORD_RE.findall(unicodedata.normalize("NFKC", text).lower())
+    return {
+        zlib.crc32(" ".join(words[i : i + k]).encode("utf-8"))
+        for i in range(max(len(words) - k + 1, 0))
+    }
+
+
+def _permutations(n: int, seed: int = 14) -> list[tuple[int, int]]:
+    """(a, b) の組を n 個。実行ごとに変わらないよう sha256 から作る。"""
+    out = []
+    for i in range(n):
+        d = hashlib.sha256(f"{seed}:{i}".encode()).digest()
+        a = int.from_bytes(d[:4], "big") | 1
+        b = int.from_bytes(d[4:8], "big")
+        out.append((a, b))
+    return out
+
+
+PERMS = _permutations(NUM_PERM)
+if np is not None:
+    _A = np.array([a for a, _ in PERMS], dtype=np.uint64)[:, None]
+    _B = np.array([b for _, b in PERMS], dtype=np.uint64)[:, None]
+
+
+def minhash(hashes: set[int]) -> list[int]:
+    """(a * x + b) mod p の最小値を NUM_PERM 個。"""
+    if np is not None:
+        x = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+        # a, x < 2^32 なので a * x は uint64 に収まる
+        return (((_A * x) % _PRIME + _B) % _PRIME).min(axis=1).tolist()
+    return [min(((a * x) % _PRIME + b) % _PRIME for x in hashes) for a, b in PERMS]
+
+
+def similarity(sig_a: list[int], sig_b: list[int]) -> float:
+    """一致する MinHash の割合（Jaccard の推定値）。"""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+def jaccard(a: set[int], b: set[int]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def reusable(src: dict, dst: dict, min_similarity: float = REUSE_SIMILARITY) -> bool:
+    """
+    src（代表）の LLM の結果を dst（メンバー）にそのままコピーしてよいか。
+    challenge・requested_ada が違うと、コピーした本文に代表の値が載ってしまうので使わない。
+    """
+    if any(src.get(name) != dst.get(name) for name in REUSE_MATCH_FIELDS):
+        return False
+    return jaccard(shingles(src), shingles(dst)) >= min_similarity
+
+
+def candidate_pairs(signatures: dict[str, list[int]], bands: int = BANDS) -> set[tuple[str, str]]:
+    """同じバンドのバケットに入った組だけを候補にする。"""
+    rows = NUM_PERM // bands
+    pairs = set()
+    for band in range(bands):
+        buckets: dict[tuple, list[str]] = {}
+        for pid, sig in signatures.items():
+            key = tuple(sig[band * rows : (band + 1) * rows])
+            buckets.setdefault(key, []).append(pid)
+        for members in buckets.values():
+            for i in range(len(members)):
+                for j in range(i + 1, len(members)):
+                    pairs.add((members[i], members[j]))
+    return pairs
+
+
+def find_clusters(
+    records, threshold: float = THRESHOLD, bands: int = BANDS
+) -> tuple[list[dict], dict]:
+    """
+    (クラスタ, 件数) を返す。入力順に見て、まだどこにも入っていない提案を代表にし、
+    代表との推定 Jaccard が threshold 以上でまだ入っていない提案をメンバーにする。
+    [{"canonical": pid, "members": [{"proposal_id": pid, "similarity": 0.93}, ...]}]
+    """
+    order: dict[str, int] = {}
+    signatures: dict[str, list[int]] = {}
+    for rec in records:
+        pid = rec.get("proposal_id")
+        if not pid or pid in order:
+            continue
+        order[pid] = len(order)
+        hashes = shingles(rec)
+        if len(hashes) >= MIN_SHINGLES:
+            signatures[pid] = minhash(hashes)
+
+    pairs = candidate_pairs(signatures, bands)
+    neighbors: dict[str, list[tuple[str, float]]] = {}
+    for a, b in pairs:
+        s = similarity(signatures[a], signatures[b])
+        if s >= threshold:
+            neighbors.setdefault(a, []).append((b, s))
+            neighbors.setdefault(b, []).append((a, s))
+
+    assigned: set[str] = set()
+    clusters = []
+    for canonical in sorted(neighbors, key=order.__getitem__):
+        if canonical in assigned:
+            continue
+        members = sorted(
+            (
+                (pid, s)
+                for pid, s in neighbors[canonical]
+                if pid not in assigned and order[pid] > order[canonical]
+            ),
+            key=lambda m: order[m[0]],
+        )
+        if not members:
+            continue
+        assigned.add(canonical)
+        assigned.update(pid for pid, _ in members)
+        clusters.append(
+            {
+                "canonical": canonical,
+                "members": [{"proposal_id": pid, "similarity": round(s, 3)} for pid, s in members],
+            }
+        )
+    clusters.sort(key=lambda c: order[c["canonical"]])
+    counts = {
+        "proposals": len(order),
+        "compared": len(signatures),
+        "candidate_pairs": len(pairs),
+        "clusters": len(clusters),
+        "duplicates": sum(len(c["members"]) for c in clusters),
+    }
+    return clusters, counts
+
+
+def calls_saved(clusters: list[dict]) -> dict[str, int]:
+    dupes = sum(len(c["members"]) for c in clusters)
+    return {stage: n * dupes for stage, n in CALLS_PER_PROPOSAL.items()}
+
+
+class DuplicateGroups:
+    """ステージから使う。クラスタのファイルがなければ何もしない（全件が自分で LLM を通る）。"""
+
+    def __init__(self, clusters: list[dict] | None = None):
+        self.canonical_of: dict[str, str] = {}
+        self.followers_of: dict[str, list[str]] = {}
+        for c in clusters or []:
+            followers = [m["proposal_id"] for m in c["members"]]
+            self.followers_of[c["canonical"]] = followers
+            for pid in followers:
+                self.canonical_of[pid] = c["canonical"]
+
+    @classmethod
+    def load(cls, path: Path = CLUSTERS_FILE) -> "DuplicateGroups":
+        try:
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return cls()
+        return cls(data.get("clusters"))
+
+    def __len__(self) -> int:
+        return len(self.canonical_of)
+
+    def canonical(self, pid: str) -> str | None:
+        """代表でないメンバーなら代表の ID、そうでなければ None。"""
+        return self.canonical_of.get(pid)
+
+    def reuses(self, pid: str, by_id: dict, fields, selected=()) -> str | None:
+        """
+        pid が代表の結果を使う（自分では LLM を通さない）なら代表の ID。
+        代表と reusable() で、代表に fields の結果がそろっているか、この実行で代表を通す
+        （selected に入っている）ときだけで、代表がスキップされたなら None（自分で通す）。
+        """
+        canonical = self.canonical_of.get(pid)
+        if canonical is None:
+            return None
+        src = by_id.get(canonical) or {}
+        if not reusable(src, by_id.get(pid) or {}):
+            return None
+        if canonical in selected:
+            return canonical
+        return canonical if all(src.get(name) for name in fields) else None
+
+    def followers(self, canonicals) -> list[str]:
+        """canonicals（エラーになった代表など）のメンバー。"""
+        return [pid for c in canonicals for pid in self.followers_of.get(c, ())]
+
+    def propagate(self, data: list[dict], fields, journal=None) -> int:
+        """
+        代表の fields をメンバーにコピーする（代表の title_en はメンバーの title_en に置き換える）。
+        reusable() でないメンバーにはコピーしない。
+        journal を渡せば、コピーした分も追記する。コピーした件数を返す。
+        """
+        by_id = {rec.get("proposal_id"): rec for rec in data}
+        copied = 0
+        for canonical, followers in self.followers_of.items():
+            src = by_id.get(canonical)
+            if src is None:
+                continue
+            for pid in followers:
+                dst = by_id.get(pid)
+                if dst is None or not reusable(src, dst):
+                    continue
+                update = {}
+                for name in fields:
+                    value = src.get(name)
+                    if not value:
+                        continue
+                    title_src, title_dst = src.get("title_en"), dst.get("title_en")
+                    if isinstance(value, str) and title_src and title_dst:
+                        value = value.replace(title_src, title_dst)
+                    if dst.get(name) != value:
+                        update[name] = value
+                if update:
+                    update["_reused_from"] = canonical
+                    dst.update(update)
+                    if journal is not None:
+                        journal.append(pid, update)
+                    copied += 1
+        return copied
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="ほぼ同じ提案をまとめ、LLM を通す代表を決める")
+    ap.add_argument("--input", type=Path, default=INPUT_FILE)
+    ap.add_argument("--output", type=Path, default=CLUSTERS_FILE)
+    ap.add_argument("--threshold", type=float, default=THRESHOLD)
+    ap.add_argument("--bands", type=int, default=BANDS)
+    ap.add_argument("--show", action="store_true", help="クラスタを表示する")
+    return ap.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.input.exists():
+        raise FileNotFoundError(args.input)
+    if NUM_PERM % args.bands:
+        raise SystemExit(f"--bands must divide NUM_PERM={NUM_PERM}")
+
+    t0 = time.perf_counter()
+    clusters, counts = find_clusters(iter_records(args.input), args.threshold, args.bands)
+    saved = calls_saved(clusters)
+    atomic_write_json(
+        args.output,
+        {
+            "threshold": args.threshold,
+            "fields": list(TEXT_FIELDS),
+            **counts,
+            "calls_saved": saved,
+            "clusters": clusters,
+        },
+    )
+
+    print(
+        f"[near_dupes] {counts['compared']}/{counts['proposals']} proposals compared, "
+        f"{counts['candidate_pairs']} candidate pairs, {counts['clusters']} clusters, "
+        f"{counts['duplicates']} duplicates ({time.perf_counter() - t0:.2f}s) → {args.output}"
+    )
+    print(
+        "[near_dupes] estimated LLM calls saved: "
+        + ", ".join(f"{stage}={n}" for stage, n in saved.items())
+    )
+    if args.show:
+        for c in clusters:
+            members = ", ".join(f"{m['proposal_id']} ({m['similarity']:.2f})" for m in c["members"])
+            print(f"  {c['canonical']} ← {members}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# tools/normalize.py
+#
+# 数値列の正規化（整数にそろえる）と、表示用の書式。
+#
+# レコードには整数（または None）をそのまま持たせ、"₳739,000" や "256,533,420" のような
+# 表示用の文字列はサイト側（.eleventy.js のフィルタ）や format_* で作る。
+#
+# NumPy があれば列ごとにまとめて変換し（int_column）、なければ 1 セルずつ変換する。
+
+import math
+
+try:
+    import numpy as np
+except ImportError:  # NumPy は任意
+    np = None
+
+# 数値から取り除く文字（通貨記号・桁区切り・空白）
+_JUNK = ("₳", ",", " ", "\u00a0")
+_MISSING = ("", "none", "nan", "null")
+
+# int_column でそのまま float64 にできる型と、float64 で正確に表せる整数の上限
+_PLAIN = {float, int, type(None)}
+_EXACT = 2**53
+
+
+def to_int(value) -> int | None:
+    """
+    Excel 由来の値を整数にする（小数は切り捨て）。空・NaN・数値にできないものは None。
+    "₳739,000" や "1,234.0" のような表示用の文字列も読める。
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value) if math.isfinite(value) else None
+    s = str(value)
+    for ch in _JUNK:
+        s = s.replace(ch, "")
+    s = s.strip()
+    if s.lower() in _MISSING:
+        return None
+    try:
+        num = float(s)
+    except ValueError:
+        return None
+    return int(num) if math.isfinite(num) else None
+
+
+def int_column(values: list) -> list:
+    """
+    列全体を to_int と同じ規則でまとめて変換する。
+    数値と None だけの列は NumPy の float64 配列に一度で変換し（None は NaN になる）、
+    切り捨てと欠損の判定を配列演算で行う。表示用の文字列などが混ざっていれば、
+    そのセルだけ先に to_int で数値にしてから同じ処理に回す。
+    """
+    if np is None or not values:
+        return [to_int(v) for v in values]
+
+    if not set(map(type, values)) <= _PLAIN:
+        values = [v if type(v) in _PLAIN else to_int(v) for v in values]
+    nums = np.array(values, dtype=np.float64)
+    missing = ~np.isfinite(nums)
+    if np.abs(np.where(missing, 0.0, nums)).max() > _EXACT:
+        # float64 で桁が落ちる大きな整数は 1 セルずつ
+        return [to_int(v) for v in values]
+    out = np.trunc(np.where(missing, 0.0, nums)).astype(np.int64).astype(object)
+    out[missing] = None
+    return out.tolist()
+
+
+def format_thousands(value) -> str:
+    """整数を "256,533,420" に。None は ""、整数でなければ文字列のまま。"""
+    if value is None or value == "":
+        return ""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f"{int(value):,}"
+    return str(value)
+
+
+def format_ada(value) -> str:
+    """整数を "₳739,000" に。None は ""、整数でなければ文字列のまま。"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f"₳{int(value):,}"
+    return format_thousands(value)
@@ -0,0 +1,501 @@
+# tools/pipeline.py
+#
+# パイプライン全体をまとめて回すランナー。
+#
+# - ステージ（スクリプト）ごとに入力・出力ファイルを宣言し、依存関係はそこから決める
+# - 入力ファイル・コード（スクリプトと import しているローカルモジュール）・設定
+#   （引数と関係する環境変数）のハッシュを記録し、変わっていないステージは飛ばす
+# - 依存していないステージは並列に走らせる
+# - 各ステージは tools/telemetry.py 経由で走らせ、時間・レイテンシ・トークン数を
+#   data/metrics/ に残す（--profile で cProfile も）
+#
+#   python tools/pipeline.py                 # 全ステージ（古くなったものだけ）
+#   python tools/pipeline.py translate       # translate とその上流だけ
+#   python tools/pipeline.py --dry-run       # 何が走るかだけ表示
+#   python tools/pipeline.py --force format  # format を強制的に作り直す
+#   python tools/pipeline.py --mark-done     # 今あるデータを最新とみなして記録だけする
+#   python tools/pipeline.py --profile       # ステージごとの cProfile を書く
+#   python tools/pipeline.py --base-url http://127.0.0.1:8765/v1   # LLM をスタブに向ける
+#
+# LLM のスタブ（tools/llm_stub_server.py）ごとまとめて走らせるなら:
+#   python tools/llm_stub_server.py --replay data/llm_cassette.jsonl -- python tools/pipeline.py
+#
+# 同じファイルを上書きしていくステージ（prepare → scrape → format の en.json）は、
+# 宣言順で前のステージが書いた時点のハッシュを、後ろのステージの入力として扱う。
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from journal import atomic_write_json
+
+# スクリプトはリポジトリからの相対パス、データはカレントディレクトリからの相対パス
+# （各スクリプトと同じく data/ を見る）
+ROOT = Path(__file__).resolve().parent.parent
+TOOLS_DIR = ROOT / "tools"
+STATE_FILE = Path("data/.pipeline_state.json")
+
+RAW_FILE = "data/f14_results_raw.json"
+EN_FILE = "data/f14_proposals_en.json"
+JA_FILE = "data/f14_proposals_ja.json"
+DUPES_FILE = "data/f14_near_dupes.json"
+
+# LLM の返答を変えうる環境変数（並列度などは結果に関係しないので入れない）
+LLM_ENV = ("OPENAI_BASE_URL",)
+
+
+@dataclass
+class Stage:
+    name: str
+    script: str
+    inputs: list[str]
+    outputs: list[str]
+    args: list[str] = field(default_factory=list)
+    env: tuple[str, ...] = ()
+
+
+STAGES = [
+    Stage("excel", "tools/excel_to_json_f14.py", ["data/f14_results.xlsx"], [RAW_FILE]),
+    Stage("prepare", "prepare_f14_for_translation.py", [RAW_FILE], [EN_FILE]),
+    Stage("scrape", "tools/scrape_one_f14.py", [EN_FILE], [EN_FILE]),
+    # ほぼ同じ提案をまとめ、LLM のステージは代表だけを通す
+    Stage("dedupe", "tools/near_dupes.py", [EN_FILE], [DUPES_FILE]),
+    Stage(
+        "format",
+        "tools/format_about_with_llm.py",
+        [EN_FILE, DUPES_FILE],
+        [EN_FILE],
+        args=["--max-proposals", "0"],
+        env=LLM_ENV,
+    ),
+    # 後段のステージが「元が変わった提案」を選べるように、en のフィールドごとの差分を取る
+    Stage(
+        "manifest-en",
+        "tools/change_manifest.py",
+        [EN_FILE],
+        ["data/manifests/en.json", "data/manifests/en.diff.json"],
+        args=["en"],
+    ),
+    Stage(
+        "multilang",
+        "tools/generate_multilang_about.py",
+        [EN_FILE, DUPES_FILE],
+        ["data/f14_proposals_multi.json"],
+        env=LLM_ENV,
+    ),
+    Stage(
+        "translate",
+        "translate_sample.py",
+        [EN_FILE],
+        [JA_FILE],
+        env=LLM_ENV + ("TITLE_BATCH_SIZE",),
+    ),
+    Stage("clean", "clean_ja_json.py", [JA_FILE], ["data/f14_proposals_ja_clean.json"]),
+    Stage(
+        "bundle",
+        "tools/build_site_bundle.py",
+        [JA_FILE, EN_FILE, "data/challenge_labels.json"],
+        ["data/f14_site_bundle.json"],
+    ),
+    Stage(
+        "shards",
+        "tools/export_site_shards.py",
+        ["data/f14_site_bundle.json"],
+        ["data/shards/manifest.json"],
+    ),
+    Stage(
+        "search",
+        "tools/build_search_index.py",
+        ["data/f14_site_bundle.json"],
+        ["data/search/index.json"],
+    ),
+    # サイトは F14_CHANGED_ONLY=1 でビルドすると、これで変わった提案のページだけを作る
+    Stage(
+        "manifest-site",
+        "tools/change_manifest.py",
+        ["data/f14_site_bundle.json"],
+        ["data/manifests/site.json", "data/manifests/site.diff.json"],
+        args=["site"],
+    ),
+]
+
+
+def dependencies(stages: list[Stage]) -> dict[str, list[str]]:
+    """
+    宣言順で前にあり、自分の入力か出力を書くステージに依存する。
+    （同じファイルを上書きするステージどうしは宣言順に並ぶ）
+    """
+    deps: dict[str, list[str]] = {}
+    for i, stage in enumerate(stages):
+        touched = set(stage.inputs) | set(stage.outputs)
+        deps[stage.name] = [
+            prev.name for prev in stages[:i] if touched & set(prev.outputs)
+        ]
+    return deps
+
+
+def code_files(script: Path) -> list[Path]:
+    """スクリプトと、そこから（再帰的に）import しているリポジトリ内のモジュール。"""
+    search = [script.parent, TOOLS_DIR]
+    seen: list[Path] = []
+    todo = [script]
+    while todo:
+        path = todo.pop()
+        if path in seen:
+            continue
+        seen.append(path)
+        tree = ast.parse(path.read_text(encoding="utf-8"))
+        names = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names += [a.name.split(".")[0] for a in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names.append(node.module.split(".")[0])
+        for name in names:
+            for d in search:
+                candidate = d / f"{name}.py"
+                if candidate.exists():
+                    todo.append(candidate)
+                    break
+    return sorted(seen)
+
+
+class FileHasher:
+    """ファイルの sha256。(サイズ, mtime) が前回と同じなら記録済みの値を使う。"""
+
+    def __init__(self, cache: dict | None = None):
+        self.cache = cache or {}
+        self._lock = threading.Lock()
+
+    def __call__(self, path: Path) -> str | None:
+        key = str(path)
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        sig = [st.st_size, st.st_mtime_ns]
+        with self._lock:
+            hit = self.cache.get(key)
+            if hit and hit["sig"] == sig:
+                return hit["sha256"]
+        h = hashlib.sha256()
+        with path.open("rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        with self._lock:
+            self.cache[key] = {"sig": sig, "sha256": digest}
+        return digest
+
+
+_print_lock = threading.Lock()
+
+
+def log(line: str) -> None:
+    """並列に走るステージの出力が行の途中で混ざらないように 1 行ずつ書く。"""
+    with _print_lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+
+def digest(obj) -> str:
+    return hashlib.sha256(repr(obj).encode("utf-8")).hexdigest()
+
+
+class Pipeline:
+    def __init__(self, stages: list[Stage], state_file: Path = STATE_FILE):
+        self.stages = {s.name: s for s in stages}
+        self.order = [s.name for s in stages]
+        self.deps = dependencies(stages)
+        self.state_file = state_file
+        state = {}
+        if state_file.exists():
+            try:
+                state = json.loads(state_file.read_text(encoding="utf-8"))
+            except ValueError:
+                state = {}
+        self.records: dict[str, dict] = state.get("stages", {})
+        self.hash_file = FileHasher(state.get("files", {}))
+        self._lock = threading.Lock()
+
+    # --- 状態 -------------------------------------------------------------
+
+    def save(self) -> None:
+        with self._lock:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_json(
+                self.state_file,
+                {"stages": self.records, "files": self.hash_file.cache},
+            )
+
+    def writer_before(self, name: str, rel: str) -> str | None:
+        """name より前で rel を最後に書くステージ。"""
+        writer = None
+        for other in self.order[: self.order.index(name)]:
+            if rel in self.stages[other].outputs:
+                writer = other
+        return writer
+
+    def last_writer(self, rel: str) -> str | None:
+        writer = None
+        for name in self.order:
+            if rel in self.stages[name].outputs:
+                writer = name
+        return writer
+
+    def input_hash(self, name: str, rel: str) -> str | None:
+        """name から見た入力ファイルの中身のハッシュ（上書きされる前の状態）。"""
+        writer = self.writer_before(name, rel)
+        if writer is None:
+            return self.hash_file(Path(rel))
+        return self.records.get(writer, {}).get("outputs", {}).get(rel)
+
+    def fingerprint(self, name: str) -> dict:
+        stage = self.stages[name]
+        return {
+            "inputs": {rel: self.input_hash(name, rel) for rel in stage.inputs},
+            "code": {
+                str(p.relative_to(ROOT)): self.hash_file(p)
+                for p in code_files(ROOT / stage.script)
+            },
+            "config": digest([stage.args, {k: os.environ.get(k) for k in stage.env}]),
+        }
+
+    def stale_reason(self, name: str, fp: dict) -> str | None:
+        """飛ばしてよければ None、作り直すなら理由を返す。"""
+        rec = self.records.get(name)
+        if rec is None:
+            return "never run"
+        for part in ("inputs", "code"):
+            changed = [k for k, v in fp[part].items() if rec.get(part, {}).get(k) != v]
+            if changed:
+                return f"{part} changed: {', '.join(changed)}"
+            if set(rec.get(part, {})) != set(fp[part]):
+                return f"{part} changed"
+        if rec.get("config") != fp["config"]:
+            return "config changed"
+        for rel in self.stages[name].outputs:
+            current = self.hash_file(Path(rel))
+            if current is None:
+                return f"missing output: {rel}"
+            # 同じファイルを上書きする前のステージが、自分より後に走っていたら
+            # （出力が前回と同じでも）ファイルは書き戻されているので作り直す
+            for other in self.order[: self.order.index(name)]:
+                if rel in self.stages[other].outputs and (
+                    self.records.get(other, {}).get("seq", 0) > rec.get("seq", 0)
+                ):
+                    return f"{rel} rewritten by {other}"
+            # 後ろのステージが上書きするファイルは、最後に書いたステージだけが確かめる
+            if self.last_writer(rel) == name and current != rec["outputs"].get(rel):
+                return f"output modified: {rel}"
+        return None
+
+    def record(self, name: str, fp: dict, seconds: float) -> None:
+        outputs = {rel: self.hash_file(Path(rel)) for rel in self.stages[name].outputs}
+        with self._lock:
+            # 記録した順番（同じファイルを上書きするステージどうしの前後を比べる）
+            seq = max((r.get("seq", 0) for r in self.records.values()), default=0) + 1
+            self.records[name] = {
+                **fp,
+                "outputs": outputs,
+                "seconds": round(seconds, 2),
+                "seq": seq,
+            }
+        self.save()
+
+    # --- 実行 -------------------------------------------------------------
+
+    def select(self, targets: list[str]) -> list[str]:
+        """targets とその上流を宣言順で返す（空なら全部）。"""
+        if not targets:
+            return list(self.order)
+        unknown = [t for t in targets if t not in self.stages]
+        if unknown:
+            raise SystemExit(f"unknown stage: {', '.join(unknown)} (stages: {', '.join(self.order)})")
+        wanted: set[str] = set()
+        todo = list(targets)
+        while todo:
+            name = todo.pop()
+            if name not in wanted:
+                wanted.add(name)
+                todo += self.deps[name]
+        return [n for n in self.order if n in wanted]
+
+    def run_stage(self, name: str) -> None:
+        stage = self.stages[name]
+        # tools/telemetry.py 経由で走らせ、data/metrics/<name>.json に計測を残す
+        cmd = [
+            sys.executable,
+            "-u",
+            str(TOOLS_DIR / "telemetry.py"),
+            "run",
+            name,
+            str(ROOT / stage.script),
+            *stage.args,
+        ]
+        proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+        )
+        for line in proc.stdout:
+            log(f"[{name}] {line.rstrip()}")
+        if proc.wait() != 0:
+            raise RuntimeError(f"exit status {proc.returncode}")
+        missing = [rel for rel in stage.outputs if not Path(rel).exists()]
+        if missing:
+            raise RuntimeError(f"outputs not written: {', '.join(missing)}")
+
+    def run(
+        self,
+        targets: list[str],
+        force: set[str] = frozenset(),
+        jobs: int = 4,
+        dry_run: bool = False,
+        mark_done: bool = False,
+    ) -> dict[str, str]:
+        """
+        依存が終わったステージから順に判定して走らせる。
+        上流が作り直しても出力が前回と同じなら、下流はそのまま飛ばせる。
+        """
+        selected = self.select(targets)
+        status: dict[str, str] = {}
+        reran: set[str] = set()
+
+        def decide(name: str) -> tuple[str | None, dict]:
+            fp = self.fingerprint(name)
+            if name in force:
+                return "forced", fp
+            if dry_run and any(d in reran for d in self.deps[name]):
+                return "upstream will run", fp
+            return self.stale_reason(name, fp), fp
+
+        def execute(name: str) -> str:
+            reason, fp = decide(name)
+            if reason is None:
+                log(f"[pipeline] {name}: up to date")
+                return "skipped"
+            if dry_run:
+                log(f"[pipeline] {name}: would run ({reason})")
+                reran.add(name)
+                return "would run"
+            if mark_done:
+                self.record(name, fp, 0.0)
+                log(f"[pipeline] {name}: marked up to date ({reason})")
+                return "marked"
+            log(f"[pipeline] {name}: running ({reason})")
+            started = time.perf_counter()
+            self.run_stage(name)
+            seconds = time.perf_counter() - started
+            self.record(name, fp, seconds)
+            log(f"[pipeline] {name}: done in {seconds:.1f}s")
+            return "ran"
+
+        # dry-run / mark-done は宣言順に 1 つずつ（記録を順に使うため）
+        workers = 1 if (dry_run or mark_done) else max(1, jobs)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            running = {}
+            while len(status) < len(selected):
+                for name in selected:
+                    if name in status or name in running.values():
+                        continue
+                    deps = [d for d in self.deps[name] if d in selected]
+                    if any(status.get(d) in ("failed", "blocked") for d in deps):
+                        status[name] = "blocked"
+                        log(f"[pipeline] {name}: blocked by failed upstream")
+                        continue
+                    if all(d in status for d in deps):
+                        running[pool.submit(execute, name)] = name
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    name = running.pop(fut)
+                    try:
+                        status[name] = fut.result()
+                    except Exception as e:
+                        status[name] = "failed"
+                        log(f"[pipeline] {name}: FAILED ({e})")
+        return status
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="依存関係つきでパイプラインを実行する")
+    ap.add_argument("targets", nargs="*", help="実行するステージ（上流も含む）。省略で全部")
+    ap.add_argument("--force", action="store_true", help="指定したステージ（省略時は全部）を作り直す")
+    ap.add_argument("--jobs", "-j", type=int, default=4, help="並列に走らせるステージ数")
+    ap.add_argument("--dry-run", action="store_true", help="実行せず、走るステージと理由を表示する")
+    ap.add_argument(
+        "--mark-done",
+        action="store_true",
+        help="実行せず、今のファイルを最新の結果として記録する",
+    )
+    ap.add_argument("--list", action="store_true", help="ステージと依存関係を表示する")
+    ap.add_argument(
+        "--profile",
+        action="store_true",
+        help="ステージごとの cProfile を data/metrics/<stage>.prof に書く",
+    )
+    ap.add_argument(
+        "--base-url",
+        help="LLM の API の URL（OPENAI_BASE_URL として各ステージに渡す。スタブに向けるとき）",
+    )
+    return ap.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    pipeline = Pipeline(STAGES)
+
+    if args.list:
+        width = max(len(name) for name in pipeline.order)
+        for name in pipeline.order:
+            stage = pipeline.stages[name]
+            deps = ", ".join(pipeline.deps[name]) or "-"
+            print(f"{name:{width}} {stage.script:36} after: {deps}")
+        return
+
+    if args.profile:
+        # 子プロセス（tools/telemetry.py run）に引き継ぐ
+        os.environ["F14_PROFILE"] = "1"
+    if args.base_url:
+        # LLM_ENV に入っているので、URL を変えると LLM のステージは作り直しになる
+        os.environ["OPENAI_BASE_URL"] = args.base_url
+
+    force = set()
+    if args.force:
+        force = set(args.targets or pipeline.order)
+
+    started = time.perf_counter()
+    status = pipeline.run(
+        args.targets,
+        force=force,
+        jobs=args.jobs,
+        dry_run=args.dry_run,
+        mark_done=args.mark_done,
+    )
+    counts: dict[str, int] = {}
+    for s in status.values():
+        counts[s] = counts.get(s, 0) + 1
+    summary = " ".join(f"{k}={v}" for k, v in sorted(counts.items()))
+    print(f"[pipeline] {summary} in {time.perf_counter() - started:.1f}s")
+    if any(s == "ran" for s in status.values()):
+        print("[pipeline] metrics: python tools/telemetry.py report")
+    if any(s in ("failed", "blocked") for s in status.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
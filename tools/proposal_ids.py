@@ -0,0 +1,65 @@
+# tools/proposal_ids.py
+#
+# 提案の内容から決まる proposal_id。
+#
+# 以前は raw の行番号から F14-0001 のように振っていたので、Excel に行を足したり
+# 並べ替えたりすると、それ以降の ID が全部ずれて翻訳の再利用が効かなくなっていた。
+# ここでは (fund, challenge, 提案 URL) から ID を作る（URL がなければタイトルを使う）。
+# 同じ提案が別のシート（Sponsored by leftovers など）にも載るので challenge も入れる。
+
+import base64
+import hashlib
+import re
+
+# 旧形式（行番号）の ID
+LEGACY_ID_RE = re.compile(r"^F\d+-\d{4,}$")
+
+# ハッシュ部分の長さ（base32 で 8 文字 = 40 ビット）
+HASH_CHARS = 8
+
+
+def _norm(text) -> str:
+    return " ".join(str(text or "").split())
+
+
+def proposal_key(fund, challenge: str, url: str, title: str) -> str:
+    """ID のもとになる文字列。URL は末尾の / を無視し、タイトルは空白をまとめて小文字にする。"""
+    url = _norm(url).rstrip("/")
+    source = f"url:{url}" if url else f"title:{_norm(title).casefold()}"
+    return f"{fund}\n{_norm(challenge)}\n{source}"
+
+
+def stable_proposal_id(fund, challenge: str, url: str, title: str) -> str:
+    """"F14-K3Q7ZB2M" のような ID。同じ提案なら行の位置に関係なく同じになる。"""
+    digest = hashlib.sha256(proposal_key(fund, challenge, url, title).encode("utf-8")).digest()
+    code = base64.b32encode(digest).decode("ascii")[:HASH_CHARS]
+    return f"F{fund}-{code}"
+
+
+def record_id(record: dict) -> str:
+    """prepare 後のレコード（fund / challenge / proposal_url / title_en）から ID を作る。"""
+    return stable_proposal_id(
+        record.get("fund", 14),
+        record.get("challenge", ""),
+        record.get("proposal_url", ""),
+        record.get("title_en", ""),
+    )
+
+
+def is_legacy_id(pid) -> bool:
+    return bool(pid) and bool(LEGACY_ID_RE.match(str(pid)))
+
+
+class IdAssigner:
+    """
+    ID を振る。同じシートに同じ提案が 2 行ある場合だけ、2 件目以降に "-2", "-3" を付ける
+    （この場合だけは出てくる順番に依存する）。
+    """
+
+    def __init__(self):
+        self.seen: dict[str, int] = {}
+
+    def __call__(self, pid: str) -> str:
+        n = self.seen.get(pid, 0) + 1
+        self.seen[pid] = n
+        return pid if n == 1 else f"{pid}-{n}"
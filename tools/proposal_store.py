@@ -0,0 +1,385 @@
+# tools/proposal_store.py
+#
+# 提案レコードを SQLite（WAL）に持つストア。
+#
+# JSON ファイルだと、scrape_one_f14.py と format_about_with_llm.py が同じ
+# f14_proposals_en.json を丸ごと書き直すので同時に走らせられなかった。
+# ここではフィールド単位で upsert するので、各ステージは自分が触った行だけを書く。
+# WAL なので読み手は書き手を待たず、書き込みも 1 件ずつの短いトランザクションで済む。
+#
+# - proposals : (dataset, proposal_id) ごとの行。並び順と challenge / status（索引付き）
+# - fields    : (dataset, proposal_id, フィールド名) → 値（JSON）。キーの順番も持つ
+#
+# dataset は "en" / "ja" のような名前で、それぞれ DATASETS の JSON ファイルに対応する。
+# site/_data/f14.js は今までどおり JSON を読むので、export で書き出す。
+#
+#   python tools/proposal_store.py import            # JSON → ストア（en と ja）
+#   python tools/proposal_store.py export            # ストア → JSON
+#   python tools/proposal_store.py stats
+#   python tools/scrape_one_f14.py --store &         # ストアを使えば並行して走らせられる
+#   python tools/format_about_with_llm.py --store
+
+import argparse
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from records import iter_records, write_records
+
+STORE_PATH = Path("data/f14_proposals.sqlite3")
+
+# dataset 名 → 書き出し先（site/_data/f14.js が読むファイル）
+DATASETS = {
+    "en": Path("data/f14_proposals_en.json"),
+    "ja": Path("data/f14_proposals_ja.json"),
+}
+
+# proposals テーブルに列として持つ（索引で絞り込める）フィールド
+INDEXED_FIELDS = ("challenge", "status")
+
+# 他の書き手がロックを持っているときに待つ秒数
+BUSY_TIMEOUT = 30.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS proposals (
+    dataset TEXT NOT NULL,
+    proposal_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    challenge TEXT,
+    status TEXT,
+    updated REAL NOT NULL,
+    PRIMARY KEY (dataset, proposal_id)
+);
+CREATE INDEX IF NOT EXISTS proposals_position ON proposals(dataset, position);
+CREATE INDEX IF NOT EXISTS proposals_challenge ON proposals(dataset, challenge);
+CREATE INDEX IF NOT EXISTS proposals_status ON proposals(dataset, status);
+CREATE TABLE IF NOT EXISTS fields (
+    dataset TEXT NOT NULL,
+    proposal_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    ord INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (dataset, proposal_id, name)
+) WITHOUT ROWID;
+"""
+
+# 値が同じなら書かない（updated も変えない）
+UPSERT_FIELD = """
+INSERT INTO fields (dataset, proposal_id, name, ord, value, updated)
+VALUES (
+    ?1, ?2, ?3,
+    (SELECT COALESCE(MAX(ord) + 1, 0) FROM fields WHERE dataset = ?1 AND proposal_id = ?2),
+    ?4, ?5
+)
+ON CONFLICT (dataset, proposal_id, name) DO UPDATE
+SET value = excluded.value, updated = excluded.updated
+WHERE fields.value IS NOT excluded.value
+"""
+
+
+def encode(value) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+class ProposalStore:
+    """
+    提案レコードのストア。1 プロセスに 1 つ作り、スレッド間ではロックで共有する。
+    書き込みは BEGIN IMMEDIATE で始めるので、別プロセスの書き手とは BUSY_TIMEOUT まで順番待ちになる。
+    """
+
+    def __init__(self, path: Path = STORE_PATH, timeout: float = BUSY_TIMEOUT):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(
+            str(self.path), timeout=timeout, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    @contextmanager
+    def transaction(self):
+        """書き込み用のトランザクション（入れ子にしたら外側にまとめる）。"""
+        with self._lock:
+            if self._conn.in_transaction:
+                yield self._conn
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    # --- 書き込み ---
+
+    def _ensure(self, conn, dataset: str, pid: str, now: float) -> None:
+        """proposals に行がなければ末尾に足す（proposal_id をフィールドの先頭に置く）。"""
+        inserted = conn.execute(
+            "INSERT INTO proposals (dataset, proposal_id, position, updated) "
+            "SELECT ?1, ?2, COALESCE(MAX(position) + 1, 0), ?3 FROM proposals WHERE dataset = ?1 "
+            "ON CONFLICT DO NOTHING",
+            (dataset, pid, now),
+        ).rowcount
+        if inserted:
+            conn.execute(UPSERT_FIELD, (dataset, pid, "proposal_id", encode(pid), now))
+
+    def upsert(self, dataset: str, pid: str, fields: dict) -> int:
+        """1 件分のフィールドを書く（なければ提案ごと足す）。変わったフィールドの数を返す。"""
+        now = time.time()
+        with self.transaction() as conn:
+            self._ensure(conn, dataset, pid, now)
+            changed = 0
+            for name, value in fields.items():
+                changed += conn.execute(
+                    UPSERT_FIELD, (dataset, pid, name, encode(value), now)
+                ).rowcount
+            indexed = {k: fields[k] for k in INDEXED_FIELDS if k in fields}
+            if changed:
+                sets = "".join(f", {k} = :{k}" for k in indexed)
+                conn.execute(
+                    f"UPDATE proposals SET updated = :now{sets} "
+                    "WHERE dataset = :dataset AND proposal_id = :pid",
+                    {"now": now, "dataset": dataset, "pid": pid, **indexed},
+                )
+            return changed
+
+    def upsert_many(self, dataset: str, items) -> int:
+        """(proposal_id, fields) の列を 1 トランザクションで書く。"""
+        with self.transaction():
+            return sum(self.upsert(dataset, pid, fields) for pid, fields in items)
+
+    def import_records(self, dataset: str, records) -> tuple[int, int]:
+        """
+        JSON のレコード列で dataset を置き換える（並び順もファイルに合わせる）。
+        値が変わっていないフィールドは書かないので、updated は実際に変わった所だけ進む。
+        (件数, 変わったフィールド数) を返す。
+        """
+        now = time.time()
+        count = changed = 0
+        with self.transaction() as conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen (proposal_id TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM seen")
+            for position, rec in enumerate(records):
+                pid = rec.get("proposal_id")
+                if not pid:
+                    continue
+                conn.execute("INSERT OR IGNORE INTO seen VALUES (?)", (pid,))
+                conn.execute(
+                    "INSERT INTO proposals (dataset, proposal_id, position, challenge, status, updated) "
+                    "VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT DO UPDATE SET position = excluded.position, "
+                    "challenge = excluded.challenge, status = excluded.status",
+                    (dataset, pid, position, rec.get("challenge"), rec.get("status"), now),
+                )
+                # キーの順番をファイルに合わせるため、いったん ord を振り直す
+                names = list(rec)
+                stale = conn.execute(
+                    "SELECT name FROM fields WHERE dataset = ? AND proposal_id = ?", (dataset, pid)
+                ).fetchall()
+                gone = [(dataset, pid, n) for (n,) in stale if n not in rec]
+                conn.executemany(
+                    "DELETE FROM fields WHERE dataset = ? AND proposal_id = ? AND name = ?", gone
+                )
+                for ord_, name in enumerate(names):
+                    value = encode(rec[name])
+                    cur = conn.execute(
+                        "INSERT INTO fields (dataset, proposal_id, name, ord, value, updated) "
+                        "VALUES (?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT DO UPDATE SET ord = excluded.ord, value = excluded.value, "
+                        "updated = CASE WHEN fields.value IS excluded.value "
+                        "THEN fields.updated ELSE excluded.updated END "
+                        "WHERE fields.value IS NOT excluded.value OR fields.ord IS NOT excluded.ord",
+                        (dataset, pid, name, ord_, value, now),
+                    )
+                    changed += cur.rowcount
+                changed += len(gone)
+                count += 1
+            # ファイルから消えた提案はストアからも消す
+            conn.execute(
+                "DELETE FROM fields WHERE dataset = ? AND proposal_id NOT IN (SELECT proposal_id FROM seen)",
+                (dataset,),
+            )
+            conn.execute(
+                "DELETE FROM proposals WHERE dataset = ? AND proposal_id NOT IN (SELECT proposal_id FROM seen)",
+                (dataset,),
+            )
+            conn.execute("DELETE FROM seen")
+        return count, changed
+
+    # --- 読み込み ---
+
+    def iter_records(self, dataset: str, challenge: str | None = None, status: str | None = None):
+        """レコードを並び順に 1 件ずつ返す（challenge / status で絞り込める）。"""
+        where = ["p.dataset = ?"]
+        params: list = [dataset]
+        for col, value in (("challenge", challenge), ("status", status)):
+            if value is not None:
+                where.append(f"p.{col} = ?")
+                params.append(value)
+        sql = (
+            "SELECT p.proposal_id, f.name, f.value FROM proposals p "
+            "JOIN fields f ON f.dataset = p.dataset AND f.proposal_id = p.proposal_id "
+            f"WHERE {' AND '.join(where)} ORDER BY p.position, f.ord"
+        )
+        with self._lock:
+            rows = self._conn.execute(sql, params)
+            current, rec = None, {}
+            for pid, name, value in rows:
+                if pid != current:
+                    if current is not None:
+                        yield rec
+                    current, rec = pid, {}
+                rec[name] = json.loads(value)
+            if current is not None:
+                yield rec
+
+    def get(self, dataset: str, pid: str) -> dict | None:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, value FROM fields WHERE dataset = ? AND proposal_id = ? ORDER BY ord",
+                (dataset, pid),
+            ).fetchall()
+        return {name: json.loads(value) for name, value in rows} or None
+
+    def count(self, dataset: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM proposals WHERE dataset = ?", (dataset,)
+            ).fetchone()[0]
+
+    def breakdown(self, dataset: str, col: str) -> list[tuple]:
+        """INDEXED_FIELDS の列ごとの (値, 件数)。"""
+        if col not in INDEXED_FIELDS:
+            raise ValueError(col)
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT {col}, COUNT(*) FROM proposals WHERE dataset = ? GROUP BY 1 ORDER BY 2 DESC",
+                (dataset,),
+            ).fetchall()
+
+    def datasets(self) -> list[str]:
+        with self._lock:
+            return [d for (d,) in self._conn.execute("SELECT DISTINCT dataset FROM proposals ORDER BY 1")]
+
+    def export(self, dataset: str, path: Path) -> int:
+        """dataset を JSON（または JSONL）に書き出す。書いた件数を返す。"""
+        with self._lock:
+            # 書き出し中に他の書き手が来ても、読み始めた時点の内容でそろえる
+            self._conn.execute("BEGIN")
+            try:
+                return write_records(path, self.iter_records(dataset))
+            finally:
+                self._conn.execute("COMMIT")
+
+    def journal(self, dataset: str) -> "StoreJournal":
+        return StoreJournal(self, dataset)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class StoreJournal:
+    """
+    ResultJournal と同じ使い方でストアに書く。
+    append() がそのままコミットなのでジャーナルファイルは作らず、compact() でも JSON は書かない
+    （他のステージが同時に書いている JSON を上書きしないため。JSON は export で作る）。
+    """
+
+    def __init__(self, store: ProposalStore, dataset: str):
+        self.store = store
+        self.dataset = dataset
+        self.path = store.path
+
+    def apply(self, data: list[dict]) -> int:
+        return 0
+
+    def append(self, pid: str, fields: dict) -> None:
+        self.store.upsert(self.dataset, pid, fields)
+
+    def close(self) -> None:
+        pass
+
+    def compact(self, data, dst: Path) -> None:
+        print(
+            f"[store] '{self.dataset}' is saved in {self.path}; "
+            "run `python tools/proposal_store.py export` to update the JSON"
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_dataset(store: ProposalStore, dataset: str) -> list[dict]:
+    """ステージがストアから読むとき用。空なら import を促す。"""
+    data = list(store.iter_records(dataset))
+    if not data:
+        raise SystemExit(
+            f"{store.path} has no '{dataset}' records; run: python tools/proposal_store.py import"
+        )
+    return data
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="提案レコードの SQLite ストア")
+    ap.add_argument("--store", type=Path, default=STORE_PATH)
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("import", help="JSON をストアに取り込む（ファイルの内容で置き換える）")
+    p.add_argument("datasets", nargs="*", default=list(DATASETS), help="en / ja など")
+
+    p = sub.add_parser("export", help="ストアを JSON に書き出す")
+    p.add_argument("datasets", nargs="*", default=list(DATASETS))
+    p.add_argument("--output-dir", type=Path, help="書き出し先（省略時は DATASETS のパス）")
+
+    sub.add_parser("stats", help="件数と challenge / status ごとの内訳")
+    return ap.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    store = ProposalStore(args.store)
+
+    if args.command == "import":
+        for dataset in args.datasets:
+            path = DATASETS[dataset]
+            if not path.exists():
+                print(f"[store] {path} not found, skip")
+                continue
+            t0 = time.perf_counter()
+            count, changed = store.import_records(dataset, iter_records(path))
+            print(
+                f"[store] {path} → {dataset}: {count} records, {changed} fields changed "
+                f"({time.perf_counter() - t0:.2f}s)"
+            )
+
+    elif args.command == "export":
+        for dataset in args.datasets:
+            path = DATASETS[dataset]
+            if args.output_dir:
+                path = args.output_dir / path.name
+            n = store.export(dataset, path)
+            print(f"[store] {dataset} → {path}: {n} records")
+
+    elif args.command == "stats":
+        for dataset in store.datasets():
+            print(f"{dataset}: {store.count(dataset)} records")
+            for col in INDEXED_FIELDS:
+                for value, n in store.breakdown(dataset, col):
+                    print(f"  {col}={value!r}: {n}")
+
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# tools/rate_limit.py
+
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+
+def parse_retry_after(value) -> float | None:
+    """
+    Retry-After ヘッダを「あと何秒待つか」に変換する。
+    - "120" のような秒数
+    - "Wed, 21 Oct 2015 07:28:00 GMT" のような HTTP-date
+    どちらでもなければ None。
+    """
+    if value is None:
+        return None
+    s = str(value).strip()
+    if not s:
+        return None
+    try:
+        return max(0.0, float(s))
+    except ValueError:
+        pass
+    try:
+        dt = parsedate_to_datetime(s)
+    except (TypeError, ValueError):
+        return None
+    if dt is None:
+        return None
+    return max(0.0, dt.timestamp() - time.time())
+
+
+class TokenBucket:
+    """
+    スレッドセーフなトークンバケット。
+    rate 個/秒 で補充され、最大 capacity 個まで貯まる。
+    pause_for() で Retry-After などの「強制待ち」を入れられる。
+
+    capacity より多く取ろうとしたときは、allow_debt=False なら capacity 個に切り詰め、
+    True なら満タンになるまで待ってから全部を払い、足りない分は借りにする
+    （次の取得が不足分だけ待つ。トークン数の予算のように 1 回の量がばらつくとき用）。
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None, allow_debt: bool = False):
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.allow_debt = allow_debt
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def set_rate(self, rate: float) -> None:
+        """補充レートを変更する（AIMD などの適応制御用）。"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(1e-6, float(rate))
+
+    def pause_for(self, seconds: float) -> None:
+        """指定秒数のあいだ、このバケットからの取得を止める。"""
+        if seconds <= 0:
+            return
+        with self._lock:
+            until = time.monotonic() + seconds
+            if until > self._blocked_until:
+                self._blocked_until = until
+            # 待ち明けに一斉に飛ばないよう、貯まっていた分も捨てる（借りはそのまま）
+            self._tokens = min(self._tokens, 0.0)
+            self._updated = max(self._updated, until)
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """トークンが取れるまでブロックする。待った秒数を返す。"""
+        tokens = float(tokens)
+        need = min(tokens, self.capacity)
+        if not self.allow_debt:
+            tokens = need
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    delay = self._blocked_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= need:
+                        self._tokens -= tokens
+                        return waited
+                    delay = (need - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class HostRateLimiter:
+    """URL のホストごとに TokenBucket を持つレートリミッタ。"""
+
+    def __init__(self, rate: float, burst: float | None = None):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            b = self._buckets.get(host)
+            if b is None:
+                b = TokenBucket(self.rate, self.burst)
+                self._buckets[host] = b
+            return b
+
+    def acquire(self, url: str) -> float:
+        return self.bucket(url).acquire()
+
+    def pause_for(self, url: str, seconds: float) -> None:
+        self.bucket(url).pause_for(seconds)
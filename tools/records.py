@@ -0,0 +1,165 @@
+# tools/records.py
+#
+# 提案レコードをストリームで読み書きする層。
+#
+# - *.jsonl : 1 行 1 レコード
+# - それ以外 : これまでどおりの JSON 配列（site/_data/f14.js が読む形式）
+#
+# どちらもジェネレータで 1 件ずつ読み書きするので、データセット全体をメモリに載せない。
+# 読み込み側はファイルの中身（先頭が "[" かどうか）で形式を判定する。
+#
+#   python tools/records.py convert data/f14_proposals_en.json data/f14_proposals_en.jsonl
+#   python tools/records.py count data/f14_proposals_en.jsonl
+
+import argparse
+import json
+import os
+from pathlib import Path
+
+from telemetry import metrics
+
+CHUNK_SIZE = 1 << 16
+_WS = " \t\r\n"
+
+
+def is_jsonl(path: Path) -> bool:
+    return Path(path).suffix == ".jsonl"
+
+
+def _iter_json_array(f, chunk_size: int = CHUNK_SIZE):
+    """JSON 配列を要素ごとに少しずつデコードする（配列全体は読み込まない）。"""
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        # 使い終わった前半は捨てて、バッファを小さく保つ
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip_ws():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WS:
+                pos += 1
+            if pos < len(buf) or not fill():
+                return
+
+    skip_ws()
+    if pos >= len(buf) or buf[pos] != "[":
+        raise ValueError("expected a JSON array")
+    pos += 1
+
+    first = True
+    while True:
+        skip_ws()
+        if pos >= len(buf):
+            raise ValueError("unexpected end of JSON array")
+        if buf[pos] == "]":
+            return
+        if not first:
+            if buf[pos] != ",":
+                raise ValueError(f"expected ',' in JSON array, got {buf[pos]!r}")
+            pos += 1
+            skip_ws()
+        first = False
+
+        while True:
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if not fill():
+                    raise
+                continue
+            # 数値などがバッファの終わりで切れている可能性があるので読み足して確かめる
+            if end == len(buf) and not eof and fill():
+                continue
+            pos = end
+            yield obj
+            break
+
+
+def iter_records(path: Path):
+    """レコードを 1 件ずつ返すジェネレータ（JSONL でも JSON 配列でもよい）。"""
+    with Path(path).open("r", encoding="utf-8") as f:
+        head = f.read(1)
+        while head and head in _WS:
+            head = f.read(1)
+        if not head:
+            return
+        if head == "[":
+            f.seek(0)
+            yield from _iter_json_array(f)
+            return
+        # JSONL
+        yield json.loads(head + f.readline())
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_records(path: Path, records) -> int:
+    """
+    records を 1 件ずつ書き出して件数を返す。
+    一時ファイルに書いてから差し替えるので、同じファイルを読みながら書いてもよい。
+    JSON 配列は json.dump(indent=2) と同じ体裁で書く。
+    """
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    n = 0
+    try:
+        with tmp.open("w", encoding="utf-8") as f:
+            if is_jsonl(path):
+                for rec in records:
+                    f.write(json.dumps(rec, ensure_ascii=False))
+                    f.write("\n")
+                    n += 1
+            else:
+                for rec in records:
+                    f.write("[\n  " if n == 0 else ",\n  ")
+                    f.write(json.dumps(rec, ensure_ascii=False, indent=2).replace("\n", "\n  "))
+                    n += 1
+                f.write("\n]" if n else "[]")
+            f.flush()
+            os.fsync(f.fileno())
+            # 書く時間は上流のジェネレータの処理と混ざるので、件数とバイト数だけ数える
+            metrics().count("records.written", n)
+            metrics().count("json.bytes_written", f.tell())
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return n
+
+
+def convert(src: Path, dst: Path) -> int:
+    """JSON 配列 ⇔ JSONL の変換（形式は dst の拡張子で決まる）。"""
+    return write_records(dst, iter_records(src))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="提案レコードの JSON 配列 / JSONL 変換")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_conv = sub.add_parser("convert", help="src を dst の形式（.jsonl なら JSONL）で書き出す")
+    p_conv.add_argument("src", type=Path)
+    p_conv.add_argument("dst", type=Path)
+    p_count = sub.add_parser("count", help="レコード数を数える")
+    p_count.add_argument("path", type=Path)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "convert":
+        n = convert(args.src, args.dst)
+        print(f"[records] {n} records: {args.src} → {args.dst}")
+    elif args.cmd == "count":
+        print(sum(1 for _ in iter_records(args.path)))
+
+
+if __name__ == "__main__":
+    main()
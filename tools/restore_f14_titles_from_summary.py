@@ -1,20 +1,21 @@
-import json
+import shutil
 from pathlib import Path
 
+from records import iter_records, write_records
+
 PATH = Path("data/f14_proposals_ja.json")
 
 
 def main():
     # バックアップ作成（念のため）
     backup = PATH.with_suffix(".before_title_fix.json")
-    backup.write_text(PATH.read_text(encoding="utf-8"), encoding="utf-8")
+    shutil.copyfile(PATH, backup)
     print(f"📦 Backup created: {backup}")
 
-    data = json.loads(PATH.read_text(encoding="utf-8"))
-
     fixed_count = 0
 
-    for p in data:
+    def restore(p: dict) -> dict:
+        nonlocal fixed_count
         t = (p.get("title_ja") or "").strip()
         s = (p.get("summary_ja") or "").strip()
 
@@ -26,7 +27,7 @@ def main():
             non_empty = [line for line in lines if line]
 
             if not non_empty:
-                continue
+                return p
 
             # 最初の非空行をタイトル候補に
             new_title = non_empty[0]
@@ -46,8 +47,10 @@ def main():
             p["summary_ja"] = new_summary
 
             fixed_count += 1
+        return p
 
-    PATH.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    # バックアップから 1 件ずつ読み、直しながら書き戻す
+    write_records(PATH, (restore(p) for p in iter_records(backup)))
     print(f"✅ 修正完了: {fixed_count} 件の title_ja を summary_ja から復元しました")
 
 
@@ -1,10 +1,25 @@
 # tools/scrape_one_f14.py
+import argparse
 import json
 import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
 from pathlib import Path
 
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+from html_extract import extract_sections, fetch_section, scrape_full_text  # noqa: F401
+from http_cache import CACHE_DIR, HttpCache
+from journal import ResultJournal
+from proposal_store import STORE_PATH, ProposalStore, load_dataset
+from rate_limit import HostRateLimiter, parse_retry_after
+from telemetry import metrics
 
 DATA_DIR = Path("data")
 JSON_FILE = DATA_DIR / "f14_proposals_en.json"
@@ -12,139 +27,206 @@ JSON_FILE = DATA_DIR / "f14_proposals_en.json"
 # 一度にスクレイプする最大件数（テスト用）
 MAX_ITEMS = 1200
 
-
-def fetch_section(soup, title: str) -> str:
+# 同時に投げるリクエスト数（= コネクションプールの大きさ）
+CONCURRENCY = 8
+# ホストごとの上限（リクエスト/秒）。サイトへの負荷を下げるための制御
+RATE_PER_HOST = 2.0
+# HTML 解析用のプロセス数（0 ならフェッチしたスレッドでそのまま解析）
+PARSE_WORKERS = 2
+# HTML パーサ（"auto" / "lxml" / "selectolax" / "html.parser"）
+PARSER_BACKEND = "auto"
+# 429 / 503 のときの再試行回数
+MAX_RETRIES = 3
+REQUEST_TIMEOUT = 30
+USER_AGENT = "cardano14-pipeline/1.0 (+https://github.com/shiodome47/cardano14-pipeline)"
+
+
+def make_session(pool_size: int = CONCURRENCY) -> requests.Session:
+    """keep-alive を使い回すための Session（ホストごとに pool_size 本まで）。"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+def fetch_page(
+    session: requests.Session,
+    url: str,
+    limiter: HostRateLimiter,
+    headers: dict | None = None,
+) -> requests.Response:
     """
-    h2 見出しから「同じレベルの兄弟」だけを拾って、
-    ・次の h2 が来たら終了
-    ・空行は捨てる
-    ・全く同じ文は 1 回だけ
-
-    ついでに、投票サマリーやフッターのような
-    「Total to date…」「Follow us…」などは除外する。
+    レートリミッタを通して 1 ページ取得する（200 か 304 のレスポンスを返す）。
+    429 / 503 は Retry-After（なければ指数バックオフ）だけホスト全体を止めて再試行。
     """
-    h2 = soup.find("h2", string=lambda x: x and title.lower() in x.lower())
-    if not h2:
-        return ""
-
-    unwanted_prefixes = (
-        "Total to date",
-        "View current challenges",
-        "Sign up to receive news",
-        "We collect personal data",
-        "Follow us",
-    )
-
-    parts = []
-    seen = set()
-
-    for sib in h2.next_siblings:
-        name = getattr(sib, "name", None)
-
-        if name == "h2":
-            break
+    for attempt in range(MAX_RETRIES + 1):
+        limiter.acquire(url)
+        with metrics().timer("http.latency"):
+            r = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        metrics().count(f"http.status.{r.status_code}")
+        if r.status_code in (429, 503) and attempt < MAX_RETRIES:
+            metrics().count("http.retries")
+            wait_sec = parse_retry_after(r.headers.get("Retry-After"))
+            if wait_sec is None:
+                wait_sec = 2.0**attempt
+            print(f"  ⏳ {r.status_code} from {url}, retry in {wait_sec:.1f}s")
+            limiter.pause_for(url, wait_sec)
+            continue
+        r.raise_for_status()
+        return r
+    raise RuntimeError(f"unreachable: {url}")
 
-        if name in {"p", "div"}:
-            text = sib.get_text(" ", strip=True)
-            if not text:
-                continue
-            if any(text.startswith(pref) for pref in unwanted_prefixes):
-                continue
-            if text in seen:
-                continue
-            seen.add(text)
-            parts.append(text)
 
-    return "\n\n".join(parts)
+def extract(html: str, backend: str = PARSER_BACKEND) -> dict:
+    """取得済み HTML から各セクションを抜き出す（プロセスプールからも呼ばれる）。"""
+    # プロセスプールで解析したときは子プロセスの計測になるので、親には残らない
+    with metrics().timer("parse.seconds"):
+        return extract_sections(html, backend)
 
 
-def scrape_full_text(soup: BeautifulSoup) -> str:
-    """
-    フォーム全体を「壁テキスト」として1本にまとめる。
+def scrape(url: str) -> dict:
+    print(f"  Fetching: {url}")
+    r = requests.get(url, timeout=REQUEST_TIMEOUT)
+    r.raise_for_status()
+    return extract(r.text)
+
+
+def scrape_many(
+    jobs,
+    concurrency: int = CONCURRENCY,
+    rate: float = RATE_PER_HOST,
+    parse_workers: int = PARSE_WORKERS,
+    session: requests.Session | None = None,
+    cache: HttpCache | None = None,
+    parser: str = PARSER_BACKEND,
+):
     """
-    blocks = []
+    (pid, url) の列をまとめてスクレイプし、終わった順に
+    (pid, result, error) を yield する。
 
-    qa_blocks = soup.find_all(attrs={"data-testid": "question-answer"})
-
-    if qa_blocks:
-        for block in qa_blocks:
-            q_el = block.find(["h2", "h3", "h4"])
-            a_el = block.find(attrs={"data-testid": "answer"}) or block
-
-            q_text = q_el.get_text(" ", strip=True) if q_el else ""
-            a_text = a_el.get_text("\n", strip=True)
-
-            if not a_text:
-                continue
-
-            if q_text:
-                blocks.append(f"## {q_text}")
-            blocks.append(a_text)
+    - フェッチはスレッドプール（Session を共有してコネクションを再利用）
+    - 解析は parse_workers > 0 ならプロセスプールに回し、次のフェッチと並行させる
+    - cache があれば条件付きリクエストを送り、304 ならキャッシュの抽出結果を返す
+    """
+    session = session or make_session(concurrency)
+    limiter = HostRateLimiter(rate)
+    parse_pool = ProcessPoolExecutor(parse_workers) if parse_workers > 0 else None
+
+    def work(url: str):
+        entry = cache.get(url) if cache is not None else None
+        r = fetch_page(session, url, limiter, HttpCache.conditional_headers(entry))
+        if r.status_code == 304 and entry is not None:
+            cache.touch(url, entry)
+            return entry["extracted"]
+
+        html = r.text
+        etag = r.headers.get("ETag")
+        last_modified = r.headers.get("Last-Modified")
+
+        def remember(extracted: dict) -> dict:
+            if cache is not None:
+                cache.put(url, etag, last_modified, html, extracted)
+            return extracted
+
+        if parse_pool is None:
+            return remember(extract(html, parser))
+        fut = parse_pool.submit(extract, html, parser)
+        fut.add_done_callback(
+            lambda f: f.cancelled() or f.exception() or remember(f.result())
+        )
+        return fut
+
+    def timed_work(url: str):
+        # 1 レコード分の時間。解析をプロセスプールに回したときは、解析が終わるまでを含める
+        started = time.perf_counter()
+
+        def observe(_fut=None):
+            metrics().observe("record.seconds", time.perf_counter() - started)
 
-        raw_text = "\n\n".join(blocks)
-    else:
-        main = soup.find("main")
-        if main:
-            raw_text = main.get_text("\n", strip=True)
+        try:
+            res = work(url)
+        except Exception:
+            observe()
+            raise
+        if isinstance(res, Future):
+            res.add_done_callback(observe)
         else:
-            raw_text = soup.get_text("\n", strip=True)
-
-    unwanted_starts = (
-        "View current challenges",
-        "Sign up to receive news",
-        "We collect personal data",
-        "Follow us",
-        "Thank you for subscribing",
+            observe()
+        return res
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            pending = {pool.submit(timed_work, url): pid for pid, url in jobs}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    pid = pending.pop(fut)
+                    try:
+                        res = fut.result()
+                    except Exception as e:
+                        yield pid, None, e
+                        continue
+                    if isinstance(res, Future):
+                        # フェッチ完了 → 解析待ちとして監視を続ける
+                        pending[res] = pid
+                    else:
+                        yield pid, res, None
+    finally:
+        if parse_pool is not None:
+            parse_pool.shutdown(cancel_futures=True)
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Fund14 提案ページをスクレイプする")
+    ap.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    ap.add_argument("--rate", type=float, default=RATE_PER_HOST, help="req/sec per host")
+    ap.add_argument("--parse-workers", type=int, default=PARSE_WORKERS)
+    ap.add_argument("--max-items", type=int, default=MAX_ITEMS)
+    ap.add_argument("--parser", default=PARSER_BACKEND, help="HTML パーサのバックエンド")
+    ap.add_argument(
+        "--refresh",
+        action="store_true",
+        help="full_text_en があっても条件付きリクエストで再検証する",
     )
+    ap.add_argument("--cache-dir", type=Path, default=CACHE_DIR)
+    ap.add_argument("--no-cache", action="store_true")
+    ap.add_argument(
+        "--store",
+        type=Path,
+        nargs="?",
+        const=STORE_PATH,
+        help="JSON ではなく SQLite ストアを読み書きする（他のステージと同時に走らせられる）",
+    )
+    return ap.parse_args(argv)
 
-    lines = []
-    seen_lines = set()
-
-    for raw_line in raw_text.splitlines():
-        line = raw_line.strip()
-        if not line:
-            continue
-        if any(line.startswith(pref) for pref in unwanted_starts):
-            continue
-        if line in seen_lines:
-            continue
-        seen_lines.add(line)
-        lines.append(line)
-
-    return "\n\n".join(lines)
-
-
-def scrape(url: str) -> dict:
-    print(f"  Fetching: {url}")
-    r = requests.get(url)
-    r.raise_for_status()
-    soup = BeautifulSoup(r.text, "html.parser")
-
-    problem = fetch_section(soup, "Problem")
-    solution = fetch_section(soup, "Solution")
-    about = fetch_section(soup, "About this idea")
-    team = fetch_section(soup, "Team")
-    full_text = scrape_full_text(soup)
 
-    return {
-        "problem_en": problem,
-        "solution_en": solution,
-        "about_en": about,
-        "team_en": team,
-        "full_text_en": full_text,
-    }
+def main(argv=None):
+    args = parse_args(argv)
+    print("[scrape_f14] START")
 
+    if args.store:
+        # ストアなら 1 件ごとにコミットされるので、ジャーナルは要らない
+        store = ProposalStore(args.store)
+        data = load_dataset(store, "en")
+        journal = store.journal("en")
+    else:
+        if not JSON_FILE.exists():
+            raise FileNotFoundError(JSON_FILE)
 
-def main():
-    print("[scrape_f14] START")
+        with JSON_FILE.open("r", encoding="utf-8") as f:
+            data = json.load(f)
 
-    if not JSON_FILE.exists():
-        raise FileNotFoundError(JSON_FILE)
+        journal = ResultJournal.for_file(JSON_FILE, "scrape")
 
-    with JSON_FILE.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+    # 前回途中で止まっていれば、ジャーナルの分を反映してから再開する
+    resumed = journal.apply(data)
+    if resumed:
+        print(f"[scrape_f14] Resumed {resumed} proposals from {journal.path}")
 
-    updated = 0
+    by_id = {}
+    jobs = []
 
     for item in data:
         pid = item.get("proposal_id")
@@ -160,33 +242,62 @@ def main():
             continue
 
         # すでに full_text_en があればスキップ（再実行に備えた設計）
-        if item.get("full_text_en"):
+        # --refresh のときは HTTP キャッシュで変わったページだけ取り直す
+        if item.get("full_text_en") and not args.refresh:
             print(f"- {pid}: already has full_text_en, skip")
             continue
 
-        print(f"- {pid}: scraping...")
-        try:
-            scraped = scrape(url)
-        except Exception as e:
-            print(f"  ❌ error while scraping {pid}: {e}")
+        if len(jobs) >= args.max_items:
+            print(f"[scrape_f14] Reached MAX_ITEMS={args.max_items}, stopping.")
+            break
+
+        by_id[pid] = item
+        jobs.append((pid, url))
+
+    print(
+        f"[scrape_f14] {len(jobs)} pages, concurrency={args.concurrency}, "
+        f"rate={args.rate}/s per host, parse_workers={args.parse_workers}"
+    )
+
+    cache = None if args.no_cache else HttpCache(args.cache_dir)
+
+    updated = 0
+    started = time.perf_counter()
+
+    for pid, scraped, err in scrape_many(
+        jobs,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        parse_workers=args.parse_workers,
+        cache=cache,
+        parser=args.parser,
+    ):
+        item = by_id[pid]
+        if err is not None:
+            print(f"  ❌ error while scraping {pid}: {err}")
             # 次回以降は自動スキップできるようメモ
-            item["_scrape_error"] = str(e)
+            item["_scrape_error"] = str(err)
+            journal.append(pid, {"_scrape_error": str(err)})
+            continue
+
+        if all(item.get(k) == v for k, v in scraped.items()):
+            print(f"- {pid}: unchanged")
             continue
 
+        print(f"- {pid}: scraped")
         item.update(scraped)
+        journal.append(pid, scraped)
         updated += 1
 
-        # サイトへの負荷を下げるため、少し待つ
-        time.sleep(1)
+    elapsed = time.perf_counter() - started
 
-        if updated >= MAX_ITEMS:
-            print(f"[scrape_f14] Reached MAX_ITEMS={MAX_ITEMS}, stopping.")
-            break
-
-    with JSON_FILE.open("w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    journal.compact(data, JSON_FILE)
 
-    print(f"[scrape_f14] Done. Updated {updated} proposals.")
+    rate = len(jobs) / elapsed if elapsed > 0 else 0.0
+    print(
+        f"[scrape_f14] Done. Updated {updated} proposals "
+        f"in {elapsed:.1f}s ({rate:.2f} pages/sec)."
+    )
 
 
 if __name__ == "__main__":
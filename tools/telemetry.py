@@ -0,0 +1,293 @@
+# tools/telemetry.py
+#
+# ステージの計測（時間・レイテンシの分布・トークン数・推定コスト）。
+#
+# 計測する側（llm_engine / scrape_one_f14 / journal / records）は metrics() に
+# 書き込むだけで、書き出すのは stage() で包んだときだけ。pipeline.py は各ステージを
+#   python tools/telemetry.py run <stage> <script> [args...]
+# で走らせるので、スクリプトには手を入れなくても計測される。
+#
+#   data/metrics/<stage>.json    直近の実行
+#   data/metrics/history.jsonl   これまでの実行（1 行 1 実行）
+#   data/metrics/<stage>.prof    F14_PROFILE=1 のときの cProfile（python -m pstats などで見る）
+#
+#   python tools/telemetry.py run scrape tools/scrape_one_f14.py
+#   python tools/telemetry.py report
+
+import argparse
+import cProfile
+import json
+import os
+import runpy
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRICS_DIR = Path("data/metrics")
+HISTORY_FILE = "history.jsonl"
+
+# ヒストグラムで出す分位点
+PERCENTILES = (50, 95, 99)
+
+# 100 万トークンあたりの料金（USD, 入力・出力）。バッチ API の割引は入れていない。
+# 載っていないモデルは LLM_PRICE_IN / LLM_PRICE_OUT（同じ単位）で渡す
+PRICES = {
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """最近傍順位法（sorted_values は昇順）。"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(values: list[float]) -> dict:
+    values = sorted(values)
+    n = len(values)
+    out = {
+        "count": n,
+        "sum": round(sum(values), 6),
+        "min": round(values[0], 6) if n else 0.0,
+        "max": round(values[-1], 6) if n else 0.0,
+        "mean": round(sum(values) / n, 6) if n else 0.0,
+    }
+    for p in PERCENTILES:
+        out[f"p{p}"] = round(percentile(values, p), 6)
+    return out
+
+
+def price(model: str) -> tuple[float, float] | None:
+    env_in, env_out = os.environ.get("LLM_PRICE_IN"), os.environ.get("LLM_PRICE_OUT")
+    if env_in and env_out:
+        return float(env_in), float(env_out)
+    return PRICES.get(model)
+
+
+class Metrics:
+    """カウンタとヒストグラム（生の値を持っておき、書き出すときに分位点を出す）。スレッドセーフ。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: dict[str, float] = {}
+        self.histograms: dict[str, list[float]] = {}
+        # モデルごとのトークン数（コストの見積もり用）
+        self.tokens: dict[str, list[int]] = {}
+
+    def count(self, name: str, n: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            self.histograms.setdefault(name, []).append(value)
+
+    @contextmanager
+    def timer(self, name: str):
+        """with の中の経過時間（秒）を name のヒストグラムに入れる。"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def add_tokens(self, model: str, prompt_tokens: int, completion_tokens: int) -> None:
+        with self._lock:
+            t = self.tokens.setdefault(model, [0, 0])
+            t[0] += prompt_tokens
+            t[1] += completion_tokens
+
+    def cost(self) -> dict:
+        """モデルごとのトークン数と推定コスト（料金が分からないモデルは cost_usd が None）。"""
+        with self._lock:
+            tokens = {model: list(t) for model, t in self.tokens.items()}
+        models = {}
+        total = 0.0
+        for model, (tokens_in, tokens_out) in sorted(tokens.items()):
+            rates = price(model)
+            usd = None
+            if rates is not None:
+                usd = round((tokens_in * rates[0] + tokens_out * rates[1]) / 1_000_000, 6)
+                total += usd
+            models[model] = {"tokens_in": tokens_in, "tokens_out": tokens_out, "cost_usd": usd}
+        return {"models": models, "total_usd": round(total, 6)}
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(sorted(self.counters.items()))
+            histograms = {name: list(v) for name, v in sorted(self.histograms.items())}
+        return {
+            "counters": counters,
+            "histograms": {name: summarize(v) for name, v in histograms.items()},
+            "llm_cost": self.cost(),
+        }
+
+
+_metrics = Metrics()
+
+
+def metrics() -> Metrics:
+    """プロセス全体で 1 つのレジストリ。"""
+    return _metrics
+
+
+def _children_cpu() -> float:
+    t = os.times()
+    return t.children_user + t.children_system
+
+
+def _max_rss_mb() -> float | None:
+    # Linux の ru_maxrss は exec 前（親プロセス）の RSS を引き継ぐので、
+    # 大きなプロセスから起動されたときは /proc の VmHWM（このプロセスの分だけ）を使う
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    # Linux は KiB、macOS はバイト
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _write_json(path: Path, obj) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(obj, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+@contextmanager
+def stage(name: str, out_dir: Path = METRICS_DIR, profile: bool | None = None, argv=None):
+    """
+    with の中を 1 ステージとして計測し、終わったら（失敗しても）書き出す。
+    profile が None なら環境変数 F14_PROFILE で決める。
+    """
+    if profile is None:
+        profile = os.environ.get("F14_PROFILE", "") not in ("", "0")
+    out_dir = Path(out_dir)
+    started_at = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    wall0, cpu0, child0 = time.perf_counter(), time.process_time(), _children_cpu()
+    profiler = cProfile.Profile() if profile else None
+    status = "ok"
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield _metrics
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            status = f"exit {e.code}"
+        raise
+    except BaseException as e:
+        status = f"error: {type(e).__name__}: {e}"
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        report = {
+            "stage": name,
+            "started": started_at,
+            "status": status,
+            "argv": list(argv or []),
+            "wall_seconds": round(time.perf_counter() - wall0, 6),
+            "cpu_seconds": round(time.process_time() - cpu0, 6),
+            "cpu_children_seconds": round(_children_cpu() - child0, 6),
+            "max_rss_mb": _max_rss_mb(),
+            **_metrics.snapshot(),
+        }
+        out_dir.mkdir(parents=True, exist_ok=True)
+        _write_json(out_dir / f"{name}.json", report)
+        with (out_dir / HISTORY_FILE).open("a", encoding="utf-8") as f:
+            f.write(json.dumps(report, ensure_ascii=False) + "\n")
+        if profiler is not None:
+            profiler.dump_stats(str(out_dir / f"{name}.prof"))
+
+
+def run_script(name: str, script: Path, args: list[str], out_dir: Path = METRICS_DIR) -> None:
+    """script を python script args... と同じように走らせ、stage(name) で計測する。"""
+    script = Path(script).resolve()
+    sys.argv = [str(script), *args]
+    # スクリプトを直接実行したときと同じく、そのディレクトリから import できるようにする
+    sys.path.insert(0, str(script.parent))
+    with stage(name, out_dir, argv=sys.argv):
+        runpy.run_path(str(script), run_name="__main__")
+
+
+def _fmt_ms(h: dict | None) -> str:
+    if not h:
+        return "-"
+    return "/".join(f"{h[f'p{p}'] * 1000:.0f}" for p in PERCENTILES)
+
+
+def report(out_dir: Path = METRICS_DIR) -> None:
+    """ステージごとの直近の計測を表にする。"""
+    rows = []
+    for path in sorted(Path(out_dir).glob("*.json")):
+        try:
+            m = json.loads(path.read_text(encoding="utf-8"))
+        except ValueError:
+            continue
+        if "stage" in m:
+            rows.append(m)
+    if not rows:
+        print(f"no metrics in {out_dir}")
+        return
+    rows.sort(key=lambda m: m["started"])
+    pct = "/".join(f"p{p}" for p in PERCENTILES)
+    print(
+        f"{'stage':14} {'status':8} {'wall s':>8} {'cpu s':>8} {'llm calls':>9} "
+        f"{'llm ms ' + pct:>20} {'http ms ' + pct:>20} {'tok in':>9} {'tok out':>9} {'cost $':>8}"
+    )
+    for m in rows:
+        counters, hist = m["counters"], m["histograms"]
+        models = m["llm_cost"]["models"].values()
+        print(
+            f"{m['stage']:14} {m['status'].split(':')[0]:8} {m['wall_seconds']:8.1f} "
+            f"{m['cpu_seconds'] + m['cpu_children_seconds']:8.1f} "
+            f"{int(counters.get('llm.requests', 0)):9d} "
+            f"{_fmt_ms(hist.get('llm.latency')):>20} {_fmt_ms(hist.get('http.latency')):>20} "
+            f"{sum(x['tokens_in'] for x in models):9d} {sum(x['tokens_out'] for x in models):9d} "
+            f"{m['llm_cost']['total_usd']:8.4f}"
+        )
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="ステージを計測して走らせる / 計測を表示する")
+    ap.add_argument("--metrics-dir", type=Path, default=METRICS_DIR)
+    sub = ap.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="スクリプトを計測つきで走らせる")
+    run.add_argument("name", help="ステージ名（data/metrics/<name>.json に書く）")
+    run.add_argument("script", type=Path)
+    run.add_argument("args", nargs=argparse.REMAINDER)
+    sub.add_parser("report", help="ステージごとの直近の計測を表示する")
+    return ap.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "run":
+        run_script(args.name, args.script, args.args, args.metrics_dir)
+    else:
+        report(args.metrics_dir)
+
+
+if __name__ == "__main__":
+    # 計測する側は "import telemetry" で使うので、__main__ ではなくそちらのレジストリに集める
+    import telemetry
+
+    telemetry.main()
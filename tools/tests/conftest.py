@@ -0,0 +1,15 @@
+# tools/tests/conftest.py
+#
+# tools/ のスクリプトは互いを直接 import するので、同じように import できるようにする。
+
+import sys
+from pathlib import Path
+
+TOOLS_DIR = Path(__file__).resolve().parent.parent
+ROOT = TOOLS_DIR.parent
+
+for path in (TOOLS_DIR, ROOT):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
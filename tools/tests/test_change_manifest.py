@@ -0,0 +1,52 @@
+# tools/tests/test_change_manifest.py
+
+import change_manifest as cm
+
+FIELDS = ("about_structured_en",)
+
+
+def recs(**about):
+    return [{"proposal_id": pid, "title_en": pid, "about_structured_en": text} for pid, text in about.items()]
+
+
+def test_latest_diff_only_sees_last_update(tmp_path):
+    cm.update("en", recs(a="1", b="1"), root=tmp_path)
+    cm.update("en", recs(a="2", b="1"), root=tmp_path)
+    cm.update("en", recs(a="2", b="2"), root=tmp_path)
+    assert cm.changed_ids("en", FIELDS, root=tmp_path) == {"b"}
+
+
+def test_consumer_sees_every_change_since_its_ack(tmp_path):
+    cm.update("en", recs(a="1", b="1"), root=tmp_path)
+    cm.acknowledge("en", "multilang", root=tmp_path)
+    # consumer が走らないうちにマニフェストが 2 回更新される
+    cm.update("en", recs(a="2", b="1"), root=tmp_path)
+    cm.update("en", recs(a="2", b="2", c="1"), root=tmp_path)
+    assert cm.changed_ids("en", FIELDS, root=tmp_path, consumer="multilang") == {"a", "b", "c"}
+
+    cm.acknowledge("en", "multilang", root=tmp_path)
+    assert cm.changed_ids("en", FIELDS, root=tmp_path, consumer="multilang") == set()
+
+
+def test_consumer_without_ack_falls_back_to_latest_diff(tmp_path):
+    assert cm.changed_ids("en", FIELDS, root=tmp_path, consumer="multilang") is None
+    cm.update("en", recs(a="1"), root=tmp_path)
+    cm.update("en", recs(a="2"), root=tmp_path)
+    assert cm.changed_ids("en", FIELDS, root=tmp_path, consumer="multilang") == {"a"}
+
+
+def test_pending_ids_stay_changed_after_ack(tmp_path):
+    cm.update("en", recs(a="1", b="1"), root=tmp_path)
+    cm.acknowledge("en", "multilang", root=tmp_path)
+    cm.update("en", recs(a="2", b="2", c="1"), root=tmp_path)
+    # a と c は失敗したので控えを進めない
+    cm.acknowledge("en", "multilang", pending={"a", "c"}, root=tmp_path)
+    assert cm.changed_ids("en", FIELDS, root=tmp_path, consumer="multilang") == {"a", "c"}
+
+
+def test_field_filter_ignores_other_fields(tmp_path):
+    cm.update("en", recs(a="1"), root=tmp_path)
+    cm.acknowledge("en", "multilang", root=tmp_path)
+    cm.update("en", [{"proposal_id": "a", "title_en": "renamed", "about_structured_en": "1"}], root=tmp_path)
+    assert cm.changed_ids("en", FIELDS, root=tmp_path, consumer="multilang") == set()
+    assert cm.changed_ids("en", root=tmp_path, consumer="multilang") == {"a"}
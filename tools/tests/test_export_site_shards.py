@@ -0,0 +1,36 @@
+# tools/tests/test_export_site_shards.py
+
+import json
+
+from export_site_shards import ShardWriter, challenge_slugs, export_shards
+
+
+def test_unique_names_keep_plain_slugs():
+    assert challenge_slugs(["Cardano Use Cases: Concept", "Open Ecosystem"]) == {
+        "Cardano Use Cases: Concept": "cardano-use-cases-concept",
+        "Open Ecosystem": "open-ecosystem",
+    }
+
+
+def test_colliding_names_get_distinct_stable_slugs():
+    names = ["Use Cases: Concept", "Use-Cases Concept", "", "開発者ツール", "Other"]
+    slugs = challenge_slugs(names)
+    assert len(set(slugs.values())) == len(names)
+    assert slugs["開発者ツール"].startswith("other-")
+    assert slugs["Use Cases: Concept"].startswith("use-cases-concept-")
+    # 並び順が変わっても同じ slug になる
+    assert challenge_slugs(reversed(names)) == slugs
+
+
+def test_each_challenge_gets_its_own_shard(tmp_path):
+    records = [
+        {"proposal_id": "A1", "challenge": "開発者ツール"},
+        {"proposal_id": "A2", "challenge": "ガバナンス"},
+        {"proposal_id": "A3", "challenge": "Governance"},
+    ]
+    manifest = export_shards(records, ShardWriter(tmp_path, compress=False))
+    paths = [c["path"] for c in manifest["challenges"]]
+    assert len(set(paths)) == 3
+    for c in manifest["challenges"]:
+        items = json.loads((tmp_path / c["path"]).read_text(encoding="utf-8"))
+        assert [item["challenge"] for item in items] == [c["challenge"]]
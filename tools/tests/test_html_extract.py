@@ -0,0 +1,43 @@
+# tools/tests/test_html_extract.py
+
+import pytest
+from conftest import FIXTURES
+
+from html_extract import available_backends, extract_sections, legacy_extract, resolve_backend
+
+PAGES = sorted((FIXTURES / "html").glob("*.html"))
+# lxml / selectolax は壊れた HTML でツリーの組み方が html.parser とずれる
+WELL_FORMED = [p for p in PAGES if p.name != "malformed.html"]
+
+
+def test_auto_is_html_parser():
+    assert resolve_backend("auto") == "html.parser"
+
+
+@pytest.mark.parametrize("page", PAGES, ids=lambda p: p.name)
+def test_default_matches_legacy(page):
+    html = page.read_text(encoding="utf-8")
+    assert extract_sections(html) == legacy_extract(html)
+
+
+@pytest.mark.parametrize("backend", available_backends())
+@pytest.mark.parametrize("page", WELL_FORMED, ids=lambda p: p.name)
+def test_backends_match_legacy_on_well_formed_pages(page, backend):
+    html = page.read_text(encoding="utf-8")
+    assert extract_sections(html, backend) == legacy_extract(html)
+
+
+def test_legacy_output_of_qa_page():
+    got = legacy_extract((FIXTURES / "html" / "qa_page.html").read_text(encoding="utf-8"))
+    # 「Total to date」と重複した段落は捨てる
+    assert got["problem_en"] == "New users struggle to set up a Cardano wallet."
+    assert got["team_en"] == "Alice (lead), Bob (design)"
+    assert got["full_text_en"].splitlines()[0] == "## What is the problem?"
+    assert "Empty answer" not in got["full_text_en"]
+    assert got["full_text_en"].count("Onboarding is hard.") == 1
+
+
+def test_malformed_page_keeps_all_text():
+    got = extract_sections((FIXTURES / "html" / "malformed.html").read_text(encoding="utf-8"))
+    assert "second unclosed paragraph" in got["full_text_en"]
+    assert got["team_en"] == "Dave & Erin"
@@ -0,0 +1,63 @@
+# tools/tests/test_journal.py
+
+import json
+import shutil
+
+from conftest import FIXTURES
+from journal import ResultJournal, atomic_write_json
+
+TORN = FIXTURES / "journal" / "torn.journal.jsonl"
+
+
+def copy_torn(tmp_path):
+    path = tmp_path / "data.json.format.journal.jsonl"
+    shutil.copy(TORN, path)
+    return ResultJournal(path, fsync=False)
+
+
+def test_load_merges_and_skips_torn_line(tmp_path):
+    journal = copy_torn(tmp_path)
+    assert journal.load() == {
+        "F14-0001": {"about_structured_en": "## Overview\n\nfirst", "about_structured_ja": "概要"},
+        "F14-0002": {"about_structured_en": "second"},
+    }
+
+
+def test_apply_counts_updated_items(tmp_path):
+    journal = copy_torn(tmp_path)
+    data = [{"proposal_id": "F14-0001"}, {"proposal_id": "F14-0003"}, {"proposal_id": "F14-0002"}]
+    assert journal.apply(data) == 2
+    assert data[0]["about_structured_ja"] == "概要"
+    assert "about_structured_en" not in data[1]
+
+
+def test_append_after_torn_line_starts_a_new_line(tmp_path):
+    journal = copy_torn(tmp_path)
+    journal.append("F14-0003", {"about_structured_en": "third"})
+    journal.close()
+    assert journal.load()["F14-0003"] == {"about_structured_en": "third"}
+    assert len(journal.path.read_text(encoding="utf-8").splitlines()) == 5
+
+
+def test_for_file_naming(tmp_path):
+    journal = ResultJournal.for_file(tmp_path / "f14_proposals_en.json", "scrape")
+    assert journal.path == tmp_path / "f14_proposals_en.json.scrape.journal.jsonl"
+    assert journal.load() == {}
+
+
+def test_compact_writes_data_and_removes_journal(tmp_path):
+    journal = copy_torn(tmp_path)
+    data = [{"proposal_id": "F14-0001"}]
+    journal.apply(data)
+    dst = tmp_path / "data.json"
+    journal.compact(data, dst)
+    assert json.loads(dst.read_text(encoding="utf-8")) == data
+    assert not journal.path.exists()
+
+
+def test_atomic_write_leaves_no_temp_files(tmp_path):
+    dst = tmp_path / "out.json"
+    atomic_write_json(dst, {"a": 1}, indent=None)
+    atomic_write_json(dst, {"a": 2}, indent=None)
+    assert dst.read_text(encoding="utf-8") == '{"a": 2}'
+    assert [p.name for p in tmp_path.iterdir()] == ["out.json"]
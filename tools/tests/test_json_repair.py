@@ -0,0 +1,51 @@
+# tools/tests/test_json_repair.py
+
+import pytest
+
+from json_repair import loads_lenient
+
+
+@pytest.mark.parametrize(
+    "content, value, repaired",
+    [
+        ('{"segments": ["a", "b"]}', {"segments": ["a", "b"]}, None),
+        ('```json\n{"segments": ["a"]}\n```', {"segments": ["a"]}, "fence"),
+        ('```\n["a", "b"]\n```', ["a", "b"], "fence"),
+        ('Here is the JSON:\n{"a": 1}', {"a": 1}, "trailing"),
+        ('{"a": 1}\nLet me know if you need more.', {"a": 1}, "trailing"),
+        ('{"a": 1} {"b": 2}', {"a": 1}, "trailing"),
+    ],
+)
+def test_repairs(content, value, repaired):
+    assert loads_lenient(content) == (value, repaired)
+
+
+@pytest.mark.parametrize(
+    "content, value",
+    [
+        # 書きかけの文字列は捨てる
+        ('{"segments": ["first", "second", "thi', {"segments": ["first", "second"]}),
+        # 書きかけのキーも捨てる
+        ('{"a": "x", "b":', {"a": "x"}),
+        ('{"a": "x", "b', {"a": "x"}),
+        # 入れ子の括弧を閉じる
+        ('[{"a": [1, 2', [{"a": [1, 2]}]),
+        # 文字列の中の括弧やエスケープは数えない
+        ('["}]", "say \\"hi\\"", "to', ["}]", 'say "hi"']),
+        # フェンスの中で切れていても同じ
+        ('```json\n{"segments": ["a", "b', {"segments": ["a"]}),
+    ],
+)
+def test_truncated_replies_keep_complete_items(content, value):
+    assert loads_lenient(content) == (value, "truncated")
+
+
+@pytest.mark.parametrize("content", ["", None, "no json here", "```\n```"])
+def test_unreadable_replies_raise(content):
+    with pytest.raises(ValueError):
+        loads_lenient(content)
+
+
+def test_markdown_fences_inside_values_are_kept():
+    content = '{"md": "```python\\nprint(1)\\n```"}'
+    assert loads_lenient(content) == ({"md": "```python\nprint(1)\n```"}, None)
@@ -0,0 +1,38 @@
+# tools/tests/test_llm_cache.py
+
+from llm_cache import LLMCache
+
+
+def test_running_total_tracks_inserts_replaces_and_evictions(tmp_path):
+    cache = LLMCache(tmp_path / "cache.sqlite3", max_bytes=10)
+    cache.put("a", "xxxx")
+    cache.put("b", "xxxx")
+    cache.put("a", "xx")  # 置き換えは差分だけ増減する
+    assert cache._total == cache.usage()[1] == 6
+
+    cache.get("b")  # b を新しくしておくと、先に a が消える
+    cache.put("c", "xxxxxx")
+    assert cache.get("a") is None
+    assert cache.stats["evictions"] == 1
+    assert cache._total == cache.usage()[1] == 10
+    cache.close()
+
+
+def test_total_is_loaded_on_open(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    cache = LLMCache(path)
+    cache.put("a", "日本語")
+    cache.close()
+    reopened = LLMCache(path)
+    assert reopened._total == len("日本語".encode("utf-8"))
+    reopened.close()
+
+
+def test_put_does_not_sum_the_table_below_the_limit(tmp_path, monkeypatch):
+    cache = LLMCache(tmp_path / "cache.sqlite3", max_bytes=1000)
+    calls = []
+    monkeypatch.setattr(cache, "_sum_sizes", lambda: calls.append(1) or 0)
+    for i in range(20):
+        cache.put(str(i), "x")
+    assert calls == []
+    cache.close()
@@ -0,0 +1,36 @@
+# tools/tests/test_md_sections.py
+
+from md_sections import merge_sections
+
+LAYOUT = ["## 1. Problem", "## 2. Plan"]
+
+
+def test_table_continued_across_chunks_keeps_one_header():
+    first = "## 2. Plan\n\n| Milestone | Cost |\n|---|---|\n| M1 | 100 |"
+    second = "## 2. Plan\n\n| Milestone | Cost |\n|---|---|\n| M2 | 200 |"
+    assert merge_sections([first, second], LAYOUT) == (
+        "## 2. Plan\n\n| Milestone | Cost |\n|---|---|\n| M1 | 100 |\n| M2 | 200 |"
+    )
+
+
+def test_overlap_at_chunk_boundary_is_dropped():
+    first = "## 1. Problem\n\nFees are high.\n\nWallets are slow."
+    second = "## 1. Problem\n\nWallets are slow.\n\nOnboarding is hard."
+    merged = merge_sections([first, second], LAYOUT)
+    assert merged.count("Wallets are slow.") == 1
+    assert merged.endswith("Onboarding is hard.")
+
+
+def test_repeated_lines_inside_sections_are_kept():
+    first = "## 2. Plan\n\n### Team A\n- Yes\n- Audit\n\n### Team B\n- Yes\n- Build"
+    second = "## 2. Plan\n\n### Team C\n- Yes\n- Docs"
+    merged = merge_sections([first, second], LAYOUT)
+    assert merged.count("- Yes") == 3
+    assert merged.count("### Team") == 3
+
+
+def test_sections_follow_layout_order():
+    parts = ["## 2. Plan\n\nShip it.", "## 1. Problem\n\nIt is broken.\n\n---", "## Extra\n\nMore."]
+    assert merge_sections(parts, LAYOUT) == (
+        "## 1. Problem\n\nIt is broken.\n\n---\n\n## 2. Plan\n\nShip it.\n\n---\n\n## Extra\n\nMore."
+    )
@@ -0,0 +1,152 @@
+# tools/tests/test_near_dupes.py
+
+import random
+
+import pytest
+
+import format_about_with_llm
+from near_dupes import (
+    REUSE_SIMILARITY,
+    THRESHOLD,
+    DuplicateGroups,
+    find_clusters,
+    jaccard,
+    minhash,
+    shingles,
+    similarity,
+)
+
+WORDS = [f"w{i}" for i in range(2000)]
+
+
+def text(rng, n=400):
+    return rng.choices(WORDS, k=n)
+
+
+def edit(words, rng, share=0.01):
+    words = list(words)
+    for i in rng.sample(range(len(words)), max(1, int(len(words) * share))):
+        words[i] = rng.choice(WORDS)
+    return words
+
+
+def rec(pid, words):
+    return {"proposal_id": pid, "full_text_en": " ".join(words)}
+
+
+def sim(a, b):
+    return similarity(minhash(shingles(a)), minhash(shingles(b)))
+
+
+def test_planted_duplicates_are_found():
+    rng = random.Random(1)
+    records, planted = [], {}
+    for i in range(200):
+        words = text(rng)
+        records.append(rec(f"P{i}", words))
+        if i % 10 == 0:
+            records.append(rec(f"D{i}", edit(words, rng)))
+            planted[f"D{i}"] = f"P{i}"
+    clusters, counts = find_clusters(records)
+    found = {m["proposal_id"]: c["canonical"] for c in clusters for m in c["members"]}
+    assert found == planted
+    assert counts["duplicates"] == len(planted)
+
+
+def test_chained_edits_do_not_join_distant_members():
+    # A → B → C → D → E と少しずつ変えると、隣どうしは似ているが A と E は似ていない
+    rng = random.Random(7)
+    words = text(rng)
+    chain = []
+    for pid in "ABCDE":
+        chain.append(rec(pid, words))
+        words = edit(words, rng, 0.015)
+    by_id = {r["proposal_id"]: r for r in chain}
+    assert sim(by_id["A"], by_id["E"]) < THRESHOLD
+
+    clusters, _ = find_clusters(chain)
+    assert clusters
+    for c in clusters:
+        for m in c["members"]:
+            # メンバーは代表そのものと似ている
+            assert sim(by_id[c["canonical"]], by_id[m["proposal_id"]]) >= THRESHOLD
+            assert m["similarity"] >= THRESHOLD
+    members = [m["proposal_id"] for c in clusters for m in c["members"]]
+    assert len(members) == len(set(members))
+
+
+GROUPS = DuplicateGroups([{"canonical": "A", "members": [{"proposal_id": "B", "similarity": 0.9}]}])
+
+
+@pytest.mark.parametrize(
+    "canonical, selected, expected",
+    [
+        ({"proposal_id": "A", "about_structured_en": "done"}, (), "A"),
+        ({"proposal_id": "A"}, {"A"}, "A"),
+        ({"proposal_id": "A"}, (), None),
+    ],
+)
+def test_reuses_only_when_canonical_provides_output(canonical, selected, expected):
+    by_id = {"A": canonical, "B": {"proposal_id": "B"}}
+    assert GROUPS.reuses("B", by_id, ("about_structured_en",), selected) == expected
+    assert GROUPS.reuses("A", by_id, ("about_structured_en",), selected) is None
+
+
+def test_format_selects_follower_when_canonical_is_skipped():
+    data = [
+        {"proposal_id": "A", "full_text_en": ""},  # 本文がないので代表は整形されない
+        {"proposal_id": "B", "full_text_en": "text"},
+    ]
+    assert [p["proposal_id"] for p in format_about_with_llm.select_pending(data, None, GROUPS)] == ["B"]
+
+    data[0]["full_text_en"] = "text"
+    assert [p["proposal_id"] for p in format_about_with_llm.select_pending(data, None, GROUPS)] == ["A"]
+
+
+def test_propagate_copies_from_canonical():
+    data = [
+        {"proposal_id": "A", "title_en": "Alpha", "about_structured_en": "# Alpha\nbody"},
+        {"proposal_id": "B", "title_en": "Beta"},
+    ]
+    assert GROUPS.propagate(data, ("about_structured_en",)) == 1
+    assert data[1]["about_structured_en"] == "# Beta\nbody"
+    assert data[1]["_reused_from"] == "A"
+
+
+def pair(rng, share=0.0, **changes):
+    words = text(rng)
+    a = {**rec("A", words), "title_en": "Alpha", "challenge": "Governance", "requested_ada": 50000}
+    b = {**rec("B", edit(words, rng, share) if share else words), "title_en": "Beta"}
+    b.update({"challenge": "Governance", "requested_ada": 50000, **changes})
+    a["about_structured_en"] = "# Alpha\nCategory: Governance\nRequested Budget: ₳50,000"
+    return [a, b]
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [{"requested_ada": 80000}, {"challenge": "Developer Tools"}],
+    ids=["budget", "challenge"],
+)
+def test_different_budget_or_challenge_is_not_copied(changes):
+    data = pair(random.Random(3), **changes)
+    by_id = {r["proposal_id"]: r for r in data}
+    assert GROUPS.reuses("B", by_id, ("about_structured_en",)) is None
+    assert GROUPS.propagate(data, ("about_structured_en",)) == 0
+    assert "about_structured_en" not in data[1]
+    # メンバーも自分で整形する
+    data[0].pop("about_structured_en")
+    selected = format_about_with_llm.select_pending(data, None, GROUPS)
+    assert [p["proposal_id"] for p in selected] == ["A", "B"]
+
+
+def test_loosely_similar_text_is_not_copied():
+    # 同じクラスタに入るくらいには似ているが、そのままコピーするほどではない
+    data = pair(random.Random(4), share=0.01)
+    assert THRESHOLD <= sim(*data) and jaccard(shingles(data[0]), shingles(data[1])) < REUSE_SIMILARITY
+    assert GROUPS.propagate(data, ("about_structured_en",)) == 0
+
+
+def test_near_identical_text_with_same_metadata_is_copied():
+    data = pair(random.Random(5), share=0.002)
+    assert GROUPS.propagate(data, ("about_structured_en",)) == 1
+    assert data[1]["about_structured_en"].startswith("# Beta\n")
@@ -0,0 +1,70 @@
+# tools/tests/test_pipeline.py
+
+import json
+import textwrap
+
+import pipeline
+from pipeline import Pipeline, Stage
+
+EN = "data/en.json"
+
+# prepare が作り、scrape と format が同じファイルに書き足す（実際の en.json と同じ流れ）
+SCRIPTS = {
+    "prepare.py": """
+        import json, pathlib
+        pathlib.Path("data/en.json").write_text(json.dumps({"x": 1}))
+    """,
+    "scrape.py": """
+        import json, pathlib
+        p = pathlib.Path("data/en.json")
+        d = json.loads(p.read_text()); d["scraped"] = True
+        p.write_text(json.dumps(d))
+    """,
+    "format.py": """
+        import json, pathlib
+        p = pathlib.Path("data/en.json")
+        d = json.loads(p.read_text()); d["fmt"] = "!"
+        p.write_text(json.dumps(d))
+    """,
+}
+
+
+def make_pipeline(tmp_path, monkeypatch):
+    for name, body in SCRIPTS.items():
+        (tmp_path / name).write_text(textwrap.dedent(body), encoding="utf-8")
+    (tmp_path / "data").mkdir(exist_ok=True)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pipeline, "ROOT", tmp_path)
+    stages = [
+        Stage("prepare", "prepare.py", [], [EN]),
+        Stage("scrape", "scrape.py", [EN], [EN]),
+        Stage("format", "format.py", [EN], [EN]),
+    ]
+    return Pipeline(stages, state_file=tmp_path / "data" / "state.json")
+
+
+def read_en(tmp_path):
+    return json.loads((tmp_path / EN).read_text())
+
+
+def test_second_run_skips_everything(tmp_path, monkeypatch):
+    assert set(make_pipeline(tmp_path, monkeypatch).run([]).values()) == {"ran"}
+    assert set(make_pipeline(tmp_path, monkeypatch).run([]).values()) == {"skipped"}
+    assert read_en(tmp_path) == {"x": 1, "scraped": True, "fmt": "!"}
+
+
+def test_rerun_with_identical_output_reruns_in_place_writers(tmp_path, monkeypatch):
+    make_pipeline(tmp_path, monkeypatch).run([])
+
+    # prepare を作り直すと、出力は前回とバイト単位で同じでも en.json は書き戻される
+    status = make_pipeline(tmp_path, monkeypatch).run([], force={"prepare"})
+
+    assert status == {"prepare": "ran", "scrape": "ran", "format": "ran"}
+    assert read_en(tmp_path) == {"x": 1, "scraped": True, "fmt": "!"}
+    assert set(make_pipeline(tmp_path, monkeypatch).run([]).values()) == {"skipped"}
+
+
+def test_dry_run_reports_downstream_of_forced_stage(tmp_path, monkeypatch):
+    make_pipeline(tmp_path, monkeypatch).run([])
+    status = make_pipeline(tmp_path, monkeypatch).run([], force={"prepare"}, dry_run=True)
+    assert status == {"prepare": "would run", "scrape": "would run", "format": "would run"}
@@ -0,0 +1,68 @@
+# tools/tests/test_rate_limit.py
+
+import pytest
+
+import rate_limit
+from llm_engine import LLMEngine
+from rate_limit import TokenBucket, parse_retry_after
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = FakeClock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", c.monotonic)
+    monkeypatch.setattr(rate_limit.time, "sleep", c.sleep)
+    return c
+
+
+def test_clamped_bucket_charges_at_most_capacity(clock):
+    b = TokenBucket(rate=1.0, capacity=10.0)
+    assert b.acquire(50) == 0.0
+    # 10 個ぶんしか引かれていないので、10 秒で次の 10 個が取れる
+    assert b.acquire(10) == pytest.approx(10.0)
+
+
+def test_debt_bucket_charges_full_amount(clock):
+    b = TokenBucket(rate=1.0, capacity=10.0, allow_debt=True)
+    assert b.acquire(50) == 0.0
+    # 40 個の借りを返してから、さらに 10 個ぶん待つ
+    assert b.acquire(10) == pytest.approx(50.0)
+
+
+def test_debt_bucket_waits_until_full_before_large_request(clock):
+    b = TokenBucket(rate=1.0, capacity=10.0, allow_debt=True)
+    b.acquire(10)
+    assert b.acquire(30) == pytest.approx(10.0)
+
+
+def test_pause_keeps_debt(clock):
+    b = TokenBucket(rate=1.0, capacity=10.0, allow_debt=True)
+    b.acquire(20)
+    b.pause_for(5)
+    assert b.acquire(1) == pytest.approx(16.0)
+
+
+def test_engine_tpm_bucket_holds_one_minute(clock):
+    engine = LLMEngine(client=object(), tpm=60_000)
+    big = [{"role": "user", "content": "x" * 4 * 20_000}]  # 2 万トークン + 返答 1000
+    started = clock.now
+    for _ in range(3):
+        engine._wait_budget(big, 1000)
+    # 6.3 万トークンなので、1 分の予算を超えた 3000 トークンぶん（3 秒）待つ
+    assert clock.now - started == pytest.approx(3.0)
+
+
+@pytest.mark.parametrize("value, expected", [("120", 120.0), ("", None), (None, None), ("soon", None)])
+def test_parse_retry_after(value, expected):
+    assert parse_retry_after(value) == expected
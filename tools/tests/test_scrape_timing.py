@@ -0,0 +1,51 @@
+# tools/tests/test_scrape_timing.py
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import scrape_one_f14 as scrape
+from telemetry import metrics
+
+PARSE_SECONDS = 0.2
+
+
+class FakeResponse:
+    status_code = 200
+    text = "<html></html>"
+    headers = {}
+
+
+def slow_extract(html, backend):
+    time.sleep(PARSE_SECONDS)
+    return {"full_text_en": "parsed"}
+
+
+@pytest.fixture
+def record_seconds():
+    # 計測はプロセス全体で 1 つなので、このテストの分だけを取り出す
+    before = len(metrics().histograms.get("record.seconds", []))
+    yield lambda: metrics().histograms.get("record.seconds", [])[before:]
+
+
+@pytest.mark.parametrize("parse_workers", [0, 1])
+def test_record_seconds_include_parse(monkeypatch, record_seconds, parse_workers):
+    monkeypatch.setattr(scrape, "fetch_page", lambda *a, **kw: FakeResponse())
+    monkeypatch.setattr(scrape, "extract", slow_extract)
+    # 解析プールはスレッドで代用する（差し替えた extract を子プロセスに渡せないため）
+    monkeypatch.setattr(scrape, "ProcessPoolExecutor", ThreadPoolExecutor)
+
+    results = list(
+        scrape.scrape_many(
+            [("p1", "http://example.test/1"), ("p2", "http://example.test/2")],
+            concurrency=2,
+            rate=1000.0,
+            parse_workers=parse_workers,
+            session=object(),
+        )
+    )
+    assert sorted(pid for pid, res, err in results if err is None) == ["p1", "p2"]
+    seconds = record_seconds()
+    assert len(seconds) == 2
+    assert min(seconds) >= PARSE_SECONDS
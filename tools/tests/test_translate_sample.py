@@ -0,0 +1,52 @@
+# tools/tests/test_translate_sample.py
+
+import importlib
+
+import pytest
+
+
+class FakeEngine:
+    def __init__(self, reply):
+        self.reply = reply
+
+    def chat(self, *args, **kwargs):
+        return self.reply
+
+
+@pytest.fixture
+def ts():
+    return importlib.import_module("translate_sample")
+
+
+def test_import_does_not_build_engine(ts, monkeypatch, tmp_path):
+    # キーがなくても import でき、LLM キャッシュのファイルも作らない
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.chdir(tmp_path)
+    importlib.reload(ts)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_batch_fallback_keeps_partial_results(ts, monkeypatch):
+    monkeypatch.setattr(ts, "translate_title_batch", lambda items: {"a": "エー"})
+
+    def translate_title(text):
+        if text == "bad":
+            raise RuntimeError("boom")
+        return f"{text}訳"
+
+    monkeypatch.setattr(ts, "translate_title", translate_title)
+    out, metric = ts.run_job(("batch", [("a", "A"), ("b", "B"), ("c", "bad")]))
+    assert out == {("a", "title_ja"): "エー", ("b", "title_ja"): "B訳"}
+    assert metric["failed"] == [("c", "title_ja")]
+    assert metric["fallbacks"] == 2
+
+
+def test_batch_reply_is_parsed_leniently(ts, monkeypatch):
+    reply = '```json\n{"a": "エー", "b": "ビー"}\n```'
+    monkeypatch.setattr(ts, "shared_engine", lambda: FakeEngine(reply))
+    assert ts.translate_title_batch([("a", "A"), ("b", "B")]) == {"a": "エー", "b": "ビー"}
+
+
+def test_truncated_batch_reply_keeps_complete_titles(ts, monkeypatch):
+    monkeypatch.setattr(ts, "shared_engine", lambda: FakeEngine('{"a": "エー", "b": "ビ'))
+    assert ts.translate_title_batch([("a", "A"), ("b", "B")]) == {"a": "エー"}
@@ -0,0 +1,61 @@
+# tools/tests/test_xlsx_stream.py
+
+import zipfile
+from datetime import datetime
+
+import pytest
+
+import excel_to_json_f14 as excel
+from conftest import FIXTURES
+from xlsx_stream import list_sheets, parse_coord, parse_range, sheet_extras
+
+WORKBOOK = FIXTURES / "xlsx" / "f14_results_small.xlsx"
+
+
+@pytest.mark.parametrize(
+    "coord, expected", [("A1", (1, 1)), ("$AB$12", (12, 28)), ("xfd1048576", (1048576, 16384))]
+)
+def test_parse_coord(coord, expected):
+    assert parse_coord(coord) == expected
+
+
+def test_parse_range_normalizes_order():
+    assert parse_range("C3:A1") == (1, 1, 3, 3)
+    assert parse_range("B2") == (2, 2, 2, 2)
+
+
+def test_list_sheets_in_workbook_order():
+    with zipfile.ZipFile(WORKBOOK) as zf:
+        assert [title for title, _ in list_sheets(zf)] == ["Governance", "開発者ツール", "Template"]
+
+
+def test_sheet_extras_reads_links_and_merges():
+    with zipfile.ZipFile(WORKBOOK) as zf:
+        part = dict(list_sheets(zf))["Governance"]
+        links, merged = sheet_extras(zf, part)
+    assert links[(2, 1)].endswith("/voting-dashboard")
+    assert links[(4, 1)].endswith("/treasury-report")
+    assert (5, 1) not in links
+    assert merged == [(4, 7, 5, 7)]
+
+
+def iso_dates(rec: dict) -> dict:
+    # ストリーム版は日付を JSON にできる ISO 形式の文字列で返す
+    return {k: v.isoformat() if isinstance(v, datetime) else v for k, v in rec.items()}
+
+
+def test_stream_matches_openpyxl(tmp_path):
+    # 値の型・空行・結合セル・ハイパーリンク・スキップするシートまで load_workbook 版と同じになる
+    streamed = list(excel.stream_workbook(WORKBOOK, workers=1, cache_dir=tmp_path))
+    assert streamed == [iso_dates(rec) for rec in excel.openpyxl_workbook(WORKBOOK)]
+    assert [rec["Challenge"] for rec in streamed] == ["Governance"] * 3 + ["開発者ツール"] * 2
+    first = streamed[0]
+    assert first["Requested ₳"] == 50000 and first["Votes"] == 12.5 and first["Funded"] is True
+    assert first["Decided"] == "2025-06-01T09:30:00"
+
+
+def test_unchanged_sheets_come_from_cache(tmp_path, capsys):
+    first = list(excel.stream_workbook(WORKBOOK, workers=1, cache_dir=tmp_path))
+    capsys.readouterr()
+    assert list(excel.stream_workbook(WORKBOOK, workers=1, cache_dir=tmp_path)) == first
+    assert "2 unchanged sheets from cache" in capsys.readouterr().out
@@ -0,0 +1,122 @@
+# tools/translation_memory.py
+#
+# セグメント単位の翻訳メモリ（SQLite 1 ファイル）。
+#
+# about_structured_en を md_sections.split_segments で見出し・区切り線ごとに分け、
+# セグメントのハッシュ → 言語ごとの訳 を取っておく。文書の一部だけが変わったときは、
+# 変わったセグメントだけを API に送り、残りはここから組み立て直す。
+#
+# キーには model と prompt_version も入れる（プロンプトを変えたら引き当てない）。
+# LLM キャッシュ（llm_cache.py）はプロンプト全体が同じときしか当たらないので、
+# 複数のセグメントをまとめて送る場合でもセグメントごとに再利用できるのはこちら。
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+TM_PATH = Path("data/.translation_memory.sqlite3")
+
+
+def segment_key(source: str, model: str, prompt_version: str) -> str:
+    """(model, prompt_version, 前後の空白を除いた原文) のハッシュ。"""
+    blob = "\x00".join((model, prompt_version, source.strip()))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class TranslationMemory:
+    """
+    (言語, セグメントのキー) → 訳。複数スレッドから使ってよい。
+    last_used は prune() で長く使われていない訳を消すのに使う。
+    """
+
+    def __init__(self, path: Path = TM_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS segments (
+                lang TEXT NOT NULL,
+                key TEXT NOT NULL,
+                source TEXT NOT NULL,
+                target TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (lang, key)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.commit()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0}
+
+    def get_many(self, lang: str, keys) -> dict[str, str]:
+        """keys のうち訳があるものだけ {key: 訳}。"""
+        keys = list(dict.fromkeys(keys))
+        found: dict[str, str] = {}
+        with self._lock:
+            # SQLite の変数の上限に収まるように分けて引く
+            for i in range(0, len(keys), 500):
+                part = keys[i : i + 500]
+                marks = ",".join("?" * len(part))
+                found.update(
+                    self._conn.execute(
+                        f"SELECT key, target FROM segments WHERE lang = ? AND key IN ({marks})",
+                        (lang, *part),
+                    ).fetchall()
+                )
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE segments SET last_used = ? WHERE lang = ? AND key = ?",
+                    [(now, lang, k) for k in found],
+                )
+                self._conn.commit()
+            self.stats["hits"] += len(found)
+            self.stats["misses"] += len(keys) - len(found)
+        return found
+
+    def put_many(self, lang: str, rows) -> None:
+        """rows は (key, 原文, 訳) の並び。"""
+        now = time.time()
+        rows = [(lang, key, source, target, now, now) for key, source, target in rows]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO segments (lang, key, source, target, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            self.stats["stores"] += len(rows)
+
+    def prune(self, older_than_days: float) -> int:
+        """last_used が older_than_days 日より前の訳を消す。消した件数を返す。"""
+        cutoff = time.time() - older_than_days * 86400
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM segments WHERE last_used < ?", (cutoff,))
+            self._conn.commit()
+            return cur.rowcount
+
+    def usage(self) -> dict[str, int]:
+        """言語ごとの件数。"""
+        with self._lock:
+            return dict(
+                self._conn.execute("SELECT lang, COUNT(*) FROM segments GROUP BY lang").fetchall()
+            )
+
+    def summary(self) -> str:
+        s = self.stats
+        lookups = s["hits"] + s["misses"]
+        rate = s["hits"] / lookups * 100 if lookups else 0.0
+        counts = " ".join(f"{lang}={n}" for lang, n in sorted(self.usage().items()))
+        return (
+            f"hits={s['hits']} misses={s['misses']} hit_rate={rate:.1f}% "
+            f"stores={s['stores']} segments: {counts or '-'}"
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,345 @@
+# tools/xlsx_stream.py
+#
+# openpyxl でブック全体を読み込まずに、シートの XML を行ごとにストリームで読む。
+#
+# openpyxl の read_only モードではハイパーリンクが取れないので、
+# シートの関係ファイル（xl/worksheets/_rels/sheetN.xml.rels）から直接引く。
+# 値の扱い（共有文字列・数値・真偽値・エラー・結合セル）は
+# load_workbook(data_only=True) と同じになるようにしている。
+
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+from posixpath import dirname, join, normpath
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+WORKSHEET_TYPE = REL_NS + "/worksheet"
+
+_M = "{%s}" % MAIN_NS
+ROW_TAG = _M + "row"
+CELL_TAG = _M + "c"
+VALUE_TAG = _M + "v"
+INLINE_TAG = _M + "is"
+TEXT_TAG = _M + "t"
+RUN_TAG = _M + "r"
+SI_TAG = _M + "si"
+SHEET_DATA_TAG = _M + "sheetData"
+
+_CHUNK = 1 << 20
+_SHEET_DATA_END_RE = re.compile(rb"</(?:[\w.-]+:)?sheetData\s*>|<(?:[\w.-]+:)?sheetData\s*/>")
+_ROOT_START_RE = re.compile(rb"<(?:[\w.-]+:)?worksheet\b[^>]*>")
+_COORD_RE = re.compile(r"([A-Z]+)(\d+)")
+
+
+def column_index(letters: str) -> int:
+    """"A" → 1, "AB" → 28"""
+    n = 0
+    for ch in letters:
+        n = n * 26 + (ord(ch) - 64)
+    return n
+
+
+def parse_coord(coord: str) -> tuple[int, int]:
+    """"B12" → (12, 2)"""
+    m = _COORD_RE.fullmatch(coord.replace("$", "").upper())
+    if not m:
+        raise ValueError(f"bad cell reference: {coord}")
+    return int(m.group(2)), column_index(m.group(1))
+
+
+def parse_range(ref: str) -> tuple[int, int, int, int]:
+    """"A1:C3" → (min_row, min_col, max_row, max_col)"""
+    first, _, last = ref.partition(":")
+    r1, c1 = parse_coord(first)
+    r2, c2 = parse_coord(last or first)
+    return min(r1, r2), min(c1, c2), max(r1, r2), max(c1, c2)
+
+
+def rich_text(node) -> str:
+    """<si> / <is> の文字列（書式付きの run も連結、ふりがな rPh は除く）。"""
+    parts = []
+    t = node.find(TEXT_TAG)
+    if t is not None and t.text:
+        parts.append(t.text)
+    for run in node.findall(RUN_TAG):
+        rt = run.find(TEXT_TAG)
+        if rt is not None and rt.text:
+            parts.append(rt.text)
+    return "".join(parts)
+
+
+def cast_number(value: str):
+    if "." in value or "E" in value or "e" in value:
+        return float(value)
+    return int(value)
+
+
+def _part_path(base: str, target: str) -> str:
+    """関係ファイルの Target（相対 / 絶対）を zip 内のパスにする。"""
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return normpath(join(dirname(base), target))
+
+
+def rels_path(part: str) -> str:
+    return join(dirname(part), "_rels", part.rsplit("/", 1)[-1] + ".rels")
+
+
+def read_rels(zf: zipfile.ZipFile, part: str) -> dict[str, str]:
+    """part の関係ファイル: rId → Target（なければ空）。"""
+    try:
+        data = zf.read(rels_path(part))
+    except KeyError:
+        return {}
+    root = ET.fromstring(data)
+    return {
+        rel.get("Id"): rel.get("Target")
+        for rel in root.iter("{%s}Relationship" % PKG_REL_NS)
+    }
+
+
+def _rel_types(zf: zipfile.ZipFile, part: str) -> dict[str, tuple[str, str]]:
+    root = ET.fromstring(zf.read(rels_path(part)))
+    return {
+        rel.get("Id"): (rel.get("Type"), rel.get("Target"))
+        for rel in root.iter("{%s}Relationship" % PKG_REL_NS)
+    }
+
+
+def workbook_part(zf: zipfile.ZipFile) -> str:
+    for rid, (rtype, target) in _rel_types(zf, "").items():
+        if rtype.endswith("/officeDocument"):
+            return _part_path("", target)
+    return "xl/workbook.xml"
+
+
+def list_sheets(zf: zipfile.ZipFile) -> list[tuple[str, str]]:
+    """ワークシートの (シート名, zip 内のパス) をブックでの順番どおりに返す（グラフシートは除く）。"""
+    wb_part = workbook_part(zf)
+    rels = _rel_types(zf, wb_part)
+    root = ET.fromstring(zf.read(wb_part))
+    sheets = []
+    for sheet in root.iter(_M + "sheet"):
+        rid = sheet.get("{%s}id" % REL_NS)
+        rtype, target = rels.get(rid, ("", ""))
+        if rtype != WORKSHEET_TYPE:
+            continue
+        sheets.append((sheet.get("name"), _part_path(wb_part, target)))
+    return sheets
+
+
+def workbook_epoch(zf: zipfile.ZipFile) -> datetime:
+    root = ET.fromstring(zf.read(workbook_part(zf)))
+    pr = root.find(_M + "workbookPr")
+    if pr is not None and pr.get("date1904") in ("1", "true"):
+        return datetime(1904, 1, 1)
+    return datetime(1899, 12, 30)
+
+
+def shared_strings_part(zf: zipfile.ZipFile) -> str | None:
+    for rtype, target in _rel_types(zf, workbook_part(zf)).values():
+        if rtype.endswith("/sharedStrings"):
+            return _part_path(workbook_part(zf), target)
+    return None
+
+
+def styles_part(zf: zipfile.ZipFile) -> str | None:
+    for rtype, target in _rel_types(zf, workbook_part(zf)).values():
+        if rtype.endswith("/styles"):
+            return _part_path(workbook_part(zf), target)
+    return None
+
+
+def read_shared_strings(zf: zipfile.ZipFile) -> list[str]:
+    part = shared_strings_part(zf)
+    if part is None:
+        return []
+    strings = []
+    with zf.open(part) as f:
+        for _, node in ET.iterparse(f):
+            if node.tag == SI_TAG:
+                strings.append(rich_text(node).replace("x005F_", ""))
+                node.clear()
+    return strings
+
+
+def date_styles(zf: zipfile.ZipFile) -> dict[int, bool]:
+    """
+    日付書式のスタイル番号 → 時間（timedelta）書式かどうか。
+    判定は openpyxl と同じ関数を使う。
+    """
+    from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+
+    part = styles_part(zf)
+    if part is None:
+        return {}
+    root = ET.fromstring(zf.read(part))
+    custom = {}
+    fmts = root.find(_M + "numFmts")
+    if fmts is not None:
+        for fmt in fmts.findall(_M + "numFmt"):
+            custom[int(fmt.get("numFmtId"))] = fmt.get("formatCode")
+    result = {}
+    xfs = root.find(_M + "cellXfs")
+    if xfs is None:
+        return result
+    for idx, xf in enumerate(xfs.findall(_M + "xf")):
+        fmt_id = int(xf.get("numFmtId", 0))
+        code = custom.get(fmt_id) or BUILTIN_FORMATS.get(fmt_id)
+        if code and is_date_format(code):
+            result[idx] = is_timedelta_format(code)
+    return result
+
+
+def _read_head_tail(zf: zipfile.ZipFile, part: str) -> bytes:
+    """
+    シート XML のうち、ルート要素の開始タグと </sheetData> より後ろだけをつないだ文書。
+    ハイパーリンクや結合セルは行データの後ろにあるので、行を読む前にこれだけ先に見る。
+    （展開はするがパースはしないので、行データ全体を 2 回パースするより軽い）
+    """
+    head = b""
+    tail = None
+    carry = b""
+    with zf.open(part) as f:
+        while True:
+            chunk = f.read(_CHUNK)
+            if not chunk:
+                break
+            if not head:
+                m = _ROOT_START_RE.search(chunk)
+                if m:
+                    head = m.group(0)
+            if tail is not None:
+                tail.append(chunk)
+                continue
+            buf = carry + chunk
+            m = _SHEET_DATA_END_RE.search(buf)
+            if m:
+                tail = [buf[m.end() :]]
+            else:
+                carry = buf[-32:]
+    if not head or tail is None:
+        return b""
+    return head + b"".join(tail)
+
+
+def sheet_extras(zf: zipfile.ZipFile, part: str):
+    """
+    (ハイパーリンク {(row, col): target}, 結合セルの範囲リスト) を返す。
+    openpyxl と同じく、結合セルの左上以外へのリンクは左上に付け、
+    範囲指定のリンクは範囲内の（左上以外の結合セルを除く）全セルに付ける。
+    """
+    doc = _read_head_tail(zf, part)
+    if not doc:
+        return {}, []
+    root = ET.fromstring(doc)
+    merged = []
+    mc = root.find(_M + "mergeCells")
+    if mc is not None:
+        merged = [parse_range(m.get("ref")) for m in mc.findall(_M + "mergeCell")]
+
+    def hidden_anchor(row, col):
+        for r1, c1, r2, c2 in merged:
+            if r1 <= row <= r2 and c1 <= col <= c2 and (row, col) != (r1, c1):
+                return r1, c1
+        return None
+
+    links: dict[tuple[int, int], str | None] = {}
+    hl = root.find(_M + "hyperlinks")
+    if hl is not None:
+        rels = read_rels(zf, part)
+        for link in hl.findall(_M + "hyperlink"):
+            rid = link.get("{%s}id" % REL_NS)
+            target = rels.get(rid) if rid else None
+            ref = link.get("ref")
+            if not ref:
+                continue
+            if ":" in ref:
+                r1, c1, r2, c2 = parse_range(ref)
+                for row in range(r1, r2 + 1):
+                    for col in range(c1, c2 + 1):
+                        if hidden_anchor(row, col) is None:
+                            links[(row, col)] = target
+            else:
+                cell = parse_coord(ref)
+                links[hidden_anchor(*cell) or cell] = target
+    return links, merged
+
+
+def cell_value(c, shared: list[str], dates: dict[int, bool], epoch: datetime):
+    """<c> 要素の値（load_workbook(data_only=True) と同じ型）。"""
+    data_type = c.get("t", "n")
+    if data_type == "inlineStr":
+        node = c.find(INLINE_TAG)
+        return rich_text(node) if node is not None else None
+
+    value = c.findtext(VALUE_TAG) or None
+    if value is None:
+        return None
+    if data_type == "n":
+        number = cast_number(value)
+        style = int(c.get("s") or 0)
+        if style in dates:
+            return excel_date(number, epoch, dates[style])
+        return number
+    if data_type == "s":
+        return shared[int(value)]
+    if data_type == "b":
+        return bool(int(value))
+    # "str"（数式の結果の文字列）, "e"（エラー）, "d"（ISO 8601 の日付）はそのまま
+    return value
+
+
+def excel_date(number, epoch: datetime, as_timedelta: bool) -> str:
+    """
+    日付書式のセル。openpyxl は datetime を返すが JSON にできないので ISO 形式の文字列にする。
+    """
+    from openpyxl.utils.datetime import from_excel
+
+    try:
+        value = from_excel(number, epoch, timedelta=as_timedelta)
+    except (OverflowError, ValueError):
+        return "#VALUE!"
+    if isinstance(value, timedelta):
+        return str(value)
+    return value.isoformat()
+
+
+def iter_rows(zf: zipfile.ZipFile, part: str, shared, dates, epoch):
+    """
+    (行番号, {列番号: 値}) を 1 行ずつ返す。値が None のセルは入れない。
+    パース済みの行はすぐに捨てるので、シートが大きくてもメモリは増えない。
+    """
+    row_counter = 0
+    sheet_data = None
+    with zf.open(part) as f:
+        for event, elem in ET.iterparse(f, events=("start", "end")):
+            if event == "start":
+                if elem.tag == SHEET_DATA_TAG:
+                    sheet_data = elem
+                continue
+            if elem.tag != ROW_TAG:
+                continue
+            r = elem.get("r")
+            row_counter = int(r) if r else row_counter + 1
+            values = {}
+            col_counter = 0
+            for c in elem.iter(CELL_TAG):
+                coord = c.get("r")
+                if coord:
+                    _, col_counter = parse_coord(coord)
+                else:
+                    col_counter += 1
+                value = cell_value(c, shared, dates, epoch)
+                if value is not None:
+                    values[col_counter] = value
+                else:
+                    values.pop(col_counter, None)
+            yield row_counter, values
+            if sheet_data is not None:
+                sheet_data.clear()
+            else:
+                elem.clear()
@@ -1,22 +1,28 @@
 import json
-from pathlib import Path
 import os
+import sys
+import time
+from pathlib import Path
 
-from openai import OpenAI
+sys.path.insert(0, str(Path(__file__).resolve().parent / "tools"))
 
-# OpenAI client
-api_key = os.environ.get("OPENAI_API_KEY")
-if not api_key:
-    raise RuntimeError(
-        "OPENAI_API_KEY が環境変数に設定されていません。export してください。"
-    )
+from json_repair import loads_lenient  # noqa: E402
+from llm_engine import shared_engine  # noqa: E402
+from records import iter_records, write_records  # noqa: E402
 
-client = OpenAI(api_key=api_key)
+# 並列度・RPM/TPM などは環境変数（LLM_CONCURRENCY など）で調整する
+# （エンジンは最初の API 呼び出しまで作らないので、import してもキャッシュやクライアントは開かない）
 
 DATA_DIR = Path("data")
 INPUT_FILE = DATA_DIR / "f14_proposals_en.json"
 OUTPUT_FILE = DATA_DIR / "f14_proposals_ja.json"
 
+# プロンプトを変えたら上げる（LLM キャッシュのキーに入る）
+PROMPT_VERSION = "1"
+
+# 1 リクエストにまとめるタイトル数（1 以下なら 1 件ずつ翻訳する）
+TITLE_BATCH_SIZE = int(os.environ.get("TITLE_BATCH_SIZE") or 20)
+
 
 def translate_title(text: str) -> str:
     """Translate a proposal TITLE into concise Japanese (1行だけ)."""
@@ -28,12 +34,12 @@ def translate_title(text: str) -> str:
         f"TITLE:\n{text}\n"
     )
 
-    res = client.chat.completions.create(
+    return shared_engine().chat(
+        [{"role": "user", "content": prompt}],
         model="gpt-4.1-mini",
-        messages=[{"role": "user", "content": prompt}],
+        prompt_version=PROMPT_VERSION,
         temperature=0.0,
     )
-    return res.choices[0].message.content.strip()
 
 
 def translate_summary(text: str) -> str:
@@ -46,65 +52,236 @@ def translate_summary(text: str) -> str:
         f"---\n{text}\n---"
     )
 
-    res = client.chat.completions.create(
+    return shared_engine().chat(
+        [{"role": "user", "content": prompt}],
         model="gpt-4.1-mini",
-        messages=[{"role": "user", "content": prompt}],
+        prompt_version=PROMPT_VERSION,
         temperature=0.2,
     )
-    return res.choices[0].message.content.strip()
 
 
-def main():
-    # 1) Load input JSON（英語側）
-    with INPUT_FILE.open("r", encoding="utf-8") as f:
-        proposals = json.load(f)
+def translate_title_batch(items: list[tuple[str, str]]) -> dict[str, str]:
+    """
+    複数タイトルを 1 リクエストで翻訳する。
+    入力も出力も {id: title} の JSON にして、入力にあった id で、
+    1 行の空でない文字列になっているものだけを返す（残りは呼び出し側で個別に翻訳）。
+    """
+    source = {key: text for key, text in items}
+    prompt = (
+        "You are translating Project Catalyst proposal TITLES into Japanese.\n"
+        "Translate each title into ONE concise Japanese title (single line).\n"
+        "Return ONLY a JSON object that maps every id to its Japanese title, "
+        "using exactly the same ids as the input.\n"
+        "Do NOT add any explanation. Do NOT wrap the JSON in code fences.\n\n"
+        "TITLES (JSON):\n"
+        f"{json.dumps(source, ensure_ascii=False, indent=0)}\n"
+    )
+
+    content = shared_engine().chat(
+        [{"role": "user", "content": prompt}],
+        model="gpt-4.1-mini",
+        prompt_version=PROMPT_VERSION,
+        temperature=0.0,
+    )
+    try:
+        parsed, _repaired = loads_lenient(content)
+    except ValueError:
+        return {}
+    if not isinstance(parsed, dict):
+        return {}
+
+    valid = {}
+    for key in source:
+        value = parsed.get(key)
+        if isinstance(value, str) and value.strip() and "\n" not in value.strip():
+            valid[key] = value.strip()
+    return valid
+
+
+TRANSLATORS = {
+    "title_ja": translate_title,
+    "summary_ja": translate_summary,
+}
+
+
+def reusable(old: dict | None, src: str, dst: str, text: str) -> bool:
+    """前回の出力に訳があり、その時の英語原文が今と同じなら再利用できる。"""
+    if not old or not old.get(dst):
+        return False
+    # 古い出力に原文が残っていなければ、従来どおり proposal_id だけで再利用する
+    return old.get(src) is None or old.get(src) == text
+
+
+def run_job(job: tuple) -> tuple[dict, dict]:
+    """
+    1 ジョブ分を実行して ({(pid, field): 訳}, 計測値) を返す。
+    ジョブは (pid, field, 原文) か ("batch", [(pid, title_en), ...])。
+    バッチで個別に訳し直したタイトルが失敗しても、訳せた分は返し、失敗した分は計測値の failed に入れる。
+    """
+    started = time.perf_counter()
+    if job[0] != "batch":
+        key, field, text = job
+        out = {(key, field): TRANSLATORS[field](text)}
+        return out, {"kind": field, "requests": 1, "seconds": time.perf_counter() - started}
+
+    items = job[1]
+    try:
+        got = translate_title_batch(items)
+    except Exception as e:
+        print(f"  ⚠️ batch of {len(items)} titles failed, falling back: {e}")
+        got = {}
+    batch_seconds = time.perf_counter() - started
+
+    # 欠けた・壊れた項目は 1 件ずつ翻訳し直す
+    fallback_seconds = 0.0
+    failed = []
+    missing = [(key, text) for key, text in items if key not in got]
+    for key, text in missing:
+        t0 = time.perf_counter()
+        try:
+            got[key] = translate_title(text)
+        except Exception as e:
+            print(f"  ❌ {key} title_ja: {e}")
+            failed.append((key, "title_ja"))
+        fallback_seconds += time.perf_counter() - t0
 
-    # 2) 既存の日本語JSONがあれば読み込んで再利用
+    out = {(key, "title_ja"): title for key, title in got.items()}
+    return out, {
+        "kind": "batch",
+        "titles": len(items),
+        "requests": 1 + len(missing),
+        "fallbacks": len(missing),
+        "seconds": batch_seconds,
+        "fallback_seconds": fallback_seconds,
+        "failed": failed,
+    }
+
+
+def plan_jobs(pending: list[tuple[str, str, str]], batch_size: int) -> list[tuple]:
+    """タイトルのジョブを batch_size 件ずつ 1 リクエストにまとめる。"""
+    if batch_size <= 1:
+        return list(pending)
+    titles = [(key, text) for key, field, text in pending if field == "title_ja"]
+    others = [job for job in pending if job[1] != "title_ja"]
+    batches = [
+        ("batch", titles[i : i + batch_size]) for i in range(0, len(titles), batch_size)
+    ]
+    return batches + others
+
+
+def report_batching(metrics: list[dict]) -> None:
+    batches = [m for m in metrics if m["kind"] == "batch"]
+    if not batches:
+        return
+    titles = sum(m["titles"] for m in batches)
+    requests = sum(m["requests"] for m in batches)
+    fallbacks = sum(m["fallbacks"] for m in batches)
+    spent = sum(m["seconds"] + m["fallback_seconds"] for m in batches)
+
+    # 1 件ずつ投げた場合の 1 リクエストあたりの時間を見積もる
+    singles = [m["seconds"] for m in metrics if m["kind"] == "title_ja"]
+    fallback_time = sum(m["fallback_seconds"] for m in batches)
+    if fallbacks:
+        per_title = fallback_time / fallbacks
+    elif singles:
+        per_title = sum(singles) / len(singles)
+    else:
+        # 個別呼び出しの実測がなければ、バッチ 1 回分を 1 件の時間とみなす（控えめな見積もり）
+        per_title = min(m["seconds"] for m in batches)
+    saved = titles * per_title - spent
+
+    print(
+        f"[batch] {titles} titles in {len(batches)} batches → {requests} requests "
+        f"({titles - requests} saved, {fallbacks} fallbacks), "
+        f"~{max(0.0, saved):.1f}s of request latency saved"
+    )
+
+
+# 前回の出力から再利用の判定に使うフィールドだけを残す（全文などは持たない）
+REUSE_FIELDS = ("title_en", "title_ja", "summary_en", "summary_ja")
+
+
+def load_existing(path: Path) -> dict[str, dict]:
     existing_by_id: dict[str, dict] = {}
-    if OUTPUT_FILE.exists():
-        with OUTPUT_FILE.open("r", encoding="utf-8") as f:
-            try:
-                existing = json.load(f)
-                for item in existing:
-                    pid = item.get("proposal_id")
-                    if pid:
-                        existing_by_id[pid] = item
-            except Exception:
-                # 壊れていても無視して新規生成
-                existing_by_id = {}
-
-    translated = []
-    for p in proposals:
-        pid = p.get("proposal_id")
-        title_en = p.get("title_en", "")
-        summary_en = p.get("summary_en", "")
+    if not path.exists():
+        return existing_by_id
+    try:
+        for item in iter_records(path):
+            pid = item.get("proposal_id")
+            if pid:
+                existing_by_id[pid] = {k: item.get(k) for k in REUSE_FIELDS}
+    except Exception:
+        # 壊れていても無視して新規生成
+        return {}
+    return existing_by_id
+
+
+def main():
+    # 1) 既存の日本語JSONがあれば読み込んで再利用
+    existing_by_id = load_existing(OUTPUT_FILE)
 
-        # すでに翻訳済みならそれを使う
+    # 2) 英語側を 1 件ずつ読み、翻訳が必要なものを (pid, 出力フィールド, 原文) のジョブに分解する
+    # タイトルとサマリーも別ジョブにして並列に投げる
+    # 英語の原文が前回と変わっていなければ既存の訳を使い、変わっていれば訳し直す
+    # （同じ原文なら LLM キャッシュに当たるので API は呼ばれない）
+    results: dict[tuple[str, str], str] = {}
+    jobs = []
+    for i, p in enumerate(iter_records(INPUT_FILE)):
+        pid = p.get("proposal_id")
         old = existing_by_id.get(pid) if pid else None
-        if old and old.get("title_ja"):
-            title_ja = old.get("title_ja", "")
-            # summary_en が空なら古い summary_ja をそのまま使う
-            if summary_en:
-                summary_ja = old.get("summary_ja", "")
-            else:
-                summary_ja = old.get("summary_ja", "")
-            print(f"Reuse translation: {pid} - {title_en}")
-        else:
-            print(f"Translating: {pid} - {title_en}")
-            title_ja = translate_title(title_en) if title_en else ""
-            summary_ja = translate_summary(summary_en) if summary_en else ""
-
-        new_p = {
-            **p,  # 英語側の最新メタデータを優先
-            "title_ja": title_ja,
-            "summary_ja": summary_ja,
-        }
-        translated.append(new_p)
+        key = pid or f"index:{i}"
+        for src, dst in (("title_en", "title_ja"), ("summary_en", "summary_ja")):
+            text = p.get(src, "")
+            if not text:
+                continue
+            if reusable(old, src, dst, text):
+                continue
+            print(f"Translating: {key} {dst} - {p.get('title_en', '')}")
+            jobs.append((key, dst, text))
+
+    # 失敗した (pid, field) は前回の訳（なければ空）のまま書き出し、次の実行で訳し直す
+    engine = shared_engine()
+    metrics = []
+    failed: list[tuple[str, str]] = []
+    for job, res, err in engine.map(run_job, plan_jobs(jobs, TITLE_BATCH_SIZE)):
+        if err is not None:
+            label = f"{len(job[1])} titles" if job[0] == "batch" else f"{job[0]} {job[1]}"
+            print(f"  ❌ {label}: {err}")
+            failed.extend([(key, "title_ja") for key, _ in job[1]] if job[0] == "batch" else [job[:2]])
+            continue
+        out, metric = res
+        results.update(out)
+        metrics.append(metric)
+        failed.extend(metric.get("failed", ()))
+
+    def translated():
+        # 英語側をもう一度 1 件ずつ読み直して、訳を差し込みながら書き出す
+        for i, p in enumerate(iter_records(INPUT_FILE)):
+            pid = p.get("proposal_id")
+            key = pid or f"index:{i}"
+            old = existing_by_id.get(pid) if pid else None
+
+            # すでに翻訳済み（原文も同じ）ならそれを使う
+            title_ja = results.get((key, "title_ja"))
+            if title_ja is None:
+                title_ja = (old.get("title_ja") or "") if old else ""
+            summary_ja = results.get((key, "summary_ja"))
+            if summary_ja is None:
+                summary_ja = (old.get("summary_ja") or "") if old else ""
+
+            yield {
+                **p,  # 英語側の最新メタデータを優先
+                "title_ja": title_ja,
+                "summary_ja": summary_ja,
+            }
 
     # 3) Save output JSON（日本語側を上書き）
-    with OUTPUT_FILE.open("w", encoding="utf-8") as f:
-        json.dump(translated, f, ensure_ascii=False, indent=2)
-    print(f"✅ Done. Saved {len(translated)} proposals to {OUTPUT_FILE}")
+    count = write_records(OUTPUT_FILE, translated())
+    print(f"✅ Done. Saved {count} proposals to {OUTPUT_FILE}")
+    if failed:
+        print(f"⚠️ {len(failed)} translations failed: " + ", ".join(f"{k} {f}" for k, f in sorted(failed)))
+    report_batching(metrics)
+    print(f"[llm] {engine.summary()}")
 
 
 if __name__ == "__main__":